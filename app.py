@@ -1,7 +1,7 @@
 import os
 import time
 import glob
-from flask import Flask, request, jsonify, send_file, render_template
+from flask import Flask, request, jsonify, send_file, render_template, g, Response
 from flask_cors import CORS
 import uuid
 from threading import Thread
@@ -10,38 +10,105 @@ import shutil
 import json
 import sys
 from pathlib import Path
-import torch
 import gc
+import re
 from flask_jwt_extended import JWTManager
-from modules.models import db, User, Model
+from modules.models import db, User, Model, sqlite_engine_options, apply_sqlite_profile, migrate
 from modules.auth import auth_bp
+from modules.registry import registry
+from modules.metrics import metrics, HTTP_REQUEST_SECONDS
+from modules.structured_logging import configure_logging, parse_sampling, set_request_id, log_pipeline
+from modules.admission import admission
 
 # Add current directory to path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'modules'))
 sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'modules', 'identification'))
 
-# Configure logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+# Configure logging: records go through a bounded queue to one writer thread. A preloading
+# master writes inline instead, since the writer thread would not survive the fork
+configure_logging(
+    level=os.environ.get('LOG_LEVEL', 'INFO').upper(),
+    json_format=os.environ.get('LOG_FORMAT', 'json').lower() == 'json',
+    sampling=parse_sampling(os.environ.get('LOG_SAMPLING')),
+    queue_size=int(os.environ.get('LOG_QUEUE_SIZE', 10000)),
+    background=os.environ.get('SERVER_PRELOAD', 'false').lower() not in ('1', 'true', 'yes')
+)
 logger = logging.getLogger(__name__)
 
-app = Flask(__name__)
+class LazyFlask(Flask):
+    """Registered subsystems resolve through the registry on first attribute access"""
+
+    def __getattr__(self, name):
+        if name in registry:
+            return registry.get(name)
+        raise AttributeError(name)
+
+app = LazyFlask(__name__)
 CORS(app)
 
 # Configuration
 OUTPUT_DIR = "models"
 GENERATED_DIR = "generated_models"
-COMFYUI_OUTPUT_DIR = "C:/ComfyUI_windows_portable/ComfyUI/output/"
+COMFYUI_OUTPUT_DIR = os.environ.get("COMFYUI_OUTPUT_DIR", "C:/ComfyUI_windows_portable/ComfyUI/output/")
 Path(OUTPUT_DIR).mkdir(exist_ok=True)
 Path(GENERATED_DIR).mkdir(exist_ok=True)
 
 # Database & Auth Config
 app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///app.db'
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+app.config['SQLITE_BUSY_TIMEOUT_MS'] = int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000))
+app.config['SQLITE_SYNCHRONOUS'] = os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL').upper()
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = sqlite_engine_options(
+    pool_size=int(os.environ.get('SQLITE_POOL_SIZE', 10)),
+    max_overflow=int(os.environ.get('SQLITE_MAX_OVERFLOW', 20)),
+    busy_timeout_ms=app.config['SQLITE_BUSY_TIMEOUT_MS']
+)
 app.config['JWT_SECRET_KEY'] = 'super-secret-key-change-this-in-prod'  # Change this!
 app.config['OUTPUT_DIR'] = OUTPUT_DIR
 app.config['GENERATED_DIR'] = GENERATED_DIR
 app.config['COMFYUI_OUTPUT_DIR'] = COMFYUI_OUTPUT_DIR
+app.config['PROGRESSIVE_GENERATION'] = os.environ.get('PROGRESSIVE_GENERATION', 'false').lower() in ('1', 'true', 'yes')
+app.config['PREVIEW_MESH_STEPS'] = int(os.environ.get('PREVIEW_MESH_STEPS', 20))
+app.config['PREVIEW_OCTREE_RESOLUTION'] = int(os.environ.get('PREVIEW_OCTREE_RESOLUTION', 256))
+app.config['STORAGE_BUDGET_MB'] = int(os.environ.get('STORAGE_BUDGET_MB', 5120))
+app.config['TEMP_FILE_MAX_AGE'] = int(os.environ.get('TEMP_FILE_MAX_AGE', 3600))  # seconds
+app.config['STORAGE_SWEEP_INTERVAL'] = int(os.environ.get('STORAGE_SWEEP_INTERVAL', 600))  # seconds
+app.config['DOWNLOAD_REDIRECT'] = os.environ.get('DOWNLOAD_REDIRECT', 'false').lower() in ('1', 'true', 'yes')
+app.config['SIGNED_URL_TTL'] = int(os.environ.get('SIGNED_URL_TTL', 3600))  # seconds
+app.config['ASSET_PROXY_ENABLED'] = os.environ.get('ASSET_PROXY_ENABLED', 'false').lower() in ('1', 'true', 'yes')
+app.config['ASSET_CACHE_DIR'] = os.environ.get('ASSET_CACHE_DIR', 'asset_cache')
+app.config['ASSET_CACHE_BUDGET_MB'] = int(os.environ.get('ASSET_CACHE_BUDGET_MB', 2048))
+app.config['WRITE_BUFFER_DIR'] = os.environ.get('WRITE_BUFFER_DIR', 'write_journal')
+app.config['WRITE_BUFFER_BATCH'] = int(os.environ.get('WRITE_BUFFER_BATCH', 200))
+app.config['WRITE_BUFFER_INTERVAL'] = float(os.environ.get('WRITE_BUFFER_INTERVAL', 2.0))  # seconds
+app.config['WRITE_BUFFER_FSYNC'] = os.environ.get('WRITE_BUFFER_FSYNC', 'false').lower() in ('1', 'true', 'yes')
+app.config['SCAN_TELEMETRY'] = os.environ.get('SCAN_TELEMETRY', 'false').lower() in ('1', 'true', 'yes')
+app.config['SCAN_TELEMETRY_TABLE'] = os.environ.get('SCAN_TELEMETRY_TABLE', 'scan_events')
+app.config['SEARCH_SYNC_INTERVAL'] = int(os.environ.get('SEARCH_SYNC_INTERVAL', 300))  # seconds
+app.config['LEADERBOARD_SYNC_INTERVAL'] = int(os.environ.get('LEADERBOARD_SYNC_INTERVAL', 120))  # seconds
+# Set by serve.py: workers are forked from this process, so nothing may start threads or touch CUDA yet
+app.config['SERVER_PRELOAD'] = os.environ.get('SERVER_PRELOAD', 'false').lower() in ('1', 'true', 'yes')
+app.config['TORCH_THREADS'] = int(os.environ.get('TORCH_THREADS', 0))  # 0 = torch default
+# Components built in the background at startup ("all", "none" or a comma list); the rest load on first use
+app.config['WARM_UP'] = {n.strip() for n in os.environ.get('WARM_UP', 'all').lower().split(',') if n.strip() and n.strip() != 'none'}
+app.config['COMFYUI_URL'] = os.environ.get('COMFYUI_URL', 'http://127.0.0.1:8188')
+# Admin endpoints (/api/admin: profiler, tracemalloc) are disabled unless a token is set
+app.config['ADMIN_TOKEN'] = os.environ.get('ADMIN_TOKEN')
+app.config['PROFILE_MAX_SECONDS'] = float(os.environ.get('PROFILE_MAX_SECONDS', 60))
+# Admission control per process: concurrency slots, waiting room, client deadline (s), per-client rate
+app.config['ADMISSION_CONTROL'] = os.environ.get('ADMISSION_CONTROL', 'true').lower() in ('1', 'true', 'yes')
+app.config['SCAN_CONCURRENCY'] = int(os.environ.get('SCAN_CONCURRENCY', 4))
+app.config['SCAN_QUEUE'] = int(os.environ.get('SCAN_QUEUE', 16))
+app.config['SCAN_DEADLINE'] = float(os.environ.get('SCAN_DEADLINE', 20))
+app.config['SCAN_RATE_PER_MINUTE'] = int(os.environ.get('SCAN_RATE_PER_MINUTE', 30))
+app.config['SCAN_BURST'] = int(os.environ.get('SCAN_BURST', 10))
+app.config['LLM_CONCURRENCY'] = int(os.environ.get('LLM_CONCURRENCY', 2))
+app.config['LLM_QUEUE'] = int(os.environ.get('LLM_QUEUE', 8))
+app.config['LLM_DEADLINE'] = float(os.environ.get('LLM_DEADLINE', 60))
+app.config['LLM_RATE_PER_MINUTE'] = int(os.environ.get('LLM_RATE_PER_MINUTE', 20))
+app.config['GENERATE_MAX_JOBS'] = int(os.environ.get('GENERATE_MAX_JOBS', 2))
+app.config['GENERATE_RATE_PER_MINUTE'] = int(os.environ.get('GENERATE_RATE_PER_MINUTE', 4))
 app.config['SUPABASE_URL'] = os.environ.get('SUPABASE_URL')
 app.config['SUPABASE_KEY'] = os.environ.get('SUPABASE_KEY')
 
@@ -50,20 +117,32 @@ app.config['SUPABASE_KEY'] = os.environ.get('SUPABASE_KEY')
 db.init_app(app)
 jwt = JWTManager(app)
 
+admission.enabled = app.config['ADMISSION_CONTROL']
+admission.configure('scan', concurrency=app.config['SCAN_CONCURRENCY'], max_queue=app.config['SCAN_QUEUE'],
+                    deadline=app.config['SCAN_DEADLINE'], per_minute=app.config['SCAN_RATE_PER_MINUTE'],
+                    burst=app.config['SCAN_BURST'])
+admission.configure('llm', concurrency=app.config['LLM_CONCURRENCY'], max_queue=app.config['LLM_QUEUE'],
+                    deadline=app.config['LLM_DEADLINE'], per_minute=app.config['LLM_RATE_PER_MINUTE'],
+                    burst=max(1, app.config['LLM_RATE_PER_MINUTE'] // 4))
+# Generation jobs never wait here: they queue in ComfyUI, so a full pool is an immediate 503
+admission.configure('generate', concurrency=app.config['GENERATE_MAX_JOBS'],
+                    per_minute=app.config['GENERATE_RATE_PER_MINUTE'],
+                    burst=max(1, app.config['GENERATE_RATE_PER_MINUTE'] // 2))
+
 # JWT Error Handlers
 @jwt.invalid_token_loader
 def invalid_token_callback(error):
-    print(f"❌ INVALID TOKEN: {error}")
+    logger.warning(f"Invalid token: {error}")
     return jsonify({"msg": "Invalid token", "error": str(error)}), 422
 
 @jwt.unauthorized_loader
 def missing_token_callback(error):
-    print(f"❌ MISSING TOKEN: {error}")
+    logger.info(f"Missing token: {error}")
     return jsonify({"msg": "Request does not contain an access token", "error": str(error)}), 401
 
 @jwt.expired_token_loader
 def expired_token_callback(jwt_header, jwt_payload):
-    print(f"❌ EXPIRED TOKEN: {jwt_payload}")
+    logger.info(f"Expired token for user {jwt_payload.get('sub')}")
     return jsonify({"msg": "Token has expired", "error": "token_expired"}), 401
 
 # Register Blueprints
@@ -74,6 +153,9 @@ from modules.api.models import models_bp
 from modules.api.users import users_bp
 from modules.api.classroom import classroom_api
 from modules.api.llm_response import llm_api
+from modules.api.assets import assets_bp
+from modules.api.leaderboard import leaderboard_bp
+from modules.api.admin import admin_bp
 
 
 app.register_blueprint(scan_bp)
@@ -81,67 +163,291 @@ app.register_blueprint(models_bp)
 app.register_blueprint(users_bp)
 app.register_blueprint(classroom_api)
 app.register_blueprint(llm_api)
+app.register_blueprint(assets_bp)
+app.register_blueprint(leaderboard_bp)
+app.register_blueprint(admin_bp)
 
-# Create Tables
+# SQLite pragmas are applied per connection, so install them before anything connects
 with app.app_context():
-    db.create_all()
+    apply_sqlite_profile(db.engine, app.config['SQLITE_BUSY_TIMEOUT_MS'], app.config['SQLITE_SYNCHRONOUS'])
+
+# Subsystems are built on first use (app.planet_detector, app.comfy_client...) or by the
+# warm-up threads, so the port is up before torch, YOLO, ComfyUI or Supabase are loaded.
+def _init_database():
+    with app.app_context():
+        db.create_all()
+        # Indexes added after the tables were first created
+        migrate(db.engine)
+    return db
+
+def _init_torch():
+    import torch
+    # Querying the device initializes CUDA, which does not survive fork
+    if app.config['SERVER_PRELOAD']:
+        logger.info("Preloading for forked workers - CUDA is initialized per worker")
+    elif torch.cuda.is_available():
+        gpu_props = torch.cuda.get_device_properties(0)
+        logger.info(f"GPU detected: {torch.cuda.get_device_name(0)}")
+        logger.info(f"GPU memory: {gpu_props.total_memory / 1024**3:.1f} GB")
+        logger.info(f"CUDA version: {torch.version.cuda}")
+    else:
+        logger.warning("No GPU detected - using CPU (slow)")
+    return torch
+
+def _init_planet_detector():
+    registry.get('torch')
+    from modules.identification.model_loader import initialize_detection_system
+    return initialize_detection_system()
+
+def _init_comfy_client():
+    from modules.generation.comfyui_client import ComfyUIClient
+    from modules.generation.progress import progress_registry
+    client = ComfyUIClient(comfyui_url=app.config['COMFYUI_URL'])
+    # Feed per-node execution/progress messages into the job progress streams
+    client.add_listener(progress_registry.dispatch, start=False)
+    return client
+
+def _init_model_manager():
+    from modules.generation.model_manager import ModelManager
+    from modules.generation.storage_manager import StorageManager
+    storage = StorageManager(
+        models_dir=app.config['GENERATED_DIR'],
+        temp_dir=app.config['OUTPUT_DIR'],
+        budget_bytes=app.config['STORAGE_BUDGET_MB'] * 1024**2,
+        temp_max_age=app.config['TEMP_FILE_MAX_AGE']
+    )
+    # Adopt files from before the index existed and clear crash leftovers
+    storage.reconcile()
+    storage.run_maintenance()
+    # Pass the configured GENERATED_DIR
+    return ModelManager(models_dir=app.config['GENERATED_DIR'], storage=storage, watch=False)
+
+def _start_model_manager(manager):
+    if manager.storage is not None:
+        manager.storage.start_scheduler(app.config['STORAGE_SWEEP_INTERVAL'])
+    manager.catalogue.start_watching()
 
-# Import modules with error handling
-# We attach them to 'app' so blueprints can access them via current_app
-app.planet_detector = None
-app.comfy_client = None
-app.model_manager = None
+def _init_asset_cache():
+    # Optional local proxy cache for Supabase-hosted assets
+    if not app.config['ASSET_PROXY_ENABLED']:
+        return None
+    from modules.asset_cache import AssetCache
+    return AssetCache(
+        cache_dir=app.config['ASSET_CACHE_DIR'],
+        budget_bytes=app.config['ASSET_CACHE_BUDGET_MB'] * 1024**2
+    )
+
+def _init_supabase():
+    from modules.supabase_service import supabase_service
+    supabase_service.initialize()
+    return supabase_service if supabase_service.initialized else None
+
+def _init_search_index():
+    # Loaded by its sync thread, then kept current from writes
+    from modules.search_index import model_search
+    return model_search
+
+def _start_search_index(index):
+    from modules.supabase_service import supabase_service
+    index.start_sync(supabase_service, interval=app.config['SEARCH_SYNC_INTERVAL'])
+
+def _init_leaderboard():
+    # Rebuilt once, then maintained from committed User changes and classroom joins
+    from modules.supabase_service import supabase_service
+    from modules.leaderboard import leaderboard
+    registry.get('database')
+    registry.get('supabase')
+    leaderboard.load(app, supabase_service)
+    return leaderboard
+
+def _start_leaderboard(board):
+    # Other workers' XP changes only reach this process's board through a rebuild
+    from modules.supabase_service import supabase_service
+    board.start_sync(app, supabase_service, interval=app.config['LEADERBOARD_SYNC_INTERVAL'])
+
+def _init_write_buffer():
+    # Write-behind buffer for high-volume inserts (telemetry, awards...)
+    from modules.supabase_service import supabase_service
+    from modules.write_buffer import WriteBuffer
+    return WriteBuffer(
+        sink=supabase_service.insert_many,
+        journal_dir=app.config['WRITE_BUFFER_DIR'],
+        max_batch=app.config['WRITE_BUFFER_BATCH'],
+        flush_interval=app.config['WRITE_BUFFER_INTERVAL'],
+        fsync=app.config['WRITE_BUFFER_FSYNC']
+    )
+
+def _start_write_buffer(buffer):
+    import atexit
+    buffer.start()
+    atexit.register(buffer.close)
+
+def _warm(name):
+    return 'all' in app.config['WARM_UP'] or name in app.config['WARM_UP']
 
 def initialize_modules():
-    """Initialize all modules with proper error handling"""
-    try:
-        # Print GPU info
-        if torch.cuda.is_available():
-            gpu_props = torch.cuda.get_device_properties(0)
-            print(f"✅ GPU Detected: {torch.cuda.get_device_name(0)}")
-            print(f"📊 GPU Memory: {gpu_props.total_memory / 1024**3:.1f} GB")
-            print(f"🔧 CUDA Version: {torch.version.cuda}")
-        else:
-            print("❌ No GPU detected - using CPU (slow)")
-        
-        # Try to initialize planet detector
-        try:
-            from modules.identification.model_loader import initialize_detection_system
-            app.planet_detector = initialize_detection_system()
-        except Exception as e:
-            print(f"⚠️ Planet detector not available: {e}")
-        
-        # Initialize ComfyUI client with error handling
-        try:
-            from modules.generation.comfyui_client import ComfyUIClient
-            app.comfy_client = ComfyUIClient()
-        except Exception as e:
-            print(f"⚠️ ComfyUI client not available: {e}")
-        
-        # Initialize model manager
-        try:
-            from modules.generation.model_manager import ModelManager
-            # Pass the configured GENERATED_DIR
-            app.model_manager = ModelManager(models_dir=app.config['GENERATED_DIR'])
-        except Exception as e:
-            print(f"⚠️ Model manager not available: {e}")
-        
-        print("✅ All available modules loaded!")
-        
-        # Initialize Supabase
-        try:
-            from modules.supabase_service import supabase_service
-            supabase_service.initialize()
-        except Exception as e:
-            logger.warning(f"Supabase init failed: {e}")
-
-            
-    except Exception as e:
-        logger.warning(f"Error loading modules: {e}")
+    """Register every subsystem and, unless preloading for forked workers, start warming them up"""
+    registry.register('database', _init_database, required=True)
+    for name, factory, start in (
+        ('torch', _init_torch, None),
+        ('planet_detector', _init_planet_detector, None),
+        ('comfy_client', _init_comfy_client, lambda client: client.start_listener()),
+        ('model_manager', _init_model_manager, _start_model_manager),
+        ('asset_cache', _init_asset_cache, None),
+        ('supabase', _init_supabase, None),
+        ('search_index', _init_search_index, _start_search_index),
+        ('leaderboard', _init_leaderboard, _start_leaderboard),
+        ('write_buffer', _init_write_buffer, _start_write_buffer),
+    ):
+        registry.register(name, factory, start=start, warm=_warm(name))
+
+    # Cheap hooks are installed right away so no write is missed while components load
+    from modules.supabase_service import supabase_service
+    from modules.search_index import model_search
+    from modules.leaderboard import leaderboard, install_hooks
+    from modules.identity import identity_cache, install_hooks as install_identity_hooks
+    supabase_service.add_write_listener(model_search.on_write)
+    supabase_service.add_write_listener(leaderboard.on_write)
+    install_hooks(leaderboard, User)
+    # Cached JWT identities are dropped when a commit changes the user
+    install_identity_hooks(identity_cache, User)
+
+    if app.config['SERVER_PRELOAD']:
+        # Load everything in the master so workers share it; threads start after fork
+        registry.load_all()
+    elif not (__name__ == '__main__' and os.environ.get('WERKZEUG_RUN_MAIN') != 'true'):
+        # The debug reloader's parent process serves nothing, so it loads nothing
+        registry.warm_up()
+        start_background_services()
+
+def start_background_services():
+    """Let components start their per-process threads (sweeper, watchers, sync, write buffer)"""
+    registry.start_services()
+
+def after_fork():
+    """Called in each worker forked from a preloaded master (see serve.py)"""
+    log_pipeline.after_fork()
+    from modules.supabase_service import supabase_service
+    # Pooled SQLite connections and the Supabase HTTP pool belong to the parent
+    with app.app_context():
+        db.engine.dispose(close=False)
+    supabase_service.reconnect()
+    if app.config['TORCH_THREADS'] and registry.loaded('torch'):
+        registry.get('torch').set_num_threads(app.config['TORCH_THREADS'])
+    start_background_services()
 
 # Initialize modules
 initialize_modules()
 
+# Client-supplied ids are kept if they look like ids; anything else is replaced
+REQUEST_ID_PATTERN = re.compile(r'^[A-Za-z0-9._-]{1,64}$')
+
+@app.before_request
+def assign_request_id():
+    supplied = request.headers.get('X-Request-ID', '')
+    g.request_id = supplied if REQUEST_ID_PATTERN.match(supplied) else uuid.uuid4().hex[:16]
+    set_request_id(g.request_id)
+
+@app.before_request
+def ensure_database():
+    g.request_started = time.perf_counter()
+    # Health probes must answer while the database is still being prepared
+    if request.endpoint not in ('healthz', 'readyz', 'metrics_endpoint'):
+        registry.get('database')
+
+@app.after_request
+def record_request_latency(response):
+    started = g.get('request_started')
+    if started is not None:
+        HTTP_REQUEST_SECONDS.observe(time.perf_counter() - started, endpoint=request.endpoint or 'unmatched',
+                                     method=request.method, status=response.status_code)
+    if g.get('request_id'):
+        response.headers['X-Request-ID'] = g.request_id
+    return response
+
+def _runtime_metrics():
+    """Scrape-time view of queues, caches, GPU memory and startup timings"""
+    from modules.supabase_service import supabase_service
+    from modules.identity import identity_cache, password_hasher
+    from modules.generation.progress import progress_registry
+
+    queue = [({'queue': 'generation_jobs', 'state': state}, count) for state, count in progress_registry.counts().items()]
+    queue.append(({'queue': 'password_hashing', 'state': 'in_flight'}, password_hasher.in_flight))
+    if registry.loaded('write_buffer'):
+        buffered = app.write_buffer.stats()
+        queue.append(({'queue': 'write_buffer', 'state': 'active_rows'}, buffered['active_rows']))
+        queue.append(({'queue': 'write_buffer', 'state': 'journaled_segments'}, buffered['journaled_segments']))
+    logs = log_pipeline.stats()
+    queue.append(({'queue': 'log_records', 'state': 'queued'}, logs['queued']))
+    yield ('queue_depth', 'gauge', 'Items waiting or in progress per queue.', queue)
+    yield ('log_records_dropped_total', 'counter', 'Log records dropped because the queue was full or sampled out.', [
+        ({'reason': 'queue_full'}, logs['dropped_full']),
+        ({'reason': 'sampled'}, logs['dropped_sampled']),
+    ])
+    yield ('password_hash_rejected_total', 'counter', 'Logins turned away because the hashing queue was full.',
+           [({}, password_hasher.rejected)])
+
+    lookups = []
+    query = supabase_service.cache_stats()
+    for result in ('hits', 'stale_hits', 'misses'):
+        lookups.append(({'cache': 'supabase_query', 'result': result}, query.get(result)))
+    identity = identity_cache.stats()
+    lookups.append(({'cache': 'identity', 'result': 'hits'}, identity['hits']))
+    lookups.append(({'cache': 'identity', 'result': 'misses'}, identity['misses']))
+    if registry.loaded('asset_cache'):
+        assets = app.asset_cache.stats()
+        lookups.append(({'cache': 'asset', 'result': 'hits'}, assets['hits']))
+        lookups.append(({'cache': 'asset', 'result': 'misses'}, assets['misses']))
+    yield ('cache_lookups_total', 'counter', 'Cache lookups by result.', lookups)
+
+    if registry.loaded('torch') and registry.get('torch').cuda.is_available():
+        torch = registry.get('torch')
+        yield ('gpu_memory_bytes', 'gauge', 'CUDA memory of this process.', [
+            ({'kind': 'allocated'}, torch.cuda.memory_allocated()),
+            ({'kind': 'reserved'}, torch.cuda.memory_reserved()),
+            ({'kind': 'total'}, torch.cuda.get_device_properties(0).total_memory),
+        ])
+
+    if registry.loaded('model_manager') and app.model_manager.storage is not None:
+        storage = app.model_manager.storage.usage()
+        yield ('storage_bytes', 'gauge', 'Local artifact disk usage and budget.', [
+            ({'kind': 'tracked'}, storage['tracked_bytes']),
+            ({'kind': 'budget'}, storage['budget_bytes']),
+            ({'kind': 'disk_free'}, storage['disk_free_bytes']),
+            ({'kind': 'disk_total'}, storage['disk_total_bytes']),
+        ])
+        yield ('storage_files', 'gauge', 'Tracked local artifacts by upload state.', [
+            ({'state': 'uploaded'}, storage['uploaded_files']),
+            ({'state': 'local_only'}, storage['local_only_files']),
+        ])
+        yield ('storage_evicted_bytes_total', 'counter', 'Bytes evicted to stay within the disk budget.',
+               [({}, storage['evicted_bytes'])])
+        yield ('storage_swept_files_total', 'counter', 'Orphaned temp files deleted.',
+               [({}, storage['swept_temp_files'])])
+
+    components = registry.timings()['components']
+    yield ('component_startup_seconds', 'gauge', 'Time taken to build each subsystem.',
+           [({'component': name, 'status': c['status']}, c['seconds']) for name, c in components.items()])
+
+metrics.add_collector(_runtime_metrics)
+
+@app.route('/metrics')
+def metrics_endpoint():
+    """Prometheus text exposition of this process's metrics"""
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/healthz')
+def healthz():
+    """Liveness: the process is up and serving HTTP"""
+    return jsonify({'status': 'alive'})
+
+@app.route('/readyz')
+def readyz():
+    """Readiness: required components are built and warm-up is over; includes startup timings"""
+    body = registry.timings()
+    body['ready'] = registry.ready()
+    return jsonify(body), 200 if body['ready'] else 503
+
 @app.route('/')
 def index():
     return render_template('index.html')
@@ -149,7 +455,8 @@ def index():
 @app.route('/gpu_status')
 def gpu_status():
     """Endpoint to check GPU status"""
-    if torch.cuda.is_available():
+    torch = registry.get('torch')
+    if torch is not None and torch.cuda.is_available():
         gpu_props = torch.cuda.get_device_properties(0)
         allocated = torch.cuda.memory_allocated() / 1024**3
         cached = torch.cuda.memory_reserved() / 1024**3
@@ -164,8 +471,27 @@ def gpu_status():
     else:
         return jsonify({'available': False})
 
+@app.route('/storage_status')
+def storage_status():
+    """Endpoint to check local artifact disk usage"""
+    if app.model_manager is None or app.model_manager.storage_usage() is None:
+        return jsonify({'available': False})
+    usage = app.model_manager.storage_usage()
+    usage['available'] = True
+    return jsonify(usage)
+
+@app.route('/write_buffer_status')
+def write_buffer_status():
+    """Endpoint to check queued and journaled write-behind rows"""
+    if app.write_buffer is None:
+        return jsonify({'available': False})
+    stats = app.write_buffer.stats()
+    stats['available'] = True
+    return jsonify(stats)
+
 if __name__ == '__main__':
     print("🚀 Starting MajorServer with RTX 3060 Optimization...")
     print("💡 Make sure ComfyUI is running on http://127.0.0.1:8188")
     print("📊 GPU monitoring available at /gpu_status")
+    print("💾 Disk usage available at /storage_status")
     app.run(debug=True, port=5000, host='0.0.0.0')
\ No newline at end of file
@@ -0,0 +1,275 @@
+import math
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import request, jsonify
+from modules.metrics import metrics
+
+ADMISSION_WAIT_SECONDS = metrics.histogram(
+    'admission_wait_seconds', 'Time admitted requests spent queued for a concurrency slot.', ['pool'],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0))
+
+
+class Rejected(Exception):
+    """Request turned away; `status` is 429 (client over its rate) or 503 (server over capacity)"""
+
+    def __init__(self, message, status, retry_after, reason):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = max(1, int(math.ceil(retry_after)))
+        self.reason = reason
+
+
+class TokenBucket:
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def take(self):
+        """Take a token; returns 0 or the seconds until one is available"""
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class RateLimiter:
+    """Token bucket per client key (user or IP); the least recently seen keys are forgotten past `max_keys`"""
+
+    def __init__(self, per_minute, burst, max_keys=10000):
+        self.rate = per_minute / 60.0
+        self.burst = max(1, burst)
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key):
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = TokenBucket(self.rate, self.burst)
+                while len(self._buckets) > self.max_keys:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(key)
+            return bucket.take()
+
+    def __len__(self):
+        return len(self._buckets)
+
+
+class Slot:
+    """A held concurrency slot; `release` is idempotent and feeds the service-time estimate"""
+
+    def __init__(self, limiter):
+        self.limiter = limiter
+        self.started = time.monotonic()
+        self._released = False
+
+    def release(self, record=True):
+        if not self._released:
+            self._released = True
+            self.limiter._release(time.monotonic() - self.started if record else None)
+
+
+class ConcurrencyLimiter:
+    """
+    At most `limit` requests run at once; up to `max_queue` more may wait.
+
+    The queue timeout adapts: a request may only wait as long as it can and
+    still finish within `deadline`, given the recent (EWMA) service time.
+    When the predicted wait for a new arrival already exceeds that budget it
+    is rejected immediately instead of timing out later, so overload turns
+    into fast 503s rather than every caller slowing down together.
+    """
+
+    def __init__(self, name, limit, max_queue=0, deadline=30.0, smoothing=0.2):
+        self.name = name
+        self.limit = max(1, limit)
+        self.max_queue = max_queue
+        self.deadline = deadline
+        self.smoothing = smoothing
+        self.service_seconds = None
+        self.active = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.rejected = {}
+        self._cond = threading.Condition()
+
+    def queue_budget(self):
+        """Seconds a request may still wait for a slot and finish within the deadline"""
+        return max(0.0, self.deadline - (self.service_seconds or 0.0))
+
+    def _predicted_wait(self, position):
+        # Requests ahead of `position` drain `limit` at a time
+        return position / self.limit * (self.service_seconds or 0.0)
+
+    def _reject(self, reason, retry_after, message):
+        self.rejected[reason] = self.rejected.get(reason, 0) + 1
+        raise Rejected(message, 503, retry_after, reason)
+
+    def acquire(self, wait=True):
+        """Take a slot, waiting within the adaptive budget; raises Rejected"""
+        arrived = time.monotonic()
+        with self._cond:
+            if self.active >= self.limit:
+                budget = self.queue_budget() if wait else 0.0
+                predicted = self._predicted_wait(self.waiting + 1)
+                if self.waiting >= self.max_queue or budget <= 0:
+                    self._reject('queue_full', predicted or 1, f"{self.name}: server busy")
+                if predicted > budget:
+                    self._reject('predicted_timeout', predicted, f"{self.name}: server busy")
+                self.waiting += 1
+                try:
+                    while self.active >= self.limit:
+                        remaining = arrived + budget - time.monotonic()
+                        if remaining <= 0:
+                            self._reject('queue_timeout', self._predicted_wait(self.waiting),
+                                         f"{self.name}: timed out waiting for capacity")
+                        self._cond.wait(remaining)
+                finally:
+                    self.waiting -= 1
+            self.active += 1
+            self.admitted += 1
+        ADMISSION_WAIT_SECONDS.observe(time.monotonic() - arrived, pool=self.name)
+        return Slot(self)
+
+    def _release(self, elapsed):
+        with self._cond:
+            self.active -= 1
+            if elapsed is not None:
+                if self.service_seconds is None:
+                    self.service_seconds = elapsed
+                else:
+                    self.service_seconds += self.smoothing * (elapsed - self.service_seconds)
+            self._cond.notify()
+
+    def stats(self):
+        with self._cond:
+            return {
+                'limit': self.limit,
+                'active': self.active,
+                'waiting': self.waiting,
+                'max_queue': self.max_queue,
+                'deadline_seconds': self.deadline,
+                'service_seconds': round(self.service_seconds, 4) if self.service_seconds is not None else None,
+                'queue_budget_seconds': round(self.queue_budget(), 4),
+                'admitted': self.admitted,
+                'rejected': dict(self.rejected)
+            }
+
+
+class AdmissionController:
+    """
+    Named pools of per-endpoint concurrency limits and per-client rate limits.
+
+    Views are wrapped with `admission_control(name)` at import; the pool is
+    configured later from app config. An unconfigured (or disabled) pool
+    admits everything. Limits are per process: with several workers the
+    server-wide capacity is the limit times the number of workers.
+    """
+
+    def __init__(self):
+        self.enabled = True
+        self._limiters = {}
+        self._rates = {}
+        self._rate_rejected = {}
+        self._lock = threading.Lock()
+
+    def configure(self, name, concurrency=0, max_queue=0, deadline=30.0, per_minute=0, burst=1):
+        """concurrency=0 / per_minute=0 leave that limit off"""
+        with self._lock:
+            self._limiters[name] = ConcurrencyLimiter(name, concurrency, max_queue, deadline) if concurrency > 0 else None
+            self._rates[name] = RateLimiter(per_minute, burst) if per_minute > 0 else None
+
+    def admit(self, name, client_key, wait=True):
+        """Check the client's rate, then take a slot; returns a Slot (or None without a concurrency limit)"""
+        if not self.enabled:
+            return None
+        rate = self._rates.get(name)
+        if rate is not None:
+            retry_after = rate.take(client_key)
+            if retry_after > 0:
+                with self._lock:
+                    self._rate_rejected[name] = self._rate_rejected.get(name, 0) + 1
+                raise Rejected(f"{name}: rate limit exceeded", 429, retry_after, 'rate_limited')
+        limiter = self._limiters.get(name)
+        return limiter.acquire(wait=wait) if limiter is not None else None
+
+    def stats(self):
+        with self._lock:
+            names = sorted(set(self._limiters) | set(self._rates))
+            limiters = dict(self._limiters)
+            rates = dict(self._rates)
+            rate_rejected = dict(self._rate_rejected)
+        pools = {}
+        for name in names:
+            pool = limiters[name].stats() if limiters.get(name) is not None else {'rejected': {}}
+            if rate_rejected.get(name):
+                pool['rejected']['rate_limited'] = rate_rejected[name]
+            pool['tracked_clients'] = len(rates[name]) if rates.get(name) is not None else 0
+            pools[name] = pool
+        return {'enabled': self.enabled, 'pools': pools}
+
+    def collect(self):
+        """Metrics collector (see MetricsRegistry)"""
+        pools = self.stats()['pools']
+        limited = {name: pool for name, pool in pools.items() if 'active' in pool}
+        yield ('admission_in_flight', 'gauge', 'Requests holding a concurrency slot.',
+               [({'pool': name}, pool['active']) for name, pool in limited.items()])
+        yield ('admission_queued', 'gauge', 'Requests waiting for a concurrency slot.',
+               [({'pool': name}, pool['waiting']) for name, pool in limited.items()])
+        yield ('admission_queue_budget_seconds', 'gauge', 'Current adaptive queue timeout.',
+               [({'pool': name}, pool['queue_budget_seconds']) for name, pool in limited.items()])
+        yield ('admission_service_seconds', 'gauge', 'Smoothed service time used to predict waits.',
+               [({'pool': name}, pool['service_seconds']) for name, pool in limited.items()])
+        yield ('admission_admitted_total', 'counter', 'Requests admitted.',
+               [({'pool': name}, pool['admitted']) for name, pool in limited.items()])
+        yield ('admission_rejected_total', 'counter', 'Requests rejected by reason.',
+               [({'pool': name, 'reason': reason}, count)
+                for name, pool in pools.items() for reason, count in pool['rejected'].items()])
+
+
+def client_key():
+    """The JWT user when a valid token is sent, else the remote address"""
+    try:
+        from flask_jwt_extended import verify_jwt_in_request, get_jwt_identity
+        verify_jwt_in_request(optional=True)
+        identity = get_jwt_identity()
+    except Exception:
+        identity = None
+    return f"user:{identity}" if identity is not None else f"ip:{request.remote_addr}"
+
+
+def rejection_response(e):
+    return jsonify({'error': str(e), 'reason': e.reason}), e.status, {'Retry-After': str(e.retry_after)}
+
+
+def admission_control(name):
+    """Run the view only if pool `name` admits the request; the slot is held for the view's duration"""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            try:
+                slot = admission.admit(name, client_key())
+            except Rejected as e:
+                return rejection_response(e)
+            try:
+                return view(*args, **kwargs)
+            finally:
+                if slot is not None:
+                    slot.release()
+        return wrapper
+    return decorator
+
+
+# Global instance
+admission = AdmissionController()
+metrics.add_collector(admission.collect)
@@ -0,0 +1,187 @@
+import hmac
+import os
+import threading
+from functools import wraps
+
+from flask import Blueprint, request, jsonify, current_app, g, Response
+from modules.profiling import StackSampler, profile_store, memory_tracker
+
+admin_bp = Blueprint('admin', __name__, url_prefix='/api/admin')
+
+# One sampling session at a time; concurrent samplers would skew each other
+_session_lock = threading.Lock()
+
+GROUP_BY = ('lineno', 'filename', 'traceback')
+
+
+def _authorized():
+    token = current_app.config.get('ADMIN_TOKEN')
+    supplied = request.headers.get('X-Admin-Token', '')
+    return bool(token) and hmac.compare_digest(supplied.encode(), token.encode())
+
+
+def admin_required(view):
+    """ADMIN_TOKEN in the X-Admin-Token header; the endpoints don't exist without one configured"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if not current_app.config.get('ADMIN_TOKEN'):
+            return jsonify({'error': 'Not found'}), 404
+        if not _authorized():
+            return jsonify({'error': 'Admin token required'}), 403
+        return view(*args, **kwargs)
+    return wrapper
+
+
+def _not_here(message):
+    # Profiles and snapshots live in the worker that recorded them; another worker answers 404
+    return jsonify({'error': message, 'worker_pid': os.getpid(),
+                    'hint': 'kept only by the worker that recorded it (the X-Worker-PID it was returned with)'}), 404
+
+
+@admin_bp.after_request
+def add_worker_pid(response):
+    response.headers['X-Worker-PID'] = str(os.getpid())
+    return response
+
+
+def _float_arg(name, default, low, high):
+    return min(max(float(request.args.get(name, default)), low), high)
+
+
+def _profile_response(sampler, profile_id=None):
+    if request.args.get('format') == 'json':
+        body = sampler.summary()
+        if profile_id:
+            body['id'] = profile_id
+        return jsonify(body), 200
+    return Response(sampler.collapsed(), mimetype='text/plain')
+
+
+# --- Stack sampling ---
+
+@admin_bp.route('/profile', methods=['POST'])
+@admin_required
+def profile():
+    """
+    Sample every thread for ?seconds= (default 10) at ?interval_ms= (default 5).
+    Returns collapsed stacks (flamegraph input), or a summary with ?format=json.
+    ?idle=1 keeps threads parked in waits/selects.
+    """
+    try:
+        seconds = _float_arg('seconds', 10, 0.1, current_app.config['PROFILE_MAX_SECONDS'])
+        interval = _float_arg('interval_ms', 5, 1, 1000) / 1000
+    except ValueError:
+        return jsonify({'error': 'seconds and interval_ms must be numbers'}), 400
+
+    if not _session_lock.acquire(blocking=False):
+        return jsonify({'error': 'A profiling session is already running'}), 409
+    try:
+        sampler = StackSampler(interval=interval, include_idle=request.args.get('idle') == '1').run_for(seconds)
+    finally:
+        _session_lock.release()
+    profile_id = profile_store.add(sampler, kind='session', seconds=seconds)
+    return _profile_response(sampler, profile_id)
+
+
+@admin_bp.route('/profiles', methods=['GET'])
+@admin_required
+def list_profiles():
+    return jsonify(profile_store.list()), 200
+
+
+@admin_bp.route('/profiles/<profile_id>', methods=['GET'])
+@admin_required
+def get_profile(profile_id):
+    """A stored profile (session or X-Profile request), collapsed or ?format=json"""
+    stored = profile_store.get(profile_id)
+    if stored is None:
+        return _not_here('Profile not found in this worker')
+    return _profile_response(stored[0], profile_id)
+
+
+@admin_bp.before_app_request
+def start_request_profile():
+    # Opt-in per request: "X-Profile: 1" plus the admin token samples just this request's thread
+    if request.headers.get('X-Profile') == '1' and _authorized():
+        g.request_sampler = StackSampler(interval=0.001, thread_ids=[threading.get_ident()],
+                                         include_idle=True).start()
+
+
+@admin_bp.after_app_request
+def finish_request_profile(response):
+    sampler = g.pop('request_sampler', None)
+    if sampler is not None:
+        sampler.stop()
+        response.headers['X-Profile-Id'] = profile_store.add(
+            sampler, kind='request', endpoint=request.endpoint, method=request.method, path=request.path)
+        response.headers['X-Worker-PID'] = str(os.getpid())
+    return response
+
+
+@admin_bp.teardown_app_request
+def stop_request_profile(exc):
+    # after_request is skipped when the request dies with an unhandled error; never leave a 1 kHz sampler running
+    sampler = g.pop('request_sampler', None)
+    if sampler is not None:
+        sampler.stop()
+
+
+# --- tracemalloc ---
+
+@admin_bp.route('/memory', methods=['GET'])
+@admin_required
+def memory_status():
+    return jsonify(memory_tracker.status()), 200
+
+
+@admin_bp.route('/memory/start', methods=['POST'])
+@admin_required
+def memory_start():
+    """Start tracing allocations, keeping ?frames= (default 25) frames per traceback"""
+    try:
+        frames = int(request.args.get('frames', 25))
+    except ValueError:
+        return jsonify({'error': 'frames must be an integer'}), 400
+    return jsonify(memory_tracker.start(frames=min(max(frames, 1), 100))), 200
+
+
+@admin_bp.route('/memory/stop', methods=['POST'])
+@admin_required
+def memory_stop():
+    return jsonify(memory_tracker.stop()), 200
+
+
+@admin_bp.route('/memory/snapshots', methods=['POST'])
+@admin_required
+def memory_snapshot():
+    """Take a snapshot; returns its id and the ?limit= largest allocation sites"""
+    group_by = request.args.get('group_by', 'lineno')
+    if group_by not in GROUP_BY:
+        return jsonify({'error': f"group_by must be one of {', '.join(GROUP_BY)}"}), 400
+    try:
+        return jsonify(memory_tracker.snapshot(limit=int(request.args.get('limit', 20)), group_by=group_by)), 200
+    except ValueError:
+        return jsonify({'error': 'limit must be an integer'}), 400
+    except RuntimeError as e:
+        return jsonify({'error': str(e)}), 409
+
+
+@admin_bp.route('/memory/diff', methods=['GET'])
+@admin_required
+def memory_diff():
+    """Allocation growth from snapshot ?from= to ?to= (default: a fresh snapshot)"""
+    group_by = request.args.get('group_by', 'lineno')
+    if group_by not in GROUP_BY:
+        return jsonify({'error': f"group_by must be one of {', '.join(GROUP_BY)}"}), 400
+    try:
+        from_id = int(request.args['from'])
+        to_id = int(request.args['to']) if request.args.get('to') else None
+        limit = int(request.args.get('limit', 20))
+    except (KeyError, ValueError):
+        return jsonify({'error': 'from (and optional to, limit) must be integers'}), 400
+    try:
+        return jsonify(memory_tracker.diff(from_id, to_id, limit=limit, group_by=group_by)), 200
+    except KeyError as e:
+        return _not_here(f"Snapshot {e.args[0]} not found in this worker")
+    except RuntimeError as e:
+        return jsonify({'error': str(e)}), 409
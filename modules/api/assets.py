@@ -0,0 +1,84 @@
+from flask import Blueprint, jsonify, current_app, send_file, Response, stream_with_context, url_for
+import os
+
+assets_bp = Blueprint('assets', __name__, url_prefix='/api/assets')
+
+STORAGE_PUBLIC_PATH = '/storage/v1/object/public/'
+
+
+def storage_prefix():
+    """Public object URL prefix of the configured Supabase project"""
+    base = (current_app.config.get('SUPABASE_URL') or os.environ.get('SUPABASE_URL') or '').rstrip('/')
+    return f"{base}{STORAGE_PUBLIC_PATH}" if base else None
+
+
+def proxied_url(model_url):
+    """Rewrite a Supabase Storage URL to the local asset proxy (or return it unchanged)"""
+    prefix = storage_prefix()
+    if not model_url or not prefix or not model_url.startswith(prefix):
+        return model_url
+    object_path = model_url[len(prefix):].split('?', 1)[0]
+    return url_for('assets.proxy_asset', object_path=object_path, _external=True)
+
+
+def is_safe_object_path(object_path):
+    """
+    True when `object_path` names an object under the public storage prefix.
+
+    Dot or empty segments would let the joined URL resolve outside
+    /storage/v1/object/public/ once normalised, and '?', '#' or a backslash
+    would change what the upstream request means.
+    """
+    if any(segment in ('', '.', '..') for segment in object_path.split('/')):
+        return False
+    return not any(c in object_path for c in '?#\\')
+
+
+@assets_bp.route('/<path:object_path>', methods=['GET'])
+def proxy_asset(object_path):
+    """Serve a Supabase Storage object through the local on-disk cache"""
+    cache = getattr(current_app, 'asset_cache', None)
+    prefix = storage_prefix()
+    if cache is None or not prefix:
+        return jsonify({'error': 'Asset proxy disabled'}), 404
+
+    # Only ever fetch from our own storage bucket
+    if not is_safe_object_path(object_path):
+        return jsonify({'error': 'Invalid asset path'}), 400
+    upstream_url = f"{prefix}{object_path}"
+
+    cached = cache.lookup(upstream_url)
+    if cached:
+        path, entry = cached
+        response = send_file(path, mimetype=entry.get('content_type') or 'application/octet-stream',
+                             conditional=True, etag=entry['sha256'], max_age=86400)
+        response.headers['X-Asset-Cache'] = 'HIT'
+        return response
+
+    fetch = cache.fetch(upstream_url)
+    try:
+        content_type, total = cache.wait_for_headers(fetch)
+    except Exception as e:
+        status = getattr(getattr(e, 'response', None), 'status_code', None)
+        if status == 404:
+            return jsonify({'error': 'Asset not found'}), 404
+        return jsonify({'error': f'Upstream fetch failed: {e}'}), 502
+
+    # Ranges are only honoured once the object is on disk; first readers get the full body
+    response = Response(stream_with_context(cache.stream(fetch)),
+                        mimetype=content_type or 'application/octet-stream')
+    if total is not None:
+        response.headers['Content-Length'] = str(total)
+    response.headers['X-Asset-Cache'] = 'MISS'
+    response.headers['Cache-Control'] = 'public, max-age=86400'
+    return response
+
+
+@assets_bp.route('/stats', methods=['GET'])
+def asset_cache_stats():
+    cache = getattr(current_app, 'asset_cache', None)
+    if cache is None:
+        return jsonify({'enabled': False})
+    stats = cache.stats()
+    stats['enabled'] = True
+    return jsonify(stats)
@@ -1,5 +1,9 @@
+import logging
 from flask import Blueprint, jsonify, request
 from modules.supabase_service import supabase_service
+from modules.supabase_async import supabase_async
+
+logger = logging.getLogger(__name__)
 
 
 classroom_api = Blueprint('classroom_api', __name__)
@@ -7,7 +11,12 @@ classroom_api = Blueprint('classroom_api', __name__)
 @classroom_api.route('/api/classroom/<classroom_id>', methods=['GET'])
 def get_classroom(classroom_id):
     try:
-        classroom_data = supabase_service.query_records("classroom", select="*", filters={"id": classroom_id})
+        # The member count doesn't depend on the classroom row: fetch both at once.
+        # Counted server-side: no member rows are transferred
+        classroom_data, member_count = supabase_async.run_all(
+            supabase_async.query_records("classroom", select="*", filters={"id": classroom_id}),
+            supabase_async.count_records("classroom_members", filters={"classroom_id": classroom_id})
+        )
         
         if not classroom_data:
             return jsonify({'error': 'Classroom not found'}), 200
@@ -16,7 +25,7 @@ def get_classroom(classroom_id):
         classroom_details = {
             "classroom": classroom_data[0]['name'],
             "author": classroom_author[0]['user_name'],
-            "count_member": len(classroom_data)
+            "count_member": member_count
         }
         
         return jsonify(classroom_details), 200
@@ -39,7 +48,7 @@ def create_classroom():
         return jsonify(response.data), 201
 
     except Exception as e:
-        print(e)
+        logger.error(f"Failed to create classroom: {e}")
         return jsonify({'error': str(e)}), 500
 
 
@@ -47,7 +56,7 @@ def create_classroom():
 def join_classroom():
     try:
         payload = request.get_json()
-        print(payload)
+        logger.debug("Join classroom request", extra={'payload': payload})
         if not payload:
             return jsonify({"error": "Missing JSON body"}), 400
         
@@ -63,24 +72,28 @@ def join_classroom():
             "classroom_members",
             insert_record
         )
+        # Cached classroom rows embed their member count
+        supabase_service.cache.invalidate("classroom")
 
         return jsonify(response.data), 200
 
     except Exception as e:
-        print(e)
+        logger.error(f"Failed to join classroom: {e}")
         return jsonify({'error': str(e)}), 500
 
 
 @classroom_api.route('/api/classroom_members/<classroom_id>', methods=['GET'])
 def get_classroom_members(classroom_id):
     try:
-        classroom_members = supabase_service.query_records("classroom_members", select="*", filters={"classroom_id": classroom_id})
-        users = []
-        for i in classroom_members:
-            user_data = supabase_service.query_records("users", select="*", filters={"id": i['user_id']})
-            users.extend(user_data)
+        classroom_members = supabase_service.query_records("classroom_members", select="user_id", filters={"classroom_id": classroom_id})
         if not classroom_members:
             return jsonify({'error': 'Classroom members not found'}), 404
+        
+        # One batched lookup instead of a query per member
+        member_ids = [i['user_id'] for i in classroom_members]
+        user_rows = supabase_service.query_records("users", select="*", in_filters={"id": member_ids})
+        users_by_id = {u['id']: u for u in user_rows}
+        users = [users_by_id[user_id] for user_id in member_ids if user_id in users_by_id]
         return jsonify(users), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -91,7 +104,7 @@ def get_classroom_joined(user_id):
     try:
         # 1. Fetch all memberships for this user
         classroom_joined = supabase_service.query_records("classroom_members", select="*", filters={"user_id": user_id})
-        print(classroom_joined)
+        logger.debug("Memberships loaded", extra={'user_id': user_id, 'memberships': len(classroom_joined)})
         # 2. Check immediately if list is empty
         if not classroom_joined:
             return jsonify(classroom_joined), 200
@@ -99,37 +112,40 @@ def get_classroom_joined(user_id):
         # Initialize as a list to return a JSON array
         classrooms = []
         
+        # 3. Fetch details in batches: a constant number of round trips however many classrooms
+        # The two lookups are independent, so they run concurrently.
+        # All memberships here belong to the same user, so one lookup is enough.
+        classroom_ids = [i['classroom_id'] for i in classroom_joined]
+        classroom_rows, user_res = supabase_async.run_all(
+            # Member counts are aggregated by the server in the same select
+            supabase_async.query_records("classroom", select="id, name, classroom_members(count)",
+                                         in_filters={"id": classroom_ids}),
+            supabase_async.query_records("users", select="user_name", filters={"id": user_id})
+        )
+        classroom_names = {c['id']: c['name'] for c in classroom_rows}
+        member_counts = {c['id']: (c.get('classroom_members') or [{}])[0].get('count', 0) for c in classroom_rows}
+        
         for i in classroom_joined:
-            # 3. Fetch details safely
-            classroom_res = supabase_service.query_records("classroom", select="name", filters={"id": i['classroom_id']})
-            
-            # Note: Fetching user details using i['user_id'] gets the member's name.
-            user_res = supabase_service.query_records("users", select="user_name", filters={"id": i['user_id']})
-
-            # Fetch members to count them.
-            members_res = supabase_service.query_records("classroom_members", select="id", filters={"classroom_id": i['classroom_id']})
-            member_count = len(members_res) if members_res else 0
-
             # 4. Check if records exist before accessing [0]
-            if classroom_res and user_res:
+            if i['classroom_id'] in classroom_names and user_res:
                 # Construct a dictionary directly (JSON serializable)
                 # DO NOT use a custom class instance here.
                 joined_classroom = {
                     "classroom_id": i['classroom_id'],
-                    "name": classroom_res[0]['name'],
+                    "name": classroom_names[i['classroom_id']],
                     "author": user_res[0]['user_name'],
-                    "count_member": member_count
+                    "count_member": member_counts.get(i['classroom_id'], 0)
                 }
                 classrooms.append(joined_classroom)
             else:
                 # Log or handle inconsistent data
-                print(f"Data inconsistency found for member record: {i}")
+                logger.warning(f"Data inconsistency found for member record: {i}")
                 continue
             
         return jsonify(classrooms), 200
 
     except Exception as e:
-        print(f"Error in get_classroom_joined: {e}") # Print error to console for debugging
+        logger.error(f"Error in get_classroom_joined: {e}")
         return jsonify({'error': str(e)}), 500
 
 @classroom_api.route('/api/classroommodels/<classroom_id>', methods=['GET'])
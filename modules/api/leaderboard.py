@@ -0,0 +1,66 @@
+from flask import Blueprint, request, jsonify
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from modules.leaderboard import leaderboard
+
+leaderboard_bp = Blueprint('leaderboard', __name__, url_prefix='/api/leaderboard')
+
+MAX_LIMIT = 100
+MAX_RADIUS = 25
+
+
+def _int_arg(name, default, maximum):
+    value = int(request.args.get(name, default))
+    return min(max(value, 0), maximum)
+
+
+@leaderboard_bp.route('', methods=['GET'])
+def global_top():
+    """Top users by XP: ?limit=10&offset=0"""
+    try:
+        limit = _int_arg('limit', 10, MAX_LIMIT)
+        offset = _int_arg('offset', 0, 10**9)
+    except ValueError:
+        return jsonify({'error': 'limit and offset must be integers'}), 400
+    return jsonify(leaderboard.top(limit=limit, offset=offset)), 200
+
+
+@leaderboard_bp.route('/me', methods=['GET'])
+@jwt_required()
+def my_standing():
+    """Rank of the logged-in user plus ?radius= neighbours; ?classroom_id= for a classroom board"""
+    try:
+        radius = _int_arg('radius', 5, MAX_RADIUS)
+    except ValueError:
+        return jsonify({'error': 'radius must be an integer'}), 400
+    standing = leaderboard.standing(get_jwt_identity(), radius=radius,
+                                    classroom_id=request.args.get('classroom_id'))
+    if standing is None:
+        return jsonify({'error': 'User not ranked'}), 404
+    return jsonify(standing), 200
+
+
+@leaderboard_bp.route('/users/<user_id>', methods=['GET'])
+def user_standing(user_id):
+    """Rank of any user plus ?radius= neighbours; ?classroom_id= for a classroom board"""
+    try:
+        radius = _int_arg('radius', 5, MAX_RADIUS)
+    except ValueError:
+        return jsonify({'error': 'radius must be an integer'}), 400
+    standing = leaderboard.standing(user_id, radius=radius, classroom_id=request.args.get('classroom_id'))
+    if standing is None:
+        return jsonify({'error': 'User not ranked'}), 404
+    return jsonify(standing), 200
+
+
+@leaderboard_bp.route('/classroom/<classroom_id>', methods=['GET'])
+def classroom_top(classroom_id):
+    """Top members of one classroom: ?limit=10&offset=0"""
+    try:
+        limit = _int_arg('limit', 10, MAX_LIMIT)
+        offset = _int_arg('offset', 0, 10**9)
+    except ValueError:
+        return jsonify({'error': 'limit and offset must be integers'}), 400
+    board = leaderboard.top(limit=limit, offset=offset, classroom_id=classroom_id)
+    if board is None:
+        return jsonify({'error': 'Classroom not found'}), 404
+    return jsonify(board), 200
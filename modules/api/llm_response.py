@@ -1,10 +1,13 @@
 from flask import Blueprint, request, jsonify
 import ollama
 import json
+import logging
 from typing import List, Dict, Union
+from modules.admission import admission_control
 
 
 llm_api = Blueprint('llm_api', __name__)
+logger = logging.getLogger(__name__)
 
 def generate_info_batch(keywords: Union[str, List[str]]) -> List[Dict]:
     """
@@ -58,7 +61,7 @@ def generate_info_batch(keywords: Union[str, List[str]]) -> List[Dict]:
             )
 
             llm_output = response['message']['content']
-            print(f"Raw LLM Output for '{keyword}': {llm_output[:100]}...")
+            logger.debug("Raw LLM output", extra={'keyword': keyword, 'output': llm_output[:100]})
             
             # Parse the JSON
             data = json.loads(llm_output)
@@ -83,10 +86,10 @@ def generate_info_batch(keywords: Union[str, List[str]]) -> List[Dict]:
                 data['facts'].append("Data unavailable")
             
             results.append(data)
-            print(f"✓ Generated info for: {keyword}")
+            logger.debug(f"Generated info for: {keyword}")
             
         except json.JSONDecodeError as e:
-            print(f"✗ JSON Parse Error for '{keyword}': {e}")
+            logger.warning(f"JSON parse error for '{keyword}': {e}")
             results.append({
                 "title": keyword,
                 "summary": "Failed to parse response.",
@@ -94,7 +97,7 @@ def generate_info_batch(keywords: Union[str, List[str]]) -> List[Dict]:
                 "error": "JSON decode error"
             })
         except Exception as e:
-            print(f"✗ Error generating info for '{keyword}': {str(e)}")
+            logger.error(f"Error generating info for '{keyword}': {e}")
             results.append({
                 "title": keyword,
                 "summary": "Failed to generate information.",
@@ -113,6 +116,7 @@ def generate_info_internal(keyword: Union[str, List[str]]) -> List[Dict]:
     return generate_info_batch(keyword)
 
 @llm_api.route('/api/generate_info', methods=['GET'])
+@admission_control('llm')
 def generate_info():
     """
     Public endpoint that wraps the internal function.
@@ -126,5 +130,5 @@ def generate_info():
         return jsonify(data), 200
 
     except Exception as e:
-        print(f"Server Error: {e}")
+        logger.error(f"Server Error: {e}")
         return jsonify({'error': str(e)}), 500
\ No newline at end of file
@@ -1,19 +1,37 @@
-from flask import Blueprint, request, jsonify, send_file, current_app
+from flask import Blueprint, request, jsonify, send_file, current_app, Response, stream_with_context, redirect, url_for
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from modules.models import db, Model, User
+from modules.generation.progress import progress_registry
+from modules.pagination import page_args, page_body, PaginationError
+from modules.metrics import GENERATION_STAGE_SECONDS
+from modules.structured_logging import set_request_id
+from modules.admission import admission, client_key, Rejected, rejection_response
+import logging
 import os
 import uuid
 import time
 import threading
 import json
 
+logger = logging.getLogger(__name__)
+
 # Change prefix to /api to allow /api/models and /api/modelurl
 models_bp = Blueprint('models', __name__, url_prefix='/api')
 
 # --- 1. GET /api/models ---
 @models_bp.route('/models', methods=['GET'])
 def list_models():
-    """List models filtered by subject"""
+    """
+    List models filtered by subject.
+
+    Optional `fields` (comma-separated columns) trims each row; `limit` and/or
+    `cursor` return keyset pages as {"items": [...], "next_cursor": "..."}.
+    """
+    try:
+        page = page_args(request.args, 'model_id')
+    except PaginationError as e:
+        return jsonify({'error': str(e)}), 400
+
     try:
         from modules.supabase_service import supabase_service
         
@@ -27,7 +45,14 @@ def list_models():
         if subject:
             filters['model_subject'] = subject
             
-        models = supabase_service.query_records("models", select="*", filters=filters)
+        if page['limit'] is not None:
+            models, last_id = supabase_service.query_page(
+                "models", "model_id", select=page['select'], filters=filters,
+                limit=page['limit'], after=page['after'], descending=page['descending']
+            )
+            return jsonify(page_body(models, last_id))
+            
+        models = supabase_service.query_records("models", select=page['select'], filters=filters)
         
         # Transform logic if necessary, otherwise return as is.
         # The user requested specific JSON structure. Supabase returns list of dicts.
@@ -38,9 +63,42 @@ def list_models():
         return jsonify(models)
         
     except Exception as e:
-        print(f"❌ Error listing models: {e}")
+        logger.error(f"Error listing models: {e}")
         return jsonify({'error': str(e)}), 500
 
+# --- GET /api/models/search ---
+@models_bp.route('/models/search', methods=['GET'])
+def search_models():
+    """
+    Ranked full-text search over name, description, subject and rarity.
+
+    Query params: q (words; each also matches as a prefix), subject, rarity,
+    offset, limit. Answered from the in-process index with facet counts.
+    """
+    from modules.search_index import model_search
+    from modules.supabase_service import supabase_service
+    
+    try:
+        offset = max(int(request.args.get('offset', 0)), 0)
+        limit = min(max(int(request.args.get('limit', 20)), 1), 100)
+    except ValueError:
+        return jsonify({'error': 'offset and limit must be integers'}), 400
+    
+    if not model_search.loaded:
+        # First query before the background sync finished
+        model_search.sync(supabase_service)
+    
+    start = time.perf_counter()
+    result = model_search.search(
+        request.args.get('q', ''),
+        filters={'model_subject': request.args.get('subject'), 'rarity': request.args.get('rarity')},
+        offset=offset,
+        limit=limit
+    )
+    result['query'] = request.args.get('q', '')
+    result['took_ms'] = round((time.perf_counter() - start) * 1000, 3)
+    return jsonify(result)
+
 # --- 2. GET /api/modelurl ---
 @models_bp.route('/modelurl', methods=['GET'])
 def get_model_url():
@@ -58,11 +116,18 @@ def get_model_url():
         
         if not results:
             return jsonify({'error': 'Model not found'}), 404
+        
+        result = dict(results[0])
+        # Classroom deployments point clients at the local caching proxy instead of Supabase
+        if getattr(current_app, 'asset_cache', None) is not None:
+            from modules.api.assets import proxied_url
+            result['origin_url'] = result.get('model_url')
+            result['model_url'] = proxied_url(result.get('model_url'))
             
-        return jsonify(results[0])
+        return jsonify(result)
         
     except Exception as e:
-        print(f"❌ Error getting model url: {e}")
+        logger.error(f"Error getting model url: {e}")
         return jsonify({'error': str(e)}), 500
 
 
@@ -71,15 +136,63 @@ def get_model_url():
 @models_bp.route('/models/<int:model_id>/download', methods=['GET'])
 @jwt_required()
 def download_model(model_id):
-    """(Legacy) Download local .glb file"""
+    """
+    (Legacy) Download local .glb file.
+
+    Supports ETag revalidation, byte ranges (resumable downloads), precompressed
+    gzip/brotli variants and, when enabled, redirects to a signed storage URL.
+    Requests carrying `?v=<content hash>` are served as immutable.
+    """
+    from modules.generation import delivery
     model = Model.query.get_or_404(model_id)
     # ... existing permissions logic ...
     user_id = int(get_jwt_identity())
     if not model.is_public and model.uploader_id != user_id:
         return jsonify({'error': 'Unauthorized'}), 403
-    if not os.path.exists(model.file_path):
+
+    storage = current_app.model_manager.storage if current_app.model_manager is not None else None
+    remote = storage.remote_for(model.file_path) if storage is not None else None
+    local_exists = os.path.exists(model.file_path)
+
+    # Hand the transfer to storage when configured, or when the local copy was evicted
+    if remote and (current_app.config.get('DOWNLOAD_REDIRECT') or not local_exists):
+        from modules.supabase_service import supabase_service
+        if supabase_service.initialized:
+            try:
+                signed_url = supabase_service.create_signed_url(
+                    "models", remote, current_app.config.get('SIGNED_URL_TTL', 3600))
+                return redirect(signed_url, code=302)
+            except Exception as e:
+                logger.warning(f"Signed URL failed, serving locally: {e}")
+
+    if not local_exists:
         return jsonify({'error': 'File not found on server'}), 404
-    return send_file(model.file_path, as_attachment=True, download_name=f"{model.name}.glb")
+    if current_app.model_manager is not None:
+        current_app.model_manager.touch_model(model.file_path)
+
+    info = delivery.asset_info(model.file_path, storage)
+    digest = info['sha256']
+    immutable_url = url_for('models.download_model', model_id=model_id, v=digest)
+
+    # Byte ranges address the identity representation, so only whole-file requests get variants
+    encoding = None
+    if 'Range' not in request.headers:
+        encoding = delivery.pick_encoding(request.accept_encodings, info['variants'])
+    path = info['variants'][encoding] if encoding else model.file_path
+    etag = f"{digest}-{encoding}" if encoding else digest
+
+    response = send_file(path, mimetype=delivery.GLB_MIMETYPE, as_attachment=True,
+                         download_name=f"{model.name}.glb", conditional=True, etag=etag)
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.headers['Vary'] = 'Accept-Encoding, Authorization'
+    response.headers['Accept-Ranges'] = 'bytes'
+    response.headers['Link'] = f'<{immutable_url}>; rel="canonical"'
+    if request.args.get('v') == digest:
+        response.headers['Cache-Control'] = 'private, max-age=31536000, immutable'
+    else:
+        response.headers['Cache-Control'] = 'private, no-cache'
+    return response
 
 
 # --- Generation Logic ---
@@ -95,31 +208,89 @@ def generate_model():
     prompt = request.form.get('prompt', 'planet') 
     name_input = request.form.get('name') 
     subject_input = request.form.get('subject', 'Astronomy') # Default subject
+    progressive = request.form.get('progressive', str(current_app.config.get('PROGRESSIVE_GENERATION', False)))
+    progressive = progressive.lower() in ('1', 'true', 'yes')
     
     comfy_client = current_app.comfy_client
     if not comfy_client:
         return jsonify({'error': 'Generation service unavailable'}), 503
+
+    # Jobs run in the background, so the slot is held by the job rather than this request
+    try:
+        slot = admission.admit('generate', client_key(), wait=False)
+    except Rejected as e:
+        return rejection_response(e)
         
     # Save temp input
     job_id = str(uuid.uuid4())
     output_dir = current_app.config.get('OUTPUT_DIR', 'models')
     input_path = os.path.join(output_dir, f"temp_gen_input_{job_id}.png")
-    file.save(input_path)
-    
-    # Get user ID
-    user_id = int(get_jwt_identity())
+    try:
+        file.save(input_path)
+        
+        # Get user ID
+        user_id = int(get_jwt_identity())
 
-    thread = threading.Thread(target=run_generation_task, 
-                            args=(current_app._get_current_object(), job_id, input_path, user_id, name_input, subject_input))
-    thread.daemon = True
-    thread.start()
+        progress_registry.create(job_id)
+        thread = threading.Thread(target=run_generation_task, 
+                                args=(current_app._get_current_object(), job_id, input_path, user_id, name_input, subject_input, progressive, slot))
+        thread.daemon = True
+        thread.start()
+    except Exception:
+        if slot is not None:
+            slot.release(record=False)
+        raise
     
     return jsonify({
         'job_id': job_id,
         'status': 'processing',
-        'message': 'Generation started.'
+        'progressive': progressive,
+        'message': 'Generation started.',
+        'events_url': f"/api/models/jobs/{job_id}/events"
     })
 
+
+@models_bp.route('/models/jobs/<job_id>', methods=['GET'])
+def get_job_status(job_id):
+    """Current progress snapshot of a generation job"""
+    job = progress_registry.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job.snapshot())
+
+
+@models_bp.route('/models/jobs/<job_id>/events', methods=['GET'])
+def stream_job_events(job_id):
+    """Server-Sent Events feed of a generation job's progress"""
+    job = progress_registry.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+
+    # EventSource resumes with Last-Event-ID after a reconnect
+    try:
+        last_seq = int(request.headers.get('Last-Event-ID') or request.args.get('after', 0))
+    except ValueError:
+        last_seq = 0
+
+    def event_stream():
+        seq = last_seq
+        yield f"event: snapshot\ndata: {json.dumps(job.snapshot())}\n\n"
+        while True:
+            events = job.wait_for_events(seq, timeout=15)
+            if not events:
+                if job.finished:
+                    return
+                yield ": keep-alive\n\n"
+                continue
+            for event in events:
+                seq = event['seq']
+                yield f"id: {seq}\nevent: {event['event']}\ndata: {json.dumps(event)}\n\n"
+            if job.finished and seq >= len(job.events):
+                return
+
+    return Response(stream_with_context(event_stream()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
 def calculate_rarity():
     import random
     roll = random.random()
@@ -128,110 +299,247 @@ def calculate_rarity():
     elif roll < 0.50: return "Rare", 50
     else: return "Common", 10
 
-def run_generation_task(app, job_id, image_path, user_id, user_provided_name=None, subject='Astronomy'):
-    """Background task for ComfyUI generation"""
+def _wait_for_glb(app, comfy, filename_prefix, progress, tier=None):
+    """Wait for ComfyUI to write `<prefix>*.glb` and move it into GENERATED_DIR"""
+    comfy_output_dir = app.config.get('COMFYUI_OUTPUT_DIR')
+    search_pattern = os.path.join(comfy_output_dir, f"{filename_prefix}*.glb")
+    prefix = 'preview_' if tier == 'preview' else ''
+    
+    waiting_since = time.time()
+    final_glb = comfy.wait_for_completion(search_pattern, progress=progress, tier=tier)
+    if not final_glb:
+        raise RuntimeError(progress.error or progress.tiers.get(tier, {}).get('error') or "Generation timed out")
+    # From ComfyUI starting the prompt (when the websocket reported it) until the GLB was complete
+    generation_started = progress.execution_started_at.get(tier) or waiting_since
+    GENERATION_STAGE_SECONDS.observe(time.time() - generation_started, stage=f"{prefix}generation")
+
+    filename = os.path.basename(final_glb)
+    # Save to GENERATED_DIR
+    dest_path = os.path.join(app.config['GENERATED_DIR'], filename)
+    import shutil
+    with GENERATION_STAGE_SECONDS.time(stage=f"{prefix}move"):
+        shutil.move(final_glb, dest_path)
+    return dest_path
+
+
+def _register_asset(app, path):
+    """Track a generated GLB locally and return its mesh stats (parsed from the GLB header)"""
+    if app.model_manager is not None:
+        return app.model_manager.register_model(path)
+    from modules.generation.glb_inspector import inspect_glb
+    try:
+        return inspect_glb(path)
+    except Exception as e:
+        logger.warning(f"Could not inspect {path}: {e}")
+        return None
+
+
+def _ingest_asset(app, path):
+    """Content hash + precompressed variants for the download path"""
+    from modules.generation import delivery
+    storage = app.model_manager.storage if app.model_manager is not None else None
+    try:
+        return delivery.ingest(path, storage)
+    except Exception as e:
+        logger.warning(f"Asset ingest failed for {path}: {e}")
+        return None
+
+
+def _discard_preview(app, path):
+    """Delete a local preview GLB (and its info record) and drop both from the storage index and catalogue"""
+    info_path = f"{os.path.splitext(path)[0]}_info.json"
+    for artifact in (path, info_path):
+        try:
+            if os.path.exists(artifact):
+                os.remove(artifact)
+        except OSError as e:
+            logger.warning(f"Could not remove preview artifact {artifact}: {e}")
+            continue
+        if app.model_manager is not None and app.model_manager.storage is not None:
+            app.model_manager.storage.forget(artifact)
+    if app.model_manager is not None:
+        app.model_manager.catalogue.refresh_path(path)
+
+
+def _queue_workflow(comfy, job_id, workflow, tier):
+    queued = comfy.queue_prompt(workflow)
+    if not queued:
+        raise RuntimeError("Failed to queue prompt in ComfyUI")
+    progress_registry.watch_prompt(job_id, queued.get('prompt_id'), workflow, tier)
+    return queued
+
+
+def _model_id_from_insert(response):
+    rows = getattr(response, 'data', None) or []
+    return rows[0].get('model_id') if rows else None
+
+
+def run_generation_task(app, job_id, image_path, user_id, user_provided_name=None, subject='Astronomy', progressive=False, slot=None):
+    """
+    Background task for ComfyUI generation.
+
+    In progressive mode a reduced workflow (fewer mesh steps, lower octree
+    resolution, no texture bake) is queued ahead of the full one; its mesh is
+    published as a preview and replaced once the full-quality model lands.
+    """
+    # Log lines of this job carry its id, like a request's do
+    set_request_id(job_id)
     with app.app_context():
+        progress = progress_registry.get(job_id) or progress_registry.create(job_id)
+        dest_path = None
+        preview_path = None
+        record = None
+        record_id = None
+        model_url = None
         try:
             comfy = app.comfy_client
             
             # 1. Upload Input Image to ComfyUI (for processing)
-            image_filename = comfy.upload_image(image_path)
+            progress.set_stage('uploading_input')
+            with GENERATION_STAGE_SECONDS.time(stage='comfyui_upload'):
+                image_filename = comfy.upload_image(image_path)
             
-            # --- SUPABASE: Upload Thumbnail ---
-            # Use the input image as the thumbnail
+            # --- SUPABASE: Upload Thumbnails ---
+            # Render small fixed-size thumbnails from the input image instead of the raw upload
             from modules.supabase_service import supabase_service
-            thumbnail_url = ""
+            from modules.generation.thumbnails import ThumbnailRenderer, default_thumbnail
+            from modules.generation.workflows import load_workflow_template, prepare_workflow, make_preview_workflow
+            thumbnail_urls = {}
             if supabase_service.initialized:
                 try:
-                    # Upload input image to 'models' bucket as thumbnail
-                    thumb_name = f"thumb_{job_id}.png"
-                    thumbnail_url = supabase_service.upload_file("models", image_path, thumb_name)
+                    with GENERATION_STAGE_SECONDS.time(stage='thumbnails'):
+                        thumbnail_urls = ThumbnailRenderer().publish(image_path, supabase_service, bucket="models")
                 except Exception as e:
-                    print(f"⚠️ Thumbnail upload failed: {e}")
+                    logger.warning(f"Thumbnail upload failed: {e}")
+            thumbnail_url = default_thumbnail(thumbnail_urls)
 
-            # 2. Load Workflow
-            wf_path = os.path.join('workflows', 'hunyuan_workflow_api.json')
-            if not os.path.exists(wf_path):
-                wf_path = os.path.join('workflows', 'hunyuan_workflow.json')
-                
-            with open(wf_path, 'r') as f:
-                workflow = json.load(f)
-                
-            # 3. Modify Workflow
-            for node in workflow.values():
-                if node.get('class_type') == 'LoadImage':
-                    node['inputs']['image'] = image_filename
-            
+            # 2. Load & Modify Workflow
             target_prefix = f"gen_{job_id}"
-            for node in workflow.values():
-                if 'filename_prefix' in node.get('inputs', {}):
-                    node['inputs']['filename_prefix'] = target_prefix
+            workflow = prepare_workflow(load_workflow_template(), image_filename, target_prefix)
                     
-            # 4. Queue & Wait
-            comfy.queue_prompt(workflow)
-            
-            comfy_output_dir = app.config.get('COMFYUI_OUTPUT_DIR')
-            search_pattern = os.path.join(comfy_output_dir, f"{target_prefix}*.glb")
-            
-            final_glb = comfy.wait_for_completion(search_pattern)
+            # 3. Queue
+            # ComfyUI executes its queue in order, so queueing the full run right
+            # behind the preview keeps the GPU busy while the preview is published.
+            progress.set_state('queued_in_comfyui')
+            preview_prefix = f"preview_{job_id}"
+            if progressive:
+                preview_workflow = make_preview_workflow(
+                    prepare_workflow(load_workflow_template(), image_filename, preview_prefix),
+                    steps=app.config.get('PREVIEW_MESH_STEPS', 20),
+                    octree_resolution=app.config.get('PREVIEW_OCTREE_RESOLUTION', 256)
+                )
+                _queue_workflow(comfy, job_id, preview_workflow, 'preview')
+                progress.set_tier('preview', 'queued')
+            _queue_workflow(comfy, job_id, workflow, 'full')
+            progress.set_tier('full', 'queued')
+
+            # Determine Final Name
+            final_name = user_provided_name if user_provided_name else f"Generated Model {job_id[:8]}"
+            # Calculate Rarity
+            rarity_name, xp_val = calculate_rarity()
+
+            # Insert Record
+            # Schema: model_name, description, model_url, rarity, xp_reward, metadata, model_subject, model_thumbnail, min_level
+            record = {
+                "model_name": final_name,
+                "description": "Generated via ComfyUI",
+                "model_url": None,
+                "rarity": rarity_name,
+                "xp_reward": xp_val,
+                "model_subject": subject,
+                "model_thumbnail": thumbnail_url,
+                "min_level": 1, 
+                "uploader_id": str(uuid.uuid4()), # Placeholder UUID or real user UUID if linked
+                "metadata": {
+                    "job_id": job_id,
+                    "prompt": "Generated",
+                    "thumbnails": thumbnail_urls
+                }
+            }
             
-            if final_glb:
-                filename = os.path.basename(final_glb)
-                # Save to GENERATED_DIR
-                dest_path = os.path.join(app.config['GENERATED_DIR'], filename)
-                import shutil
-                shutil.move(final_glb, dest_path)
-                
-                # Determine Final Name
-                final_name = user_provided_name if user_provided_name else f"Generated Model {job_id[:8]}"
-                
-                # --- SUPABASE INTEGRATION ---
+            # Note: uploader_id in new schema is UUID. 'user_id' from JWT was int (from SQLite).
+            # If we are mixing systems, we might need a valid UUID. 
+            # For now, generating a random one or handling it at DB level if nullable.
+            # User schema says 'uploader_id' (uuid).
+
+            # 4a. Preview tier (progressive mode only)
+            if progressive:
                 try:
+                    preview_path = _wait_for_glb(app, comfy, preview_prefix, progress, tier='preview')
+                    record["metadata"]["preview_stats"] = _register_asset(app, preview_path)
+                    preview_url = None
                     if supabase_service.initialized:
-                        # Upload Model File
+                        progress.set_stage('uploading_preview')
+                        with GENERATION_STAGE_SECONDS.time(stage='preview_supabase_upload'):
+                            preview_url = supabase_service.upload_file("models", preview_path, os.path.basename(preview_path))
+                        record["model_url"] = preview_url
+                        record["metadata"]["tier"] = "preview"
+                        record_id = _model_id_from_insert(supabase_service.insert_record("models", record))
+                        logger.info(f"Preview published for job {job_id}: {preview_url}")
+                    progress.set_tier('preview', 'completed', model_url=preview_url)
+                except Exception as e:
+                    # A failed preview must not take the full-quality run down with it
+                    logger.warning(f"Preview tier failed for job {job_id}: {e}")
+                    progress.set_tier('preview', 'failed', error=str(e))
+
+            # 4b. Full-quality tier
+            dest_path = _wait_for_glb(app, comfy, target_prefix, progress, tier='full')
+            filename = os.path.basename(dest_path)
+            record["metadata"]["stats"] = _register_asset(app, dest_path)
+            _ingest_asset(app, dest_path)
+            
+            # --- SUPABASE INTEGRATION ---
+            try:
+                if supabase_service.initialized:
+                    # Upload Model File
+                    progress.set_stage('uploading_model')
+                    with GENERATION_STAGE_SECONDS.time(stage='supabase_upload'):
                         model_url = supabase_service.upload_file("models", dest_path, filename)
-                        print(f"✓ Uploaded Model to Supabase: {model_url}")
-                        
-                        # Calculate Rarity
-                        rarity_name, xp_val = calculate_rarity()
-                        
-                        # Insert Record
-                        # Schema: model_name, description, model_url, rarity, xp_reward, metadata, model_subject, model_thumbnail, min_level
-                        record = {
-                            "model_name": final_name,
-                            "description": "Generated via ComfyUI",
+                    logger.info(f"Uploaded model to Supabase: {model_url}")
+                    if app.model_manager is not None:
+                        app.model_manager.mark_uploaded(dest_path, remote=filename)
+                    
+                    record["model_url"] = model_url
+                    record["metadata"]["tier"] = "full"
+                    if record_id is not None:
+                        # Replace the preview asset in place
+                        supabase_service.update_records("models", {
                             "model_url": model_url,
-                            "rarity": rarity_name,
-                            "xp_reward": xp_val,
-                            "model_subject": subject,
-                            "model_thumbnail": thumbnail_url,
-                            "min_level": 1, 
-                            "uploader_id": str(uuid.uuid4()), # Placeholder UUID or real user UUID if linked
-                            "metadata": {
-                                "job_id": job_id,
-                                "prompt": "Generated"
-                            }
-                        }
-                        
-                        # Note: uploader_id in new schema is UUID. 'user_id' from JWT was int (from SQLite).
-                        # If we are mixing systems, we might need a valid UUID. 
-                        # For now, generating a random one or handling it at DB level if nullable.
-                        # User schema says 'uploader_id' (uuid).
-                        
-                        supabase_service.insert_record("models", record)
-                        print(f"✓ Record inserted into Supabase DB")
+                            "metadata": record["metadata"]
+                        }, {"model_id": record_id})
+                        logger.info("Preview replaced with full-quality model in Supabase DB")
                     else:
-                        print("⚠️ Supabase not initialized.")
-                        
-                except Exception as e:
-                    print(f"⚠️ Supabase processing failed: {e}")
-                    # Fallback to local DB (using old schema? might fail if table changed)
-                    # We skip fallback for now as schema diverged too much.
+                        supabase_service.insert_record("models", record)
+                        logger.info("Record inserted into Supabase DB")
+                else:
+                    logger.warning("Supabase not initialized.")
+                    
+            except Exception as e:
+                logger.warning(f"Supabase processing failed: {e}")
+                # Fallback to local DB (using old schema? might fail if table changed)
+                # We skip fallback for now as schema diverged too much.
 
-            print(f"Job {job_id} complete: {dest_path}")
+            progress.set_tier('full', 'completed', model_url=model_url, local_path=dest_path)
+            logger.info(f"Job {job_id} complete: {dest_path}")
+            progress.complete(model_url=model_url, thumbnails=thumbnail_urls, local_path=dest_path)
+            GENERATION_STAGE_SECONDS.observe(progress.finished_at - progress.started_at, stage='total')
+            logger.info(f"Job {job_id} finished", extra={'job_id': job_id, 'stage_timings': progress.snapshot()['stage_timings']})
                 
         except Exception as e:
-            print(f"Job {job_id} failed: {e}")
+            logger.error(f"Job {job_id} failed: {e}")
+            progress.fail(e)
+            if record_id is not None:
+                # The published preview is all this job will produce; say so in its record
+                try:
+                    record["metadata"]["full_tier"] = {"status": "failed", "error": str(e)}
+                    supabase_service.update_records("models", {"metadata": record["metadata"]}, {"model_id": record_id})
+                except Exception as update_error:
+                    logger.warning(f"Could not mark preview record {record_id} as final: {update_error}")
         finally:
+            # The published preview (if any) stays in Supabase; the local copy is never needed again
+            if preview_path:
+                _discard_preview(app, preview_path)
+            if slot is not None:
+                slot.release()
             if os.path.exists(image_path):
                 os.remove(image_path)
@@ -1,20 +1,37 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
+import logging
 import os
+import time
 import uuid
+from datetime import datetime, timezone
 from modules.models import db, User
 # We need to access the global planet_detector from app context or a shared module
 # Ideally, we should move the detector initialization to a shared location or use current_app
 from flask import current_app
 from modules.api.llm_response import generate_info_internal
+from modules.metrics import SCAN_STAGE_SECONDS
+from modules.admission import admission_control
 
 OLLAMA_BASE_URL = "http://localhost:11434"
 OLLAMA_MODEL = "starcoder2:3b"
 
 scan_bp = Blueprint('scan', __name__, url_prefix='/api/scan')
+logger = logging.getLogger(__name__)
+
+def _record_scan(row):
+    """Queue one scan telemetry row; never fails the scan itself"""
+    write_buffer = getattr(current_app, 'write_buffer', None)
+    if write_buffer is None or not current_app.config.get('SCAN_TELEMETRY'):
+        return
+    try:
+        write_buffer.enqueue(current_app.config['SCAN_TELEMETRY_TABLE'], row)
+    except Exception as e:
+        logger.warning(f"Scan telemetry dropped: {e}")
 
 @scan_bp.route('', methods=['POST'])
 # @jwt_required()
+@admission_control('scan')
 def scan_image():
     """
     Upload an image -> Detect Planets -> Generate Info via LLM for ALL detections -> Return Combined Data
@@ -39,11 +56,26 @@ def scan_image():
         os.makedirs(output_dir)
         
     temp_path = os.path.join(output_dir, f"temp_scan_{temp_id}.png")
+    received = time.perf_counter()
     file.save(temp_path)
+    SCAN_STAGE_SECONDS.observe(time.perf_counter() - received, stage='save')
     
     try:
+        started = time.perf_counter()
         # 1. Run detection
         result = detector.detect_and_classify_planets(temp_path)
+        detect_ms = (time.perf_counter() - started) * 1000
+        # Split detection into decode (image read + letterbox), inference and NMS
+        timings = result.get('timings') or {}
+        if timings:
+            inference_ms = timings.get('inference', 0.0)
+            nms_ms = timings.get('postprocess', 0.0)
+            SCAN_STAGE_SECONDS.observe(max(detect_ms - inference_ms - nms_ms, 0.0) / 1000, stage='decode')
+            SCAN_STAGE_SECONDS.observe(inference_ms / 1000, stage='inference')
+        else:
+            SCAN_STAGE_SECONDS.observe(detect_ms / 1000, stage='inference')
+            nms_ms = 0.0
+        postprocess_started = time.perf_counter()
         
         # Cleanup immediately
         if os.path.exists(temp_path):
@@ -72,16 +104,18 @@ def scan_image():
                 if conf > highest_confidence:
                     highest_confidence = conf
                     best_match_name = class_name
+        SCAN_STAGE_SECONDS.observe(nms_ms / 1000 + time.perf_counter() - postprocess_started, stage='postprocess')
         
         # 3. Generate Info for ALL detected objects
         llm_info = []
         if detected_names:
+            llm_started = time.perf_counter()
             try:
-                print(f"Generating info for detected objects: {detected_names}")
+                logger.debug("Generating info for detected objects", extra={'detected': detected_names})
                 # Pass all detected names to generate info for each one
                 llm_info = generate_info_internal(detected_names)
             except Exception as e:
-                print(f"LLM Generation failed: {e}")
+                logger.error(f"LLM generation failed: {e}")
                 # Fallback: create empty info for each detection
                 llm_info = [{
                     "title": name,
@@ -89,6 +123,7 @@ def scan_image():
                     "facts": ["Data unavailable", "Data unavailable", "Data unavailable"],
                     "error": str(e)
                 } for name in detected_names]
+            SCAN_STAGE_SECONDS.observe(time.perf_counter() - llm_started, stage='llm')
 
         # 4. Construct Final Response
         response_data = {
@@ -98,12 +133,24 @@ def scan_image():
             'info': llm_info,  # Now returns array of info objects
             'count': len(detections)
         }
-        print(response_data)
+        logger.debug("Scan result", extra={'count': len(detections), 'best_match': best_match_name,
+                                           'confidence': highest_confidence})
+        SCAN_STAGE_SECONDS.observe(time.perf_counter() - received, stage='total')
+        
+        _record_scan({
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "detection_count": len(detections),
+            "best_match": best_match_name,
+            "confidence": highest_confidence,
+            "detected": detected_names,
+            "detect_ms": round(detect_ms, 1),
+            "total_ms": round((time.perf_counter() - started) * 1000, 1)
+        })
         
         return jsonify(response_data), 200
         
     except Exception as e:
         if os.path.exists(temp_path):
             os.remove(temp_path)
-        print(f"Scan Error: {e}")
+        logger.error(f"Scan error: {e}")
         return jsonify({'error': str(e)}), 500
\ No newline at end of file
@@ -1,15 +1,33 @@
 from flask import Blueprint, request, jsonify, current_app
 from modules.supabase_service import supabase_service
+from modules.pagination import page_args, page_body, PaginationError
 
 users_bp = Blueprint('users', __name__, url_prefix='/api')
 
 @users_bp.route('/users', methods=['GET'])
 def get_all_users():
-    """List all users from Supabase"""
+    """
+    List users from Supabase.
+
+    Optional `fields` (comma-separated columns) trims each row. Passing
+    `limit` and/or `cursor` switches to keyset pages:
+    {"items": [...], "next_cursor": "..."}; without them the full list is returned.
+    """
+    try:
+        page = page_args(request.args, 'id')
+    except PaginationError as e:
+        return jsonify({"error": str(e)}), 400
+
     try:
-        # Fetch all users from 'users' table
-        users = supabase_service.query_records('users', select='*')
-        return jsonify(users), 200
+        if page['limit'] is None:
+            users = supabase_service.query_records('users', select=page['select'])
+            return jsonify(users), 200
+
+        users, last_id = supabase_service.query_page(
+            'users', 'id', select=page['select'], limit=page['limit'],
+            after=page['after'], descending=page['descending']
+        )
+        return jsonify(page_body(users, last_id)), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -0,0 +1,289 @@
+import hashlib
+import logging
+import os
+import shutil
+import threading
+import time
+import uuid
+
+import requests
+
+from modules.shared_files import exclusive_lock, read_json, write_json
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 256 * 1024
+INDEX_FILENAME = 'index.json'
+# Partial downloads untouched this long belong to a dead process
+PARTIAL_MAX_AGE = 600
+
+
+class _Fetch:
+    """One in-flight upstream download that any number of clients can read while it grows"""
+
+    def __init__(self, url, part_path):
+        self.url = url
+        self.part_path = part_path
+        self.written = 0
+        self.total = None
+        self.content_type = None
+        self.done = False
+        self.error = None
+        self.blob_path = None
+        self.cond = threading.Condition()
+
+
+class AssetCache:
+    """
+    On-disk, content-addressed LRU cache for Supabase Storage objects.
+
+    The first request for an object starts one upstream download in a
+    background thread; that request and any concurrent ones stream from the
+    partially written file. Finished objects are stored under their SHA-256
+    and evicted least-recently-used once the byte budget is exceeded.
+
+    Server workers share the cache directory. Each keeps its own index in
+    memory and merges it with index.json under a file lock when it commits a
+    download, so objects cached by other workers are picked up and kept.
+    """
+
+    def __init__(self, cache_dir="asset_cache", budget_bytes=2 * 1024**3, timeout=30):
+        self.cache_dir = cache_dir
+        self.budget_bytes = budget_bytes
+        self.timeout = timeout
+        self.index_path = os.path.join(cache_dir, INDEX_FILENAME)
+        self.hits = 0
+        self.misses = 0
+        self.shared_fetches = 0
+        self.evictions = 0
+        self._index = {}
+        self._inflight = {}
+        self._lock = threading.RLock()
+        self._session = requests.Session()
+        os.makedirs(os.path.join(cache_dir, 'tmp'), exist_ok=True)
+        self._load()
+        self._clean_partials()
+
+    # --- Index ---
+
+    def _load(self):
+        if os.path.exists(self.index_path):
+            index = read_json(self.index_path)
+            if index is None:
+                logger.warning("Asset cache index unreadable, starting empty")
+            self._index = index or {}
+        self._drop_missing()
+
+    def _drop_missing(self):
+        # Entries whose blob vanished (evicted by another worker, or deleted by hand)
+        self._index = {url: e for url, e in self._index.items() if os.path.exists(self._blob_path(e['sha256']))}
+
+    def _save(self):
+        """Merge with the shared index, evict down to the budget and write it back; called with self._lock held"""
+        with exclusive_lock(self.index_path):
+            for url, theirs in (read_json(self.index_path) or {}).items():
+                ours = self._index.get(url)
+                if ours is None or theirs['created'] > ours['created']:
+                    if ours is not None:
+                        theirs['last_access'] = max(theirs['last_access'], ours['last_access'])
+                    self._index[url] = theirs
+                else:
+                    ours['last_access'] = max(ours['last_access'], theirs['last_access'])
+            self._drop_missing()
+            self._evict()
+            write_json(self.index_path, self._index)
+
+    def _clean_partials(self):
+        # Other workers may be streaming into their partials right now; only clear stale ones
+        tmp_dir = os.path.join(self.cache_dir, 'tmp')
+        cutoff = time.time() - PARTIAL_MAX_AGE
+        for name in os.listdir(tmp_dir):
+            try:
+                path = os.path.join(tmp_dir, name)
+                if os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+            except OSError:
+                pass
+
+    def _blob_path(self, sha256):
+        return os.path.join(self.cache_dir, sha256[:2], sha256)
+
+    # --- Lookup ---
+
+    def lookup(self, url):
+        """Cached (blob path, entry) for `url`, or None. Counts as an access."""
+        with self._lock:
+            entry = self._index.get(url)
+            if entry is None:
+                return None
+            path = self._blob_path(entry['sha256'])
+            if not os.path.exists(path):
+                del self._index[url]
+                return None
+            entry['last_access'] = time.time()
+            self.hits += 1
+            return path, dict(entry)
+
+    def fetch(self, url):
+        """Return the in-flight fetch for `url`, starting one if none is running"""
+        with self._lock:
+            fetch = self._inflight.get(url)
+            if fetch is not None:
+                self.shared_fetches += 1
+                return fetch
+            self.misses += 1
+            part_path = os.path.join(self.cache_dir, 'tmp', f"{uuid.uuid4().hex}.part")
+            fetch = _Fetch(url, part_path)
+            self._inflight[url] = fetch
+        threading.Thread(target=self._download, args=(fetch,), daemon=True).start()
+        return fetch
+
+    # --- Upstream download ---
+
+    def _download(self, fetch):
+        digest = hashlib.sha256()
+        try:
+            with self._session.get(fetch.url, stream=True, timeout=self.timeout) as resp:
+                resp.raise_for_status()
+                with fetch.cond:
+                    fetch.content_type = resp.headers.get('Content-Type')
+                    length = resp.headers.get('Content-Length')
+                    fetch.total = int(length) if length and length.isdigit() else None
+                    fetch.cond.notify_all()
+                with open(fetch.part_path, 'wb') as f:
+                    for chunk in resp.iter_content(CHUNK_SIZE):
+                        if not chunk:
+                            continue
+                        f.write(chunk)
+                        f.flush()
+                        digest.update(chunk)
+                        with fetch.cond:
+                            fetch.written += len(chunk)
+                            fetch.cond.notify_all()
+            self._commit(fetch, digest.hexdigest())
+        except Exception as e:
+            logger.error(f"Asset proxy fetch failed for {fetch.url}: {e}")
+            with fetch.cond:
+                fetch.error = e
+        finally:
+            with self._lock:
+                self._inflight.pop(fetch.url, None)
+            with fetch.cond:
+                fetch.done = True
+                fetch.cond.notify_all()
+
+    def _commit(self, fetch, sha256):
+        blob_path = self._blob_path(sha256)
+        os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+        if os.path.exists(blob_path):
+            # Same content under another URL: keep the existing blob
+            self._discard(fetch.part_path)
+        else:
+            try:
+                os.replace(fetch.part_path, blob_path)
+            except PermissionError:
+                # Windows refuses to rename files other readers still hold open
+                shutil.copyfile(fetch.part_path, blob_path)
+                self._discard(fetch.part_path)
+        now = time.time()
+        with self._lock:
+            self._index[fetch.url] = {
+                'sha256': sha256,
+                'size': fetch.written,
+                'content_type': fetch.content_type,
+                'created': now,
+                'last_access': now
+            }
+            self._save()
+        fetch.blob_path = blob_path
+
+    @staticmethod
+    def _discard(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass  # Still open elsewhere; cleared on next start
+
+    def _evict(self):
+        # Blobs can be shared by several URLs, so budget by unique content
+        blobs = {}
+        for url, entry in self._index.items():
+            blob = blobs.setdefault(entry['sha256'], {'size': entry['size'], 'last_access': 0, 'urls': []})
+            blob['last_access'] = max(blob['last_access'], entry['last_access'])
+            blob['urls'].append(url)
+        total = sum(b['size'] for b in blobs.values())
+        for sha256, blob in sorted(blobs.items(), key=lambda item: item[1]['last_access']):
+            if total <= self.budget_bytes:
+                break
+            self._discard(self._blob_path(sha256))
+            for url in blob['urls']:
+                del self._index[url]
+            total -= blob['size']
+            self.evictions += 1
+
+    # --- Streaming ---
+
+    def stream(self, fetch):
+        """Yield the object's bytes as they arrive, from the shared partial file"""
+        with fetch.cond:
+            while not fetch.done and fetch.written == 0 and fetch.error is None:
+                fetch.cond.wait(self.timeout)
+        if fetch.error is not None and fetch.written == 0:
+            raise fetch.error
+
+        sent = 0
+        with self._open_fetch(fetch) as f:
+            while True:
+                with fetch.cond:
+                    while sent >= fetch.written and not fetch.done:
+                        fetch.cond.wait(self.timeout)
+                    available = fetch.written
+                    done = fetch.done
+                    error = fetch.error
+                if error is not None:
+                    raise error
+                while sent < available:
+                    chunk = f.read(min(CHUNK_SIZE, available - sent))
+                    if not chunk:
+                        break
+                    sent += len(chunk)
+                    yield chunk
+                if done and sent >= available:
+                    return
+
+    def _open_fetch(self, fetch):
+        try:
+            return open(fetch.part_path, 'rb')
+        except FileNotFoundError:
+            # Finished and renamed into place between our checks
+            with fetch.cond:
+                while not fetch.done:
+                    fetch.cond.wait(self.timeout)
+            if fetch.blob_path is None:
+                raise fetch.error or FileNotFoundError(fetch.part_path)
+            return open(fetch.blob_path, 'rb')
+
+    def wait_for_headers(self, fetch):
+        """Block until the upstream response headers (type/length) are known"""
+        with fetch.cond:
+            while fetch.content_type is None and not fetch.done and fetch.error is None:
+                fetch.cond.wait(self.timeout)
+        if fetch.error is not None:
+            raise fetch.error
+        return fetch.content_type, fetch.total
+
+    # --- Reporting ---
+
+    def stats(self):
+        with self._lock:
+            cached_bytes = sum({e['sha256']: e['size'] for e in self._index.values()}.values())
+            return {
+                'entries': len(self._index),
+                'cached_bytes': cached_bytes,
+                'budget_bytes': self.budget_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'shared_fetches': self.shared_fetches,
+                'evictions': self.evictions,
+                'inflight': len(self._inflight)
+            }
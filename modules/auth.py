@@ -1,7 +1,7 @@
 from flask import Blueprint, request, jsonify
-from werkzeug.security import generate_password_hash, check_password_hash
-from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
+from flask_jwt_extended import create_access_token, jwt_required
 from modules.models import db, User
+from modules.identity import password_hasher, current_identity, HasherBusy
 import datetime
 
 auth_bp = Blueprint('auth', __name__, url_prefix='/api/auth')
@@ -20,7 +20,10 @@ def register():
     if User.query.filter_by(username=username).first():
         return jsonify({"msg": "Username already exists"}), 400
         
-    hashed_password = generate_password_hash(password)
+    try:
+        hashed_password = password_hasher.hash(password)
+    except HasherBusy as e:
+        return jsonify({"msg": str(e)}), 503, {'Retry-After': '1'}
     new_user = User(username=username, password_hash=hashed_password, role=role)
     
     db.session.add(new_user)
@@ -37,8 +40,23 @@ def login():
     
     user = User.query.filter_by(username=username).first()
     
-    if not user or not check_password_hash(user.password_hash, password):
+    if not user or not password:
         return jsonify({"msg": "Bad username or password"}), 401
+    
+    # The KDF runs on the bounded hashing pool, not on this request thread
+    try:
+        if not password_hasher.verify(user.password_hash, password):
+            return jsonify({"msg": "Bad username or password"}), 401
+    except HasherBusy as e:
+        return jsonify({"msg": str(e)}), 503, {'Retry-After': '1'}
+    
+    try:
+        if password_hasher.needs_rehash(user.password_hash):
+            # Move the stored hash to the configured method/cost
+            user.password_hash = password_hasher.hash(password)
+            db.session.commit()
+    except HasherBusy:
+        pass  # Upgrade on a later login
         
     access_token = create_access_token(identity=str(user.id), expires_delta=datetime.timedelta(days=7))
     return jsonify(access_token=access_token, role=user.role, username=user.username), 200
@@ -46,13 +64,9 @@ def login():
 @auth_bp.route('/me', methods=['GET'])
 @jwt_required()
 def get_current_user_info():
-    current_user_id = get_jwt_identity()
-    user = User.query.get(current_user_id)
-    
-    return jsonify({
-        "id": user.id,
-        "username": user.username,
-        "role": user.role,
-        "xp": user.xp,
-        "level": user.level
-    }), 200
+    # Served from the identity cache; invalidated when XP/level/role change
+    identity = current_identity()
+    if identity is None:
+        return jsonify({"msg": "User not found"}), 404
+    
+    return jsonify(identity), 200
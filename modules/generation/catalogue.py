@@ -0,0 +1,282 @@
+import json
+import logging
+import os
+import threading
+import time
+
+from modules.shared_files import exclusive_lock, write_json
+
+logger = logging.getLogger(__name__)
+
+try:
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+except ImportError:  # optional: falls back to polling the directory mtime
+    Observer = None
+    FileSystemEventHandler = object
+
+SNAPSHOT_FILENAME = '.catalogue.json'
+INFO_SUFFIX = '_info.json'
+SORT_KEYS = ('created', 'name', 'size', 'subject', 'triangles')
+
+
+class _CatalogueEventHandler(FileSystemEventHandler):
+    def __init__(self, catalogue):
+        self.catalogue = catalogue
+
+    def on_any_event(self, event):
+        if event.is_directory:
+            return
+        for path in (getattr(event, 'src_path', None), getattr(event, 'dest_path', None)):
+            if path:
+                self.catalogue.refresh_path(path)
+
+
+class ModelCatalogue:
+    """
+    In-memory index of the generated models directory.
+
+    Listings are answered from memory. The index is kept current by explicit
+    updates from ModelManager and by directory change notifications (watchdog,
+    or a cheap directory-mtime poll when watchdog is not installed), and is
+    snapshotted to disk so restarts don't need a full rescan.
+
+    Server workers share the snapshot file. It is only a cold-start hint
+    (sync_names reconciles it with the directory on load), so writes are
+    serialised with a file lock and the last writer's view is kept.
+    """
+
+    def __init__(self, models_dir, snapshot_delay=2.0, poll_interval=5.0):
+        self.models_dir = models_dir
+        self.snapshot_path = os.path.join(models_dir, SNAPSHOT_FILENAME)
+        self.snapshot_delay = snapshot_delay
+        self.poll_interval = poll_interval
+        self._entries = {}
+        self._lock = threading.RLock()
+        self._snapshot_timer = None
+        self._observer = None
+        self._dir_mtime = None
+        if self._load_snapshot():
+            self.sync_names()
+        else:
+            self.rescan()
+
+    # --- Snapshot ---
+
+    def _load_snapshot(self):
+        if not os.path.exists(self.snapshot_path):
+            return False
+        try:
+            with open(self.snapshot_path, 'r') as f:
+                snapshot = json.load(f)
+            self._entries = snapshot['entries']
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Catalogue snapshot unreadable, rescanning: {e}")
+            return False
+        return True
+
+    def _write_snapshot(self):
+        with self._lock:
+            self._snapshot_timer = None
+            with exclusive_lock(self.snapshot_path):
+                write_json(self.snapshot_path, {'entries': self._entries})
+
+    def _schedule_snapshot(self):
+        # Coalesce bursts of updates into one snapshot write
+        with self._lock:
+            if self._snapshot_timer is None:
+                self._snapshot_timer = threading.Timer(self.snapshot_delay, self._write_snapshot)
+                self._snapshot_timer.daemon = True
+                self._snapshot_timer.start()
+
+    def _current_dir_mtime(self):
+        try:
+            return os.stat(self.models_dir).st_mtime
+        except OSError:
+            return None
+
+    # --- Updates ---
+
+    def rescan(self):
+        """Full rebuild from disk; only needed at cold start or after missed events"""
+        entries = {}
+        for file in os.listdir(self.models_dir):
+            if file.endswith('.glb'):
+                entry = self._read_entry(os.path.join(self.models_dir, file))
+                if entry:
+                    entries[file] = entry
+        with self._lock:
+            self._entries = entries
+            self._dir_mtime = self._current_dir_mtime()
+        self._write_snapshot()
+
+    def sync_names(self):
+        """
+        Reconcile with one directory listing: read only files that appeared,
+        drop the ones that disappeared. Catches changes made while the server
+        was down or missed by the poller.
+        """
+        self._dir_mtime = self._current_dir_mtime()
+        names = set(os.listdir(self.models_dir))
+        with self._lock:
+            known = set(self._entries)
+            missing_info = {n for n, e in self._entries.items() if 'info' not in e}
+        glbs = {n for n in names if n.endswith('.glb')}
+        changed = False
+        for name in known - glbs:
+            with self._lock:
+                self._entries.pop(name, None)
+            changed = True
+        for name in glbs - known:
+            self.refresh_path(os.path.join(self.models_dir, name))
+            changed = True
+        for name in missing_info & glbs:
+            if f"{os.path.splitext(name)[0]}{INFO_SUFFIX}" in names:
+                self.refresh_path(os.path.join(self.models_dir, name))
+                changed = True
+        if changed:
+            self._schedule_snapshot()
+
+    def _read_entry(self, model_path):
+        try:
+            stat = os.stat(model_path)
+        except OSError:
+            return None
+        entry = {
+            'name': os.path.basename(model_path),
+            'size': stat.st_size,
+            'created': stat.st_ctime
+        }
+        info = self._read_info(model_path)
+        if info is not None:
+            entry['info'] = info
+        return entry
+
+    @staticmethod
+    def _info_path(model_path):
+        return f"{os.path.splitext(model_path)[0]}{INFO_SUFFIX}"
+
+    def _read_info(self, model_path):
+        info_path = self._info_path(model_path)
+        if not os.path.exists(info_path):
+            return None
+        try:
+            with open(info_path, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def refresh_path(self, path):
+        """Re-read one .glb (or its _info.json) after a change notification"""
+        name = os.path.basename(path)
+        if name.endswith(INFO_SUFFIX):
+            path = os.path.join(os.path.dirname(path), name[:-len(INFO_SUFFIX)] + '.glb')
+            name = os.path.basename(path)
+        elif not name.endswith('.glb'):
+            return
+
+        entry = self._read_entry(path) if os.path.exists(path) else None
+        with self._lock:
+            if entry is None:
+                self._entries.pop(name, None)
+            else:
+                self._entries[name] = entry
+        self._schedule_snapshot()
+
+    def update_info(self, model_name, model_data):
+        """Apply a freshly saved _info.json without re-reading it"""
+        name = f"{model_name}.glb"
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is None:
+                model_path = os.path.join(self.models_dir, name)
+                if not os.path.exists(model_path):
+                    return
+                entry = self._read_entry(model_path)
+                self._entries[name] = entry
+            entry['info'] = model_data
+        self._schedule_snapshot()
+
+    # --- Change notifications ---
+
+    def start_watching(self):
+        # A watcher thread inherited through fork() is dead; start a new one
+        if self._observer is not None and self._observer.is_alive():
+            return
+        if Observer is not None:
+            self._observer = Observer()
+            self._observer.schedule(_CatalogueEventHandler(self), self.models_dir, recursive=False)
+            self._observer.daemon = True
+            self._observer.start()
+        else:
+            self._observer = threading.Thread(target=self._poll_forever, daemon=True)
+            self._observer.start()
+
+    def _poll_forever(self):
+        while True:
+            time.sleep(self.poll_interval)
+            mtime = self._current_dir_mtime()
+            if mtime is not None and mtime != self._dir_mtime:
+                try:
+                    self.sync_names()
+                except OSError as e:
+                    logger.warning(f"Catalogue poll failed: {e}")
+
+    # --- Queries ---
+
+    def query(self, offset=0, limit=None, sort='created', descending=False,
+              name=None, subject=None, created_after=None, created_before=None,
+              max_triangles=None):
+        """
+        Filter, sort and page the catalogue without touching the filesystem.
+
+        Returns:
+            tuple: (page of model dicts, total matches)
+        """
+        if sort not in SORT_KEYS:
+            raise ValueError(f"sort must be one of {SORT_KEYS}")
+
+        with self._lock:
+            entries = list(self._entries.values())
+
+        name = name.lower() if name else None
+        subject = subject.lower() if subject else None
+        matches = []
+        for entry in entries:
+            info = entry.get('info') or {}
+            if name and name not in entry['name'].lower() and name not in str(info.get('name', '')).lower():
+                continue
+            if subject and subject != _subject(entry).lower():
+                continue
+            if created_after is not None and entry['created'] < created_after:
+                continue
+            if created_before is not None and entry['created'] > created_before:
+                continue
+            if max_triangles is not None:
+                triangles = (info.get('stats') or {}).get('triangle_count')
+                if triangles is None or triangles > max_triangles:
+                    continue
+            matches.append(entry)
+
+        if sort == 'subject':
+            matches.sort(key=lambda e: (_subject(e), e['name']), reverse=descending)
+        elif sort == 'triangles':
+            matches.sort(key=lambda e: (_triangles(e), e['name']), reverse=descending)
+        else:
+            matches.sort(key=lambda e: (e[sort], e['name']), reverse=descending)
+
+        page = matches[offset:offset + limit] if limit is not None else matches[offset:]
+        return [dict(entry) for entry in page], len(matches)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+
+def _subject(entry):
+    info = entry.get('info') or {}
+    return str(info.get('subject') or info.get('model_subject') or '')
+
+
+def _triangles(entry):
+    return ((entry.get('info') or {}).get('stats') or {}).get('triangle_count') or 0
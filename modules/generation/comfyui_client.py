@@ -2,26 +2,81 @@ import requests
 import json
 import time
 import glob
+import logging
 import os
 import uuid
+import threading
+
+try:
+    import websocket  # websocket-client, optional: enables live progress
+except ImportError:
+    websocket = None
+
+logger = logging.getLogger(__name__)
 
 class ComfyUIClient:
     def __init__(self, comfyui_url="http://127.0.0.1:8188"):
         self.comfyui_url = comfyui_url
         self.client_id = str(uuid.uuid4())
+        self._listeners = []
+        self._ws_thread = None
+        self._ws_lock = threading.Lock()
         self.check_connection()
     
     def check_connection(self):
         """Check if ComfyUI server is accessible"""
         try:
-            response = requests.get(f"{self.comfyui_url}")
+            response = requests.get(f"{self.comfyui_url}", timeout=5)
             if response.status_code == 200:
-                print("✓ ComfyUI server is accessible")
+                logger.info("ComfyUI server is accessible")
             else:
-                print(f"✗ ComfyUI server returned status: {response.status_code}")
+                logger.error(f"ComfyUI server returned status: {response.status_code}")
         except Exception as e:
-            print(f"✗ Cannot connect to ComfyUI server: {e}")
+            logger.error(f"Cannot connect to ComfyUI server: {e}")
     
+    def add_listener(self, callback, start=True):
+        """Receive every ComfyUI websocket message (dict) for this client_id"""
+        self._listeners.append(callback)
+        if start:
+            self.start_listener()
+
+    def start_listener(self):
+        """Start the background websocket reader if websocket-client is installed"""
+        if websocket is None:
+            logger.warning("websocket-client not installed - live generation progress disabled")
+            return False
+        with self._ws_lock:
+            if self._ws_thread is None or not self._ws_thread.is_alive():
+                self._ws_thread = threading.Thread(target=self._listen_forever, daemon=True)
+                self._ws_thread.start()
+        return True
+
+    def _listen_forever(self):
+        ws_url = self.comfyui_url.replace("http://", "ws://").replace("https://", "wss://")
+        ws_url = f"{ws_url}/ws?clientId={self.client_id}"
+        backoff = 1
+        while True:
+            try:
+                ws = websocket.create_connection(ws_url, timeout=30)
+                backoff = 1
+                while True:
+                    try:
+                        frame = ws.recv()
+                    except websocket.WebSocketTimeoutException:
+                        continue
+                    if not isinstance(frame, str):
+                        continue  # binary preview images
+                    message = json.loads(frame)
+                    for callback in list(self._listeners):
+                        try:
+                            callback(message)
+                        except Exception as e:
+                            logger.error(f"Progress listener error: {e}")
+            except Exception as e:
+                logger.error(f"ComfyUI websocket disconnected: {e}")
+            time.sleep(backoff)
+            backoff = min(backoff * 2, 30)
+
     def queue_prompt(self, workflow):
         """Queue a prompt in ComfyUI"""
         p = {"prompt": workflow, "client_id": self.client_id}
@@ -32,13 +87,13 @@ class ComfyUIClient:
             resp = requests.post(f"{self.comfyui_url}/prompt", data=data, headers=headers)
             if resp.status_code == 200:
                 result = resp.json()
-                print(f"✓ Prompt queued successfully (ID: {result.get('prompt_id', 'Unknown')})")
+                logger.debug(f"Prompt queued successfully (ID: {result.get('prompt_id', 'Unknown')})")
                 return result
             else:
-                print(f"✗ Failed to queue prompt: {resp.status_code}")
+                logger.error(f"Failed to queue prompt: {resp.status_code}")
                 return None
         except requests.exceptions.RequestException as e:
-            print(f"✗ Failed to queue prompt: {e}")
+            logger.error(f"Failed to queue prompt: {e}")
             return None
     
     def upload_image(self, image_path):
@@ -48,26 +103,30 @@ class ComfyUIClient:
                 upload_resp = requests.post(f"{self.comfyui_url}/upload/image", files={'image': f})
                 if upload_resp.status_code == 200:
                     result = upload_resp.json()
-                    print(f"✓ Image uploaded successfully: {result['name']}")
+                    logger.debug(f"Image uploaded successfully: {result['name']}")
                     return result['name']
                 else:
-                    print(f"✗ Image upload failed: {upload_resp.status_code}")
+                    logger.error(f"Image upload failed: {upload_resp.status_code}")
                     return None
         except Exception as e:
-            print(f"✗ Image upload error: {e}")
+            logger.error(f"Image upload error: {e}")
             return None
     
-    def wait_for_completion(self, target_file_pattern, timeout=600):
+    def wait_for_completion(self, target_file_pattern, timeout=600, progress=None, tier=None):
         """Wait for ComfyUI to generate the file"""
-        print(f"Waiting for file generation: {target_file_pattern}")
+        logger.debug(f"Waiting for file generation: {target_file_pattern}")
         start_time = time.time()
         
         while time.time() - start_time < timeout:
+            if progress is not None and progress.aborted(tier):
+                logger.error(f"Generation failed: {progress.error or progress.tiers.get(tier, {}).get('error')}")
+                return None
+
             files = glob.glob(target_file_pattern)
             
             if files:
                 file_path = files[0]
-                print(f"✓ File found: {os.path.basename(file_path)}")
+                logger.debug(f"File found: {os.path.basename(file_path)}")
                 
                 # Wait for file to be completely written
                 prev_size = -1
@@ -86,15 +145,15 @@ class ComfyUIClient:
                         time.sleep(1)
                         continue
                 
-                print(f"✓ File generation completed: {os.path.basename(file_path)}")
+                logger.info(f"File generation completed: {os.path.basename(file_path)}")
                 return file_path
             
             # Show progress
             elapsed = int(time.time() - start_time)
             if elapsed % 10 == 0:
-                print(f"Waiting... {elapsed}s elapsed")
+                logger.debug(f"Waiting... {elapsed}s elapsed")
             
             time.sleep(2)
         
-        print(f"✗ File generation timeout after {timeout} seconds")
+        logger.error(f"File generation timeout after {timeout} seconds")
         return None
\ No newline at end of file
@@ -0,0 +1,95 @@
+import gzip
+import hashlib
+import os
+import shutil
+import threading
+
+try:
+    import brotli  # optional: enables .br variants
+except ImportError:
+    brotli = None
+
+GLB_MIMETYPE = 'model/gltf-binary'
+# Preferred order when a client accepts several encodings
+ENCODINGS = ('br', 'gzip')
+VARIANT_SUFFIXES = {'br': '.br', 'gzip': '.gz'}
+# Variants that don't save at least this fraction are not worth keeping
+MIN_SAVING = 0.05
+
+_hash_cache = {}
+_hash_lock = threading.Lock()
+
+
+def content_hash(path, chunk_size=1024 * 1024):
+    """SHA-256 of a file, memoised on (path, size, mtime)"""
+    stat = os.stat(path)
+    key = (os.path.normpath(path), stat.st_size, stat.st_mtime)
+    with _hash_lock:
+        cached = _hash_cache.get(key)
+    if cached:
+        return cached
+
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    value = digest.hexdigest()
+    with _hash_lock:
+        _hash_cache[key] = value
+    return value
+
+
+def precompress(path):
+    """
+    Write gzip (and brotli, if installed) variants next to `path`.
+
+    Returns:
+        dict: {encoding: variant path} for variants that are actually smaller
+    """
+    original_size = os.path.getsize(path)
+    variants = {}
+
+    gz_path = path + VARIANT_SUFFIXES['gzip']
+    with open(path, 'rb') as src, gzip.open(gz_path, 'wb', compresslevel=9) as dst:
+        shutil.copyfileobj(src, dst, 1024 * 1024)
+    variants['gzip'] = gz_path
+
+    if brotli is not None:
+        br_path = path + VARIANT_SUFFIXES['br']
+        with open(path, 'rb') as src:
+            data = brotli.compress(src.read(), quality=9)
+        with open(br_path, 'wb') as dst:
+            dst.write(data)
+        variants['br'] = br_path
+
+    # Already-compressed (e.g. Draco/KTX2) GLBs barely shrink; drop useless variants
+    for encoding, variant_path in list(variants.items()):
+        if os.path.getsize(variant_path) > original_size * (1 - MIN_SAVING):
+            os.remove(variant_path)
+            del variants[encoding]
+    return variants
+
+
+def ingest(path, storage=None):
+    """Hash and precompress a freshly generated asset, recording both in the storage index"""
+    info = {'sha256': content_hash(path), 'variants': precompress(path)}
+    if storage is not None:
+        storage.annotate(path, **info)
+    return info
+
+
+def asset_info(path, storage=None):
+    """Hash + known variants of a local asset, computing the hash lazily if never ingested"""
+    entry = storage.get(path) if storage is not None else None
+    if entry and entry.get('sha256') and not entry.get('evicted'):
+        variants = {enc: p for enc, p in entry.get('variants', {}).items() if os.path.exists(p)}
+        return {'sha256': entry['sha256'], 'variants': variants}
+    return {'sha256': content_hash(path), 'variants': {}}
+
+
+def pick_encoding(accept_encodings, variants):
+    """Best precompressed variant the client accepts, or None for identity"""
+    for encoding in ENCODINGS:
+        if encoding in variants and accept_encodings[encoding]:
+            return encoding
+    return None
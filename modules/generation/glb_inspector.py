@@ -0,0 +1,175 @@
+import json
+import mmap
+import struct
+
+GLB_MAGIC = b'glTF'
+CHUNK_JSON = 0x4E4F534A
+CHUNK_BIN = 0x004E4942
+
+# glTF primitive modes
+MODE_TRIANGLES = 4
+MODE_TRIANGLE_STRIP = 5
+MODE_TRIANGLE_FAN = 6
+
+# Enough bytes to find the size marker of any PNG/JPEG/WebP header we care about
+IMAGE_HEADER_BYTES = 64 * 1024
+
+
+class GLBError(ValueError):
+    """Raised when a file is not a readable binary glTF"""
+
+
+def inspect_glb(path):
+    """
+    Pull per-asset stats out of a .glb without loading its binary buffers.
+
+    The file is memory-mapped; only the JSON chunk and accessor metadata are
+    parsed. Texture sizes are read from the first few bytes of each embedded
+    image, so the geometry buffers are never paged in.
+
+    Returns:
+        dict: vertex/triangle counts, bounding box, texture resolutions and buffer sizes
+    """
+    with open(path, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            if len(mm) < 20:
+                raise GLBError("File too small to be a GLB")
+            magic, version, total_length = struct.unpack_from('<4sII', mm, 0)
+            if magic != GLB_MAGIC:
+                raise GLBError("Missing glTF magic")
+
+            json_length, json_type = struct.unpack_from('<II', mm, 12)
+            if json_type != CHUNK_JSON:
+                raise GLBError("First chunk is not JSON")
+            gltf = json.loads(mm[20:20 + json_length].decode('utf-8'))
+
+            bin_offset = bin_length = None
+            next_chunk = 20 + json_length
+            if next_chunk + 8 <= len(mm):
+                chunk_length, chunk_type = struct.unpack_from('<II', mm, next_chunk)
+                if chunk_type == CHUNK_BIN:
+                    bin_offset, bin_length = next_chunk + 8, chunk_length
+
+            stats = _geometry_stats(gltf)
+            stats['textures'] = _texture_stats(gltf, mm, bin_offset)
+            stats.update({
+                'glb_version': version,
+                'file_bytes': total_length,
+                'json_bytes': json_length,
+                'bin_bytes': bin_length or 0,
+                'buffer_bytes': [b.get('byteLength', 0) for b in gltf.get('buffers', [])],
+                'generator': gltf.get('asset', {}).get('generator'),
+                'material_count': len(gltf.get('materials', [])),
+            })
+            return stats
+
+
+def _geometry_stats(gltf):
+    accessors = gltf.get('accessors', [])
+    vertex_count = 0
+    triangle_count = 0
+    primitive_count = 0
+    bbox_min = bbox_max = None
+
+    for mesh in gltf.get('meshes', []):
+        for prim in mesh.get('primitives', []):
+            primitive_count += 1
+            position = prim.get('attributes', {}).get('POSITION')
+            if position is None:
+                continue
+            pos = _accessor(accessors, position, 'POSITION')
+            vertex_count += pos.get('count', 0)
+
+            # POSITION accessors must carry min/max per the glTF spec
+            if 'min' in pos and 'max' in pos:
+                if bbox_min is None:
+                    bbox_min, bbox_max = list(pos['min']), list(pos['max'])
+                else:
+                    bbox_min = [min(a, b) for a, b in zip(bbox_min, pos['min'])]
+                    bbox_max = [max(a, b) for a, b in zip(bbox_max, pos['max'])]
+
+            indices = prim.get('indices')
+            count = _accessor(accessors, indices, 'indices').get('count', 0) if indices is not None else pos.get('count', 0)
+            mode = prim.get('mode', MODE_TRIANGLES)
+            if mode == MODE_TRIANGLES:
+                triangle_count += count // 3
+            elif mode in (MODE_TRIANGLE_STRIP, MODE_TRIANGLE_FAN):
+                triangle_count += max(count - 2, 0)
+
+    bounding_box = None
+    if bbox_min is not None:
+        bounding_box = {
+            'min': bbox_min,
+            'max': bbox_max,
+            'size': [hi - lo for lo, hi in zip(bbox_min, bbox_max)]
+        }
+
+    return {
+        'mesh_count': len(gltf.get('meshes', [])),
+        'primitive_count': primitive_count,
+        'vertex_count': vertex_count,
+        'triangle_count': triangle_count,
+        'bounding_box': bounding_box,
+    }
+
+
+def _accessor(accessors, index, role):
+    """Accessor referenced by a primitive; a dangling reference means the file is malformed"""
+    if not isinstance(index, int) or not 0 <= index < len(accessors) or not isinstance(accessors[index], dict):
+        raise GLBError(f"{role} refers to missing accessor {index!r}")
+    return accessors[index]
+
+
+def _texture_stats(gltf, mm, bin_offset):
+    buffer_views = gltf.get('bufferViews', [])
+    textures = []
+    for index, image in enumerate(gltf.get('images', [])):
+        entry = {'index': index, 'mime_type': image.get('mimeType'), 'width': None, 'height': None}
+        view_index = image.get('bufferView')
+        if view_index is not None and bin_offset is not None and view_index < len(buffer_views):
+            view = buffer_views[view_index]
+            start = bin_offset + view.get('byteOffset', 0)
+            length = min(view.get('byteLength', 0), IMAGE_HEADER_BYTES)
+            entry['bytes'] = view.get('byteLength', 0)
+            size = _image_size(mm[start:start + length])
+            if size:
+                entry['width'], entry['height'] = size
+        textures.append(entry)
+    return textures
+
+
+def _image_size(header):
+    """(width, height) from the leading bytes of a PNG, JPEG or WebP image"""
+    if header[:8] == b'\x89PNG\r\n\x1a\n' and len(header) >= 24:
+        return struct.unpack('>II', header[16:24])
+
+    if header[:2] == b'\xff\xd8':
+        i = 2
+        while i + 9 < len(header):
+            if header[i] != 0xFF:
+                i += 1
+                continue
+            marker = header[i + 1]
+            # SOF0-SOF15, excluding DHT (C4), JPG (C8) and DAC (CC)
+            if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+                height, width = struct.unpack('>HH', header[i + 5:i + 9])
+                return width, height
+            if marker in (0xD8, 0x01) or 0xD0 <= marker <= 0xD7:
+                i += 2
+                continue
+            i += 2 + struct.unpack('>H', header[i + 2:i + 4])[0]
+        return None
+
+    if header[:4] == b'RIFF' and header[8:12] == b'WEBP' and len(header) >= 30:
+        chunk = header[12:16]
+        if chunk == b'VP8 ':
+            width, height = struct.unpack('<HH', header[26:30])
+            return width & 0x3FFF, height & 0x3FFF
+        if chunk == b'VP8L':
+            bits = int.from_bytes(header[21:25], 'little')
+            return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+        if chunk == b'VP8X':
+            width = int.from_bytes(header[24:27], 'little') + 1
+            height = int.from_bytes(header[27:30], 'little') + 1
+            return width, height
+    return None
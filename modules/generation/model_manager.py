@@ -1,16 +1,60 @@
 import os
 import json
+import logging
+from modules.generation.catalogue import ModelCatalogue
+from modules.generation.glb_inspector import inspect_glb, GLBError
+
+logger = logging.getLogger(__name__)
 
 class ModelManager:
-    def __init__(self, models_dir="generated_models"):
+    def __init__(self, models_dir="generated_models", storage=None, watch=True):
         self.models_dir = models_dir
+        # Optional StorageManager enforcing the local disk budget
+        self.storage = storage
         os.makedirs(models_dir, exist_ok=True)
+        # Indexed listing, updated incrementally instead of re-reading the directory
+        self.catalogue = ModelCatalogue(models_dir)
+        if watch:
+            self.catalogue.start_watching()
+    
+    def register_model(self, model_path, uploaded=False, remote=None):
+        """Record a newly generated .glb and store its mesh stats in the info record"""
+        if self.storage is not None:
+            self.storage.track(model_path, kind='model', uploaded=uploaded, remote=remote)
+        self.catalogue.refresh_path(model_path)
+        return self.ingest_stats(model_path)
+    
+    def ingest_stats(self, model_path):
+        """Extract vertex/triangle counts, bbox and texture sizes into <model>_info.json"""
+        try:
+            stats = inspect_glb(model_path)
+        except (GLBError, OSError, ValueError, IndexError, KeyError, TypeError) as e:
+            # Stats are optional; a malformed asset must not fail the job that produced it
+            logger.warning(f"Could not inspect {model_path}: {e}")
+            return None
+        model_name = os.path.splitext(os.path.basename(model_path))[0]
+        info = self.load_model_info(model_name) or {}
+        info['stats'] = stats
+        self.save_model_info(model_name, info)
+        return stats
+    
+    def mark_uploaded(self, model_path, remote=None):
+        """Local copy is now also in Supabase and may be evicted under pressure"""
+        if self.storage is not None:
+            self.storage.mark_uploaded(model_path, remote=remote)
+    
+    def touch_model(self, model_path):
+        if self.storage is not None:
+            self.storage.touch(model_path)
     
     def save_model_info(self, model_name, model_data):
         """Save model metadata"""
         info_path = os.path.join(self.models_dir, f"{model_name}_info.json")
         with open(info_path, 'w') as f:
             json.dump(model_data, f, indent=2)
+        self.catalogue.update_info(model_name, model_data)
+        if self.storage is not None:
+            self.storage.track(info_path, kind='info')
     
     def load_model_info(self, model_name):
         """Load model metadata"""
@@ -20,24 +64,21 @@ class ModelManager:
                 return json.load(f)
         return None
     
-    def list_models(self):
-        """List all available models"""
-        models = []
-        for file in os.listdir(self.models_dir):
-            if file.endswith('.glb'):
-                model_path = os.path.join(self.models_dir, file)
-                info_path = os.path.join(self.models_dir, f"{os.path.splitext(file)[0]}_info.json")
-                
-                model_data = {
-                    'name': file,
-                    'size': os.path.getsize(model_path),
-                    'created': os.path.getctime(model_path)
-                }
-                
-                if os.path.exists(info_path):
-                    with open(info_path, 'r') as f:
-                        model_data['info'] = json.load(f)
-                
-                models.append(model_data)
-        
-        return models
\ No newline at end of file
+    def list_models(self, offset=0, limit=None, sort='created', descending=False,
+                    name=None, subject=None, created_after=None, created_before=None,
+                    max_triangles=None):
+        """List available models from the in-memory catalogue (paged, sorted, filtered)"""
+        models, _ = self.catalogue.query(offset=offset, limit=limit, sort=sort, descending=descending,
+                                         name=name, subject=subject,
+                                         created_after=created_after, created_before=created_before,
+                                         max_triangles=max_triangles)
+        return models
+    
+    def count_models(self, **filters):
+        """Number of models matching the same filters as list_models"""
+        _, total = self.catalogue.query(limit=0, **filters)
+        return total
+    
+    def storage_usage(self):
+        """Disk usage of local artifacts, or None without a storage manager"""
+        return self.storage.usage() if self.storage is not None else None
\ No newline at end of file
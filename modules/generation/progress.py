@@ -0,0 +1,330 @@
+import threading
+import time
+from collections import OrderedDict
+
+from modules.metrics import GENERATION_STAGE_SECONDS
+
+# Map ComfyUI node class types onto the coarse stages reported to clients
+NODE_STAGES = {
+    'LoadImage': 'preprocessing',
+    'ImageResize+': 'preprocessing',
+    'TransparentBGSession+': 'background_removal',
+    'ImageRemoveBackground+': 'background_removal',
+    'ImageCompositeMasked': 'background_removal',
+    'Hy3DModelLoader': 'loading_models',
+    'DownloadAndLoadHy3DDelightModel': 'loading_models',
+    'DownloadAndLoadHy3DPaintModel': 'loading_models',
+    'Hy3DGenerateMesh': 'mesh_generation',
+    'Hy3DVAEDecode': 'vae_decode',
+    'Hy3DPostprocessMesh': 'mesh_postprocess',
+    'Hy3DDelightImage': 'texture_bake',
+    'Hy3DMeshUVWrap': 'texture_bake',
+    'Hy3DCameraConfig': 'texture_bake',
+    'Hy3DRenderMultiView': 'texture_bake',
+    'Hy3DSampleMultiView': 'texture_bake',
+    'Hy3DBakeFromMultiview': 'texture_bake',
+    'CV2InpaintTexture': 'texture_bake',
+    'Hy3DMeshVerticeInpaintTexture': 'texture_bake',
+    'Hy3DApplyTexture': 'texture_bake',
+    'Hy3DExportMesh': 'export',
+}
+
+# Stages reported by ComfyUI itself (the rest are set by the generation task)
+COMFY_STAGES = set(NODE_STAGES.values()) | {'processing'}
+
+TERMINAL_STATES = ('completed', 'failed')
+MAX_TRACKED_JOBS = 500
+
+
+class StageStats:
+    """Running mean of stage durations, used to estimate time left in a job"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._totals = {}
+
+    def record(self, stage, seconds):
+        with self._lock:
+            total, count = self._totals.get(stage, (0.0, 0))
+            self._totals[stage] = (total + seconds, count + 1)
+
+    def mean(self, stage):
+        with self._lock:
+            total, count = self._totals.get(stage, (0.0, 0))
+        return total / count if count else None
+
+    def snapshot(self):
+        with self._lock:
+            return {stage: round(total / count, 2) for stage, (total, count) in self._totals.items()}
+
+
+class JobProgress:
+    """Progress state and event log of a single generation job"""
+
+    def __init__(self, job_id, stats=None):
+        self.job_id = job_id
+        self.stats = stats
+        self.state = 'queued'
+        self.stage = None
+        self.node = None
+        self.step = None
+        self.max_steps = None
+        self.started_at = time.time()
+        self.finished_at = None
+        self.stage_started_at = None
+        self.stage_timings = {}
+        self.result = {}
+        self.error = None
+        self.prompt_ids = set()
+        self.prompt_tiers = {}
+        self.node_types = {}
+        self.planned_stages = []
+        self.tiers = {}
+        self.queued_at = {}
+        self.execution_started_at = {}
+        self.events = []
+        self._cond = threading.Condition()
+
+    # --- Updates ---
+
+    def watch_prompt(self, prompt_id, workflow, tier=None):
+        """Associate a queued ComfyUI prompt (and its node types) with this job"""
+        with self._cond:
+            self.prompt_ids.add(prompt_id)
+            self.queued_at[prompt_id] = time.time()
+            if tier:
+                self.prompt_tiers[prompt_id] = tier
+            for node_id, node in workflow.items():
+                self.node_types[str(node_id)] = node.get('class_type')
+            planned = []
+            for class_type in self.node_types.values():
+                stage = NODE_STAGES.get(class_type)
+                if stage and stage not in planned:
+                    planned.append(stage)
+            self.planned_stages = planned
+
+    def set_state(self, state, **data):
+        with self._cond:
+            self.state = state
+            if state in TERMINAL_STATES:
+                self._close_stage()
+                self.finished_at = time.time()
+            self._publish('state', state=state, **data)
+
+    def set_stage(self, stage, node=None):
+        with self._cond:
+            if stage != self.stage:
+                self._close_stage()
+                self.stage = stage
+                self.stage_started_at = time.time()
+                self.step = None
+                self.max_steps = None
+            self.node = node
+            self._publish('stage', stage=stage, node=node)
+
+    def set_progress(self, value, max_value, node=None):
+        with self._cond:
+            if node is not None and self._stage_for_node(node) != self.stage:
+                self.set_stage(self._stage_for_node(node), node)
+            self.step = value
+            self.max_steps = max_value
+            self._publish('progress', step=value, max_steps=max_value)
+
+    def set_tier(self, tier, state, **data):
+        """Track one output tier (e.g. 'preview' / 'full') of a progressive job"""
+        with self._cond:
+            entry = self.tiers.setdefault(tier, {})
+            entry['state'] = state
+            entry.update(data)
+            self._publish('tier', tier=tier, **entry)
+
+    def complete(self, **result):
+        with self._cond:
+            self.result.update(result)
+        self.set_state('completed', **result)
+
+    def fail(self, error):
+        with self._cond:
+            self.error = str(error)
+        self.set_state('failed', error=str(error))
+
+    def handle_comfy_message(self, message):
+        """Translate one ComfyUI websocket message into job events"""
+        msg_type = message.get('type')
+        data = message.get('data') or {}
+
+        if msg_type == 'execution_start':
+            prompt_id = data.get('prompt_id')
+            with self._cond:
+                now = time.time()
+                self.execution_started_at[self.prompt_tiers.get(prompt_id)] = now
+                queued_at = self.queued_at.pop(prompt_id, None)
+            if queued_at is not None:
+                tier = self.prompt_tiers.get(prompt_id)
+                GENERATION_STAGE_SECONDS.observe(now - queued_at, stage=f"{tier}_queue_wait" if tier == 'preview' else 'queue_wait')
+            self.set_state('generating')
+        elif msg_type == 'executing':
+            node = data.get('node')
+            if node is not None:
+                self.set_stage(self._stage_for_node(node), node)
+        elif msg_type == 'progress':
+            self.set_progress(data.get('value'), data.get('max'), data.get('node'))
+        elif msg_type == 'execution_error':
+            error = data.get('exception_message', 'ComfyUI execution error')
+            tier = self.prompt_tiers.get(data.get('prompt_id'))
+            if tier == 'preview':
+                # The full-quality prompt is still queued; only the preview is lost
+                self.set_tier(tier, 'failed', error=error)
+            else:
+                self.fail(error)
+
+    # --- Reads ---
+
+    def _stage_for_node(self, node):
+        return NODE_STAGES.get(self.node_types.get(str(node)), 'processing')
+
+    def stage_eta(self):
+        """Seconds left in the current stage, from the observed step rate"""
+        if not self.step or not self.max_steps or not self.stage_started_at:
+            return None
+        elapsed = time.time() - self.stage_started_at
+        return max(0.0, elapsed / self.step * (self.max_steps - self.step))
+
+    def eta(self):
+        """Seconds left in the whole job: current stage plus historic means of the rest"""
+        if self.state in TERMINAL_STATES:
+            return 0.0
+        remaining = self.stage_eta()
+        if self.stats is None or not self.planned_stages:
+            return remaining
+        # Node ids do not follow execution order, so "upcoming" means "not visited yet"
+        upcoming = [stage for stage in self.planned_stages
+                    if stage != self.stage and stage not in self.stage_timings]
+        total = remaining or 0.0
+        for stage in upcoming:
+            mean = self.stats.mean(stage)
+            if mean is None:
+                return remaining
+            total += mean
+        return total
+
+    def snapshot(self):
+        with self._cond:
+            eta = self.eta()
+            return {
+                'job_id': self.job_id,
+                'state': self.state,
+                'stage': self.stage,
+                'step': self.step,
+                'max_steps': self.max_steps,
+                'eta_seconds': round(eta, 1) if eta is not None else None,
+                'elapsed_seconds': round((self.finished_at or time.time()) - self.started_at, 1),
+                'stage_timings': {k: round(v, 2) for k, v in self.stage_timings.items()},
+                'tiers': {tier: dict(entry) for tier, entry in self.tiers.items()},
+                'result': dict(self.result),
+                'error': self.error
+            }
+
+    def wait_for_events(self, after_seq, timeout):
+        """Block until events newer than `after_seq` exist; returns them (possibly empty)"""
+        with self._cond:
+            if len(self.events) <= after_seq and self.state not in TERMINAL_STATES:
+                self._cond.wait(timeout)
+            return self.events[after_seq:]
+
+    def aborted(self, tier=None):
+        """True once the job (or the given tier) has failed"""
+        if self.state == 'failed':
+            return True
+        return tier is not None and self.tiers.get(tier, {}).get('state') == 'failed'
+
+    @property
+    def finished(self):
+        return self.state in TERMINAL_STATES
+
+    # --- Internals (call with the condition held) ---
+
+    def _close_stage(self):
+        if self.stage and self.stage_started_at:
+            duration = time.time() - self.stage_started_at
+            self.stage_timings[self.stage] = self.stage_timings.get(self.stage, 0.0) + duration
+            if self.stats is not None:
+                self.stats.record(self.stage, duration)
+            if self.stage in COMFY_STAGES:
+                GENERATION_STAGE_SECONDS.observe(duration, stage=f"comfyui_{self.stage}")
+        self.stage_started_at = None
+
+    def _publish(self, event, **data):
+        payload = {'seq': len(self.events) + 1, 'event': event, 'time': time.time()}
+        payload.update(data)
+        eta = self.eta()
+        payload['eta_seconds'] = round(eta, 1) if eta is not None else None
+        if event == 'state' and self.state in TERMINAL_STATES:
+            payload['stage_timings'] = {k: round(v, 2) for k, v in self.stage_timings.items()}
+        self.events.append(payload)
+        self._cond.notify_all()
+
+
+class ProgressRegistry:
+    """In-process registry of job progress, fed by the generation task and ComfyUI websocket"""
+
+    def __init__(self, max_jobs=MAX_TRACKED_JOBS):
+        self.max_jobs = max_jobs
+        self.stats = StageStats()
+        self._jobs = OrderedDict()
+        self._prompts = {}
+        self._lock = threading.Lock()
+
+    def create(self, job_id):
+        with self._lock:
+            job = JobProgress(job_id, self.stats)
+            self._jobs[job_id] = job
+            self._evict()
+            return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def counts(self):
+        """Tracked jobs by state (queued, queued_in_comfyui, generating, completed, failed)"""
+        with self._lock:
+            jobs = list(self._jobs.values())
+        counts = {}
+        for job in jobs:
+            counts[job.state] = counts.get(job.state, 0) + 1
+        return counts
+
+    def watch_prompt(self, job_id, prompt_id, workflow, tier=None):
+        job = self.get(job_id)
+        if job is None or not prompt_id:
+            return
+        job.watch_prompt(prompt_id, workflow, tier)
+        with self._lock:
+            self._prompts[prompt_id] = job_id
+
+    def dispatch(self, message):
+        """Route a ComfyUI websocket message to the job owning its prompt_id"""
+        prompt_id = (message.get('data') or {}).get('prompt_id')
+        if not prompt_id:
+            return
+        with self._lock:
+            job = self._jobs.get(self._prompts.get(prompt_id))
+        if job is not None:
+            job.handle_comfy_message(message)
+
+    def _evict(self):
+        # Drop the oldest finished jobs once the registry is full
+        while len(self._jobs) > self.max_jobs:
+            for job_id, job in self._jobs.items():
+                if job.finished:
+                    break
+            else:
+                job_id = next(iter(self._jobs))
+            job = self._jobs.pop(job_id)
+            for prompt_id in job.prompt_ids:
+                self._prompts.pop(prompt_id, None)
+
+
+# Global instance
+progress_registry = ProgressRegistry()
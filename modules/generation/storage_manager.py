@@ -0,0 +1,318 @@
+import fnmatch
+import logging
+import os
+import shutil
+import threading
+import time
+
+from modules.shared_files import exclusive_lock, read_json, write_json
+
+logger = logging.getLogger(__name__)
+
+# Leftovers of crashed scan/generation requests
+TEMP_PATTERNS = ('temp_gen_input_*.png', 'temp_scan_*.png')
+INDEX_FILENAME = '.storage_index.json'
+
+
+class StorageManager:
+    """
+    Track local artifacts and keep `generated_models/` within a disk budget.
+
+    Every file is recorded in a small JSON index with its size, last access
+    time and whether it has been uploaded to Supabase. When the budget is
+    exceeded, uploaded files are evicted least-recently-used first; files that
+    only exist locally are never evicted. Evicted entries are kept as
+    tombstones so their remote object can still be served.
+
+    Every server worker has its own copy of the index. Saves merge with the
+    file under an exclusive lock: entries this process changed win, entries
+    other workers changed are kept, and last access is the latest either saw.
+    """
+
+    def __init__(self, models_dir="generated_models", temp_dir="models",
+                 budget_bytes=5 * 1024**3, temp_max_age=3600, save_delay=30.0):
+        self.models_dir = models_dir
+        self.temp_dir = temp_dir
+        self.budget_bytes = budget_bytes
+        self.temp_max_age = temp_max_age
+        self.save_delay = save_delay
+        self.index_path = os.path.join(models_dir, INDEX_FILENAME)
+        self.evicted_files = 0
+        self.evicted_bytes = 0
+        self.swept_files = 0
+        self._entries = {}
+        # Keys changed / removed here since the last save, for merging with other workers
+        self._dirty = set()
+        self._removed = set()
+        self._lock = threading.RLock()
+        self._save_timer = None
+        self._scheduler = None
+        self._stop = threading.Event()
+        os.makedirs(models_dir, exist_ok=True)
+        self._load()
+
+    # --- Index persistence ---
+
+    def _load(self):
+        if os.path.exists(self.index_path):
+            entries = read_json(self.index_path)
+            if entries is None:
+                logger.warning("Storage index unreadable, rebuilding")
+            self._entries = entries or {}
+
+    def _save(self):
+        with self._lock:
+            if self._save_timer is not None:
+                self._save_timer.cancel()
+                self._save_timer = None
+            with exclusive_lock(self.index_path):
+                on_disk = read_json(self.index_path)
+                if on_disk is not None:
+                    self._entries = self._merge(on_disk)
+                write_json(self.index_path, self._entries)
+            self._dirty.clear()
+            self._removed.clear()
+
+    def _merge(self, on_disk):
+        merged = {}
+        for key, theirs in on_disk.items():
+            if key in self._removed:
+                continue
+            ours = self._entries.get(key)
+            if ours is not None and key in self._dirty:
+                entry = ours
+            else:
+                # Unchanged here: the file has the latest uploaded flag / tombstone
+                entry = theirs
+            if ours is not None:
+                entry['last_access'] = max(ours['last_access'], theirs['last_access'])
+            merged[key] = entry
+        # New here and not yet on disk (keys missing from the file but unchanged here were removed elsewhere)
+        for key in self._dirty:
+            if key not in merged and key in self._entries:
+                merged[key] = self._entries[key]
+        return merged
+
+    def _schedule_save(self):
+        # Access times only steer eviction order; losing a few seconds of them is harmless
+        with self._lock:
+            if self._save_timer is None:
+                self._save_timer = threading.Timer(self.save_delay, self.flush)
+                self._save_timer.daemon = True
+                self._save_timer.start()
+
+    def flush(self):
+        """Write pending access-time updates to the index"""
+        with self._lock:
+            if self._save_timer is not None:
+                self._save()
+
+    @staticmethod
+    def _key(path):
+        return os.path.normpath(path)
+
+    # --- Tracking ---
+
+    def track(self, path, kind='model', uploaded=False, remote=None):
+        """Register a local artifact, then enforce the budget"""
+        now = time.time()
+        with self._lock:
+            self._entries[self._key(path)] = {
+                'size': os.path.getsize(path),
+                'kind': kind,
+                'created': now,
+                'last_access': now,
+                'uploaded': uploaded,
+                'remote': remote
+            }
+            self._dirty.add(self._key(path))
+            self._save()
+        self.enforce_budget()
+
+    def touch(self, path):
+        """Record an access so the file moves to the back of the eviction order"""
+        with self._lock:
+            entry = self._entries.get(self._key(path))
+            if entry is not None:
+                entry['last_access'] = time.time()
+                self._schedule_save()
+
+    def mark_uploaded(self, path, remote=None):
+        """Flag an artifact as safely stored remotely, making it evictable"""
+        with self._lock:
+            entry = self._entries.get(self._key(path))
+            if entry is None:
+                return
+            entry['uploaded'] = True
+            entry['remote'] = remote
+            self._dirty.add(self._key(path))
+            self._save()
+        self.enforce_budget()
+
+    def annotate(self, path, **fields):
+        """Attach ingest metadata (content hash, precompressed variants, ...) to an entry"""
+        with self._lock:
+            entry = self._entries.get(self._key(path))
+            if entry is None:
+                return
+            entry.update(fields)
+            if 'variants' in fields:
+                entry['variant_bytes'] = sum(
+                    os.path.getsize(p) for p in fields['variants'].values() if os.path.exists(p)
+                )
+            self._dirty.add(self._key(path))
+            self._save()
+        self.enforce_budget()
+
+    def remote_for(self, path):
+        """Remote object name of an uploaded artifact, even after local eviction"""
+        entry = self.get(path)
+        return entry.get('remote') if entry and entry.get('uploaded') else None
+
+    def forget(self, path):
+        with self._lock:
+            key = self._key(path)
+            if self._entries.pop(key, None) is not None:
+                self._dirty.discard(key)
+                self._removed.add(key)
+                self._save()
+
+    def get(self, path):
+        with self._lock:
+            entry = self._entries.get(self._key(path))
+            return dict(entry) if entry else None
+
+    def reconcile(self):
+        """Adopt untracked files in models_dir and drop entries whose file is gone"""
+        with self._lock:
+            for key in [k for k, e in self._entries.items() if not e.get('evicted') and not os.path.exists(k)]:
+                del self._entries[key]
+                self._dirty.discard(key)
+                self._removed.add(key)
+            variant_paths = {p for e in self._entries.values() for p in e.get('variants', {}).values()}
+            for name in os.listdir(self.models_dir):
+                path = self._key(os.path.join(self.models_dir, name))
+                # Dot files are indexes, snapshots and their locks
+                if name.startswith('.') or name.endswith('.tmp') or not os.path.isfile(path):
+                    continue
+                if path in variant_paths:
+                    continue
+                if path not in self._entries:
+                    stat = os.stat(path)
+                    self._entries[path] = {
+                        'size': stat.st_size,
+                        'kind': 'info' if name.endswith('_info.json') else 'model',
+                        'created': stat.st_mtime,
+                        'last_access': stat.st_mtime,
+                        'uploaded': False,
+                        'remote': None
+                    }
+                    self._dirty.add(path)
+            self._save()
+
+    # --- Eviction & sweeping ---
+
+    def total_bytes(self):
+        with self._lock:
+            return sum(entry['size'] + entry.get('variant_bytes', 0) for entry in self._entries.values())
+
+    def enforce_budget(self):
+        """Evict uploaded artifacts, least recently used first, until under budget"""
+        evicted = []
+        with self._lock:
+            total = self.total_bytes()
+            if total <= self.budget_bytes:
+                return evicted
+            candidates = sorted(
+                ((key, entry) for key, entry in self._entries.items()
+                 if entry.get('uploaded') and not entry.get('evicted')),
+                key=lambda item: item[1]['last_access']
+            )
+            for key, entry in candidates:
+                if total <= self.budget_bytes:
+                    break
+                freed = entry['size'] + entry.get('variant_bytes', 0)
+                try:
+                    for path in [key] + list(entry.get('variants', {}).values()):
+                        if os.path.exists(path):
+                            os.remove(path)
+                except OSError as e:
+                    logger.warning(f"Could not evict {key}: {e}")
+                    continue
+                # Keep a tombstone: downloads can still be redirected to the remote copy
+                entry.update({'evicted': True, 'size': 0, 'variant_bytes': 0, 'variants': {}})
+                self._dirty.add(key)
+                total -= freed
+                self.evicted_files += 1
+                self.evicted_bytes += freed
+                evicted.append(key)
+            if evicted:
+                self._save()
+        if evicted:
+            logger.info(f"Evicted {len(evicted)} uploaded artifacts to stay within the disk budget")
+        return evicted
+
+    def sweep_orphans(self, max_age=None):
+        """Delete temp inputs left behind by crashed requests"""
+        max_age = self.temp_max_age if max_age is None else max_age
+        if not os.path.isdir(self.temp_dir):
+            return []
+        cutoff = time.time() - max_age
+        removed = []
+        for name in os.listdir(self.temp_dir):
+            if not any(fnmatch.fnmatch(name, pattern) for pattern in TEMP_PATTERNS):
+                continue
+            path = os.path.join(self.temp_dir, name)
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+                    removed.append(path)
+            except OSError:
+                continue  # Raced with the request that owns it
+        self.swept_files += len(removed)
+        if removed:
+            logger.info(f"Swept {len(removed)} orphaned temp files")
+        return removed
+
+    def run_maintenance(self):
+        self.sweep_orphans()
+        self.enforce_budget()
+        self.flush()
+
+    def start_scheduler(self, interval=600):
+        """Run sweep + eviction every `interval` seconds in a daemon thread"""
+        if self._scheduler is not None and self._scheduler.is_alive():
+            return
+
+        def loop():
+            while not self._stop.wait(interval):
+                try:
+                    self.run_maintenance()
+                except Exception as e:
+                    logger.warning(f"Storage maintenance failed: {e}")
+
+        self._scheduler = threading.Thread(target=loop, daemon=True)
+        self._scheduler.start()
+
+    def stop_scheduler(self):
+        self._stop.set()
+        self.flush()
+
+    # --- Reporting ---
+
+    def usage(self):
+        with self._lock:
+            entries = [e for e in self._entries.values() if not e.get('evicted')]
+        disk = shutil.disk_usage(self.models_dir)
+        return {
+            'tracked_files': len(entries),
+            'tracked_bytes': sum(e['size'] + e.get('variant_bytes', 0) for e in entries),
+            'uploaded_files': sum(1 for e in entries if e.get('uploaded')),
+            'local_only_files': sum(1 for e in entries if not e.get('uploaded')),
+            'budget_bytes': self.budget_bytes,
+            'evicted_files': self.evicted_files,
+            'evicted_bytes': self.evicted_bytes,
+            'swept_temp_files': self.swept_files,
+            'disk_free_bytes': disk.free,
+            'disk_total_bytes': disk.total
+        }
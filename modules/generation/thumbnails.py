@@ -0,0 +1,86 @@
+import hashlib
+import io
+from PIL import Image, ImageOps
+
+# Square edge lengths (px) rendered for every model
+THUMBNAIL_SIZES = (64, 256, 512)
+# Size used for the legacy single `model_thumbnail` column
+DEFAULT_THUMBNAIL_SIZE = 256
+
+
+class ThumbnailRenderer:
+    """Render small, fixed-size thumbnails and store them content-addressed"""
+
+    def __init__(self, sizes=THUMBNAIL_SIZES, image_format="WEBP", quality=80):
+        self.sizes = tuple(sorted(sizes))
+        self.image_format = image_format.upper()
+        self.quality = quality
+
+    @property
+    def extension(self):
+        return "webp" if self.image_format == "WEBP" else "jpg"
+
+    @property
+    def content_type(self):
+        return "image/webp" if self.image_format == "WEBP" else "image/jpeg"
+
+    def render(self, source_path):
+        """
+        Render every configured size from an image on disk.
+
+        Returns:
+            dict: {size: encoded image bytes}
+        """
+        with Image.open(source_path) as img:
+            img = ImageOps.exif_transpose(img)
+            img = self._flatten(img)
+
+            rendered = {}
+            for size in self.sizes:
+                thumb = ImageOps.fit(img, (size, size), Image.LANCZOS)
+                buf = io.BytesIO()
+                if self.image_format == "WEBP":
+                    thumb.save(buf, format="WEBP", quality=self.quality, method=4)
+                else:
+                    thumb.save(buf, format="JPEG", quality=self.quality, optimize=True, progressive=True)
+                rendered[size] = buf.getvalue()
+            return rendered
+
+    def _flatten(self, img):
+        """Composite transparency onto white so JPEG output looks the same as WebP"""
+        if img.mode in ("RGBA", "LA") or (img.mode == "P" and "transparency" in img.info):
+            img = img.convert("RGBA")
+            if self.image_format == "WEBP":
+                return img
+            background = Image.new("RGB", img.size, (255, 255, 255))
+            background.paste(img, mask=img.split()[-1])
+            return background
+        return img.convert("RGB")
+
+    def object_name(self, data, size):
+        """Content-addressed storage key: identical thumbnails share one object"""
+        digest = hashlib.sha256(data).hexdigest()
+        return f"thumbnails/{digest[:2]}/{digest}_{size}.{self.extension}"
+
+    def publish(self, source_path, storage, bucket="models"):
+        """
+        Render thumbnails and upload them through the Supabase service.
+
+        Returns:
+            dict: {str(size): public URL}
+        """
+        urls = {}
+        for size, data in self.render(source_path).items():
+            name = self.object_name(data, size)
+            urls[str(size)] = storage.upload_bytes(bucket, data, name, content_type=self.content_type)
+        return urls
+
+
+def default_thumbnail(urls):
+    """Pick the URL kept in the single legacy thumbnail column"""
+    if not urls:
+        return ""
+    key = str(DEFAULT_THUMBNAIL_SIZE)
+    if key in urls:
+        return urls[key]
+    return urls[sorted(urls, key=int)[-1]]
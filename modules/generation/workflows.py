@@ -0,0 +1,97 @@
+import copy
+import json
+import os
+import threading
+
+WORKFLOW_DIR = 'workflows'
+WORKFLOW_FILES = ('hunyuan_workflow_api.json', 'hunyuan_workflow.json')
+
+# Nodes that only exist to bake/apply the multiview texture
+TEXTURE_NODE_TYPES = {
+    'Hy3DApplyTexture',
+    'Hy3DBakeFromMultiview',
+    'Hy3DSampleMultiView',
+    'Hy3DRenderMultiView',
+}
+
+_template_cache = {}
+_template_lock = threading.Lock()
+
+
+def load_workflow_template(workflow_dir=WORKFLOW_DIR):
+    """Load the Hunyuan3D API workflow once; callers get their own deep copy"""
+    with _template_lock:
+        template = _template_cache.get(workflow_dir)
+        if template is None:
+            wf_path = os.path.join(workflow_dir, WORKFLOW_FILES[0])
+            if not os.path.exists(wf_path):
+                wf_path = os.path.join(workflow_dir, WORKFLOW_FILES[1])
+            with open(wf_path, 'r') as f:
+                template = json.load(f)
+            _template_cache[workflow_dir] = template
+    return copy.deepcopy(template)
+
+
+def prepare_workflow(workflow, image_filename, filename_prefix):
+    """Point the workflow at the uploaded image and a job-specific output prefix"""
+    for node in workflow.values():
+        if node.get('class_type') == 'LoadImage':
+            node['inputs']['image'] = image_filename
+
+    for node in workflow.values():
+        if 'filename_prefix' in node.get('inputs', {}):
+            node['inputs']['filename_prefix'] = filename_prefix
+    return workflow
+
+
+def _upstream_nodes(workflow, node_id):
+    """All node ids `node_id` depends on (inclusive)"""
+    seen = set()
+    stack = [str(node_id)]
+    while stack:
+        current = stack.pop()
+        if current in seen or current not in workflow:
+            continue
+        seen.add(current)
+        for value in workflow[current].get('inputs', {}).values():
+            # Links are encoded as [source_node_id, output_index]
+            if isinstance(value, list) and len(value) == 2 and isinstance(value[1], int):
+                stack.append(str(value[0]))
+    return seen
+
+
+def make_preview_workflow(workflow, steps=20, octree_resolution=256, max_facenum=20000):
+    """
+    Reduce a full-quality workflow to a fast preview variant.
+
+    Keeps only the nodes feeding the untextured mesh export, lowers the
+    Hy3DGenerateMesh step count and VAE octree resolution, and skips the
+    multiview texture bake entirely.
+    """
+    export_id = None
+    for node_id, node in workflow.items():
+        if node.get('class_type') != 'Hy3DExportMesh':
+            continue
+        upstream = _upstream_nodes(workflow, node_id)
+        if not any(workflow[n].get('class_type') in TEXTURE_NODE_TYPES for n in upstream):
+            export_id = node_id
+            break
+
+    if export_id is None:
+        raise ValueError("Workflow has no untextured Hy3DExportMesh node to build a preview from")
+
+    keep = _upstream_nodes(workflow, export_id)
+    preview = {node_id: copy.deepcopy(node) for node_id, node in workflow.items() if node_id in keep}
+
+    for node in preview.values():
+        class_type = node.get('class_type')
+        inputs = node.get('inputs', {})
+        if class_type == 'Hy3DGenerateMesh':
+            inputs['steps'] = min(inputs.get('steps', steps), steps)
+        elif class_type == 'Hy3DVAEDecode':
+            inputs['octree_resolution'] = min(inputs.get('octree_resolution', octree_resolution), octree_resolution)
+        elif class_type == 'Hy3DPostprocessMesh':
+            inputs['max_facenum'] = min(inputs.get('max_facenum', max_facenum), max_facenum)
+
+    preview[export_id]['inputs']['save_file'] = True
+    return preview
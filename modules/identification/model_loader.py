@@ -8,8 +8,12 @@ logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(
 logger = logging.getLogger(__name__)
 
 class PlanetDetector:
-    def __init__(self, model_path="models/planet_yolo_v8.pt"):
+    def __init__(self, model_path="models/planet_yolo_v8.pt", device=None, imgsz=None, half=False):
         self.model_path = model_path
+        # Passed to every inference call; unset options keep the ultralytics defaults
+        self.predict_args = {name: value for name, value in (('device', device), ('imgsz', imgsz)) if value is not None}
+        if half:
+            self.predict_args['half'] = True
         self.model = None
         self.initialize_model()
 
@@ -46,46 +50,70 @@ class PlanetDetector:
 
         try:
             # Run inference
-            results = self.model(image_path, conf=conf_threshold)[0]
-            
-            detections = []
-            
-            for box in results.boxes:
-                # Get box coordinates
-                x1, y1, x2, y2 = box.xyxy[0].tolist()
-                
-                # Get confidence and class
-                conf = float(box.conf[0])
-                cls_id = int(box.cls[0])
-                cls_name = results.names[cls_id]
-                
-                detections.append({
-                    'bbox': {
-                        'x1': int(x1),
-                        'y1': int(y1),
-                        'x2': int(x2),
-                        'y2': int(y2),
-                        'width': int(x2 - x1),
-                        'height': int(y2 - y1)
-                    },
-                    'confidence': round(conf, 2),
-                    'class_id': cls_id,
-                    'class_name': cls_name
-                })
-            
-            # Sort by confidence (descending)
-            detections.sort(key=lambda x: x['confidence'], reverse=True)
-            
-            return {
-                'success': True,
-                'count': len(detections),
-                'detections': detections
-            }
+            results = self.model(image_path, conf=conf_threshold, **self.predict_args)[0]
+            return self._result(results)
             
         except Exception as e:
             logger.error(f"Error during detection: {e}")
             return {'error': str(e)}
 
+    def detect_batch(self, images, conf_threshold=0.25):
+        """
+        Detect planets in several images (paths or arrays) with one batched inference call.
+
+        Returns:
+            list: one result dict per image, as returned by detect_and_classify_planets
+        """
+        if self.model is None:
+            self.initialize_model()
+            if self.model is None:
+                return [{'error': 'Model not loaded. Please train the model first.'} for _ in images]
+
+        try:
+            return [self._result(results) for results in self.model(list(images), conf=conf_threshold, **self.predict_args)]
+        except Exception as e:
+            logger.error(f"Error during batch detection: {e}")
+            return [{'error': str(e)} for _ in images]
+
+    @staticmethod
+    def _result(results):
+        """Convert one ultralytics Results object into the API detection format"""
+        detections = []
+        
+        for box in results.boxes:
+            # Get box coordinates
+            x1, y1, x2, y2 = box.xyxy[0].tolist()
+            
+            # Get confidence and class
+            conf = float(box.conf[0])
+            cls_id = int(box.cls[0])
+            cls_name = results.names[cls_id]
+            
+            detections.append({
+                'bbox': {
+                    'x1': int(x1),
+                    'y1': int(y1),
+                    'x2': int(x2),
+                    'y2': int(y2),
+                    'width': int(x2 - x1),
+                    'height': int(y2 - y1)
+                },
+                'confidence': round(conf, 2),
+                'class_id': cls_id,
+                'class_name': cls_name
+            })
+        
+        # Sort by confidence (descending)
+        detections.sort(key=lambda x: x['confidence'], reverse=True)
+        
+        return {
+            'success': True,
+            'count': len(detections),
+            'detections': detections,
+            # Milliseconds per stage as measured by ultralytics: preprocess, inference, postprocess
+            'timings': dict(getattr(results, 'speed', None) or {})
+        }
+
 def initialize_detection_system():
     """Factory function to create and return the detector instance"""
     return PlanetDetector()
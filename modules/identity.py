@@ -0,0 +1,204 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, object_session
+from werkzeug.security import generate_password_hash, check_password_hash
+
+# Session.info key for users whose cached identity must go once the transaction commits
+STALE_KEY = 'identity_stale'
+# Columns that appear in a cached identity
+IDENTITY_FIELDS = ('username', 'role', 'xp', 'level')
+
+
+class HasherBusy(Exception):
+    """Raised when the password hashing queue is full"""
+
+
+class PasswordHasher:
+    """
+    Runs password hashing/verification on a bounded thread pool.
+
+    hashlib's scrypt and pbkdf2 release the GIL, so `workers` hashes run in
+    parallel while request threads only wait. At most `max_pending` jobs may
+    queue; beyond that callers get HasherBusy instead of piling up behind a
+    login storm. `method` is any werkzeug hash spec, e.g.
+    "scrypt:16384:8:1" or "pbkdf2:sha256:600000".
+    """
+
+    def __init__(self, workers=None, method='scrypt', max_pending=64, timeout=10.0):
+        self.workers = workers or os.cpu_count() or 2
+        self.method = method
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='pwhash')
+        self._slots = threading.BoundedSemaphore(self.workers + max_pending)
+        self._spec = None
+        # Jobs queued or running, and jobs turned away with HasherBusy
+        self.in_flight = 0
+        self.rejected = 0
+        self._count_lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            workers=int(os.environ.get('PASSWORD_HASH_WORKERS', 0)) or None,
+            method=os.environ.get('PASSWORD_HASH_METHOD', 'scrypt'),
+            max_pending=int(os.environ.get('PASSWORD_HASH_QUEUE', 64)),
+            timeout=float(os.environ.get('PASSWORD_HASH_TIMEOUT', 10))
+        )
+
+    def _run(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            with self._count_lock:
+                self.rejected += 1
+            raise HasherBusy("Too many logins in progress")
+        with self._count_lock:
+            self.in_flight += 1
+        try:
+            future = self._executor.submit(fn, *args)
+        except Exception:
+            self._release()
+            raise
+        future.add_done_callback(lambda _: self._release())
+        try:
+            return future.result(self.timeout)
+        except FutureTimeout:
+            raise HasherBusy("Password hashing timed out")
+
+    def _release(self):
+        with self._count_lock:
+            self.in_flight -= 1
+        self._slots.release()
+
+    def hash(self, password):
+        return self._run(generate_password_hash, password, self.method)
+
+    def verify(self, password_hash, password):
+        return self._run(check_password_hash, password_hash, password)
+
+    def needs_rehash(self, password_hash):
+        """True when a stored hash was made with a different method or cost"""
+        if self._spec is None:
+            # werkzeug expands defaults ("scrypt" -> "scrypt:32768:8:1"); learn the full form once
+            self._spec = self.hash('').split('$', 1)[0]
+        return password_hash.split('$', 1)[0] != self._spec
+
+
+class IdentityCache:
+    """
+    Short-TTL cache of user identities keyed by JWT subject.
+
+    Saves authenticated endpoints a SQLite lookup per call. Entries are
+    dropped as soon as a commit changes a user's XP, level, role or name
+    (see `install_hooks`), so the TTL only bounds staleness from writes made
+    outside this process.
+    """
+
+    def __init__(self, ttl=30.0, max_entries=4096):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            ttl=float(os.environ.get('IDENTITY_CACHE_TTL', 30)),
+            max_entries=int(os.environ.get('IDENTITY_CACHE_MAX_ENTRIES', 4096))
+        )
+
+    def get(self, subject, loader):
+        """
+        Cached identity dict for `subject`, calling `loader(subject)` on a miss.
+        Returns None (uncached) when the loader finds no user.
+        """
+        key = str(subject)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return dict(entry[1])
+            self.misses += 1
+
+        identity = loader(subject)
+        if identity is None:
+            return None
+        with self._lock:
+            self._entries[key] = (now + self.ttl, identity)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return dict(identity)
+
+    def invalidate(self, subject):
+        with self._lock:
+            self._entries.pop(str(subject), None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else None,
+                'ttl': self.ttl
+            }
+
+
+def load_identity(subject):
+    """Identity dict for a JWT subject straight from the User table"""
+    from modules.models import User
+    user = User.query.get(int(subject))
+    if user is None:
+        return None
+    return {'id': user.id, 'username': user.username, 'role': user.role, 'xp': user.xp, 'level': user.level}
+
+
+def current_identity():
+    """Cached identity of the JWT subject of the current request"""
+    from flask_jwt_extended import get_jwt_identity
+    return identity_cache.get(get_jwt_identity(), load_identity)
+
+
+def install_hooks(cache, user_model):
+    """Drop cached identities when a committed change touches their fields"""
+    def mark(target):
+        # Drop now, and again after commit in case a reader re-cached the old row meanwhile
+        cache.invalidate(target.id)
+        session = object_session(target)
+        if session is not None:
+            session.info.setdefault(STALE_KEY, set()).add(target.id)
+
+    def updated(mapper, connection, target):
+        state = inspect(target)
+        if any(state.attrs[f].history.has_changes() for f in IDENTITY_FIELDS):
+            mark(target)
+
+    def deleted(mapper, connection, target):
+        mark(target)
+
+    def flush_stale(session):
+        for user_id in session.info.pop(STALE_KEY, ()):
+            cache.invalidate(user_id)
+
+    event.listen(user_model, 'after_update', updated)
+    event.listen(user_model, 'after_delete', deleted)
+    event.listen(Session, 'after_commit', flush_stale)
+    event.listen(Session, 'after_rollback', flush_stale)
+
+
+# Global instances
+password_hasher = PasswordHasher.from_env()
+identity_cache = IdentityCache.from_env()
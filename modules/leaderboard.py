@@ -0,0 +1,377 @@
+import bisect
+import logging
+import threading
+import time
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, object_session
+
+try:
+    from sortedcontainers import SortedList
+except ImportError:  # optional: plain bisect keeps queries O(log n) but inserts O(n)
+    SortedList = None
+
+logger = logging.getLogger(__name__)
+
+# Session.info key for XP changes waiting for their transaction to commit
+PENDING_KEY = 'leaderboard_pending'
+# Rows per Supabase request while loading rosters; stays under PostgREST's max_rows
+ROSTER_PAGE_SIZE = 500
+# Supabase user ids per `in` lookup when mapping members to local accounts
+ALIAS_BATCH = 200
+
+
+class _BisectList:
+    """Minimal stand-in for sortedcontainers.SortedList"""
+
+    def __init__(self):
+        self._items = []
+
+    def add(self, item):
+        bisect.insort(self._items, item)
+
+    def remove(self, item):
+        i = bisect.bisect_left(self._items, item)
+        if i < len(self._items) and self._items[i] == item:
+            del self._items[i]
+        else:
+            raise ValueError(item)
+
+    def bisect_left(self, item):
+        return bisect.bisect_left(self._items, item)
+
+    def index(self, item):
+        i = bisect.bisect_left(self._items, item)
+        if i < len(self._items) and self._items[i] == item:
+            return i
+        raise ValueError(item)
+
+    def __getitem__(self, index):
+        return self._items[index]
+
+    def __len__(self):
+        return len(self._items)
+
+
+class Ranking:
+    """
+    Users ordered by XP (highest first, ties by id) in an order-statistics list.
+
+    Ranks are competition-style: users with equal XP share a rank.
+    """
+
+    def __init__(self):
+        self._order = SortedList() if SortedList is not None else _BisectList()
+        self._xp = {}
+
+    @staticmethod
+    def _key(user_id, xp):
+        return (-xp, user_id)
+
+    def set(self, user_id, xp):
+        old = self._xp.get(user_id)
+        if old == xp:
+            return
+        if old is not None:
+            self._order.remove(self._key(user_id, old))
+        self._xp[user_id] = xp
+        self._order.add(self._key(user_id, xp))
+
+    def remove(self, user_id):
+        old = self._xp.pop(user_id, None)
+        if old is not None:
+            self._order.remove(self._key(user_id, old))
+
+    def rank(self, user_id):
+        xp = self._xp.get(user_id)
+        if xp is None:
+            return None
+        # '' sorts before every id: counts users with strictly more XP
+        return self._order.bisect_left((-xp, '')) + 1
+
+    def top(self, limit=10, offset=0):
+        return [(user_id, -neg_xp) for neg_xp, user_id in self._order[offset:offset + limit]]
+
+    def around(self, user_id, radius=5):
+        """Entries `radius` places above and below the user, and the user's position"""
+        xp = self._xp.get(user_id)
+        if xp is None:
+            return None, []
+        position = self._order.index(self._key(user_id, xp))
+        start = max(position - radius, 0)
+        return start, self.top(limit=position - start + radius + 1, offset=start)
+
+    def xp(self, user_id):
+        return self._xp.get(user_id)
+
+    def __contains__(self, user_id):
+        return user_id in self._xp
+
+    def __len__(self):
+        return len(self._xp)
+
+
+class Leaderboard:
+    """
+    Global and per-classroom XP rankings kept in memory.
+
+    Built from the User table at startup, then updated incrementally from
+    committed XP changes (see `install_hooks`). Every board is keyed by the
+    local (SQLite) user id. Classroom rosters come from Supabase
+    `classroom_members`, whose user ids refer to the Supabase `users` table;
+    they are mapped to local accounts by username, and members without a
+    local account are left off the classroom board.
+
+    Each server worker only sees its own commits, so `start_sync` rebuilds
+    the whole board periodically to pick up the other workers' changes.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.global_ranking = Ranking()
+        self._classrooms = {}
+        self._memberships = {}
+        self._profiles = {}
+        # Supabase user id -> local user id
+        self._aliases = {}
+        self._supabase = None
+        self.last_sync = None
+        self._sync_thread = None
+
+    # --- Building ---
+
+    def rebuild(self, users, memberships=(), aliases=None):
+        """
+        `users`: iterable of (id, username, xp, level);
+        `memberships`: iterable of (classroom_id, Supabase user id);
+        `aliases`: {Supabase user id: local user id}
+        """
+        ranking = Ranking()
+        profiles = {}
+        for user_id, username, xp, level in users:
+            user_id = str(user_id)
+            ranking.set(user_id, xp or 0)
+            profiles[user_id] = {'username': username, 'level': level}
+        aliases = {str(k): str(v) for k, v in (aliases or {}).items()}
+
+        with self._lock:
+            self.global_ranking = ranking
+            self._profiles = profiles
+            self._aliases = aliases
+            self._classrooms = {}
+            self._memberships = {}
+            for classroom_id, member_id in memberships:
+                local_id = aliases.get(str(member_id))
+                if local_id is not None:
+                    self._add_member(str(classroom_id), local_id)
+            self.last_sync = time.time()
+        logger.info(f"Leaderboard rebuilt: {len(ranking)} users, {len(self._classrooms)} classrooms")
+
+    def load(self, app, supabase=None):
+        """Rebuild from the SQLite User table and, when available, Supabase rosters"""
+        from modules.models import User
+        with app.app_context():
+            users = User.query.with_entities(User.id, User.username, User.xp, User.level).all()
+        memberships = []
+        aliases = {}
+        if supabase is not None and supabase.initialized:
+            self._supabase = supabase
+            memberships = _fetch_memberships(supabase)
+            local_ids = {username: user_id for user_id, username, _, _ in users}
+            aliases = _fetch_aliases(supabase, {member_id for _, member_id in memberships}, local_ids)
+        self.rebuild(users, memberships, aliases)
+
+    def start_sync(self, app, supabase=None, interval=300):
+        """Periodic full rebuild in a background thread (the first load is done by the caller)"""
+        if self._sync_thread is not None and self._sync_thread.is_alive():
+            return
+
+        def loop():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.load(app, supabase)
+                except Exception as e:
+                    logger.warning(f"Leaderboard resync failed: {e}")
+
+        self._sync_thread = threading.Thread(target=loop, name="leaderboard-sync", daemon=True)
+        self._sync_thread.start()
+
+    # --- Incremental updates ---
+
+    def update_user(self, user_id, xp, username=None, level=None):
+        user_id = str(user_id)
+        with self._lock:
+            xp = xp or 0
+            self.global_ranking.set(user_id, xp)
+            profile = self._profiles.setdefault(user_id, {})
+            if username is not None:
+                profile['username'] = username
+            if level is not None:
+                profile['level'] = level
+            for classroom_id in self._memberships.get(user_id, ()):
+                self._classrooms[classroom_id].set(user_id, xp)
+
+    def remove_user(self, user_id):
+        user_id = str(user_id)
+        with self._lock:
+            self.global_ranking.remove(user_id)
+            self._profiles.pop(user_id, None)
+            for classroom_id in self._memberships.pop(user_id, set()):
+                self._classrooms[classroom_id].remove(user_id)
+
+    def _add_member(self, classroom_id, user_id):
+        ranking = self._classrooms.setdefault(classroom_id, Ranking())
+        self._memberships.setdefault(user_id, set()).add(classroom_id)
+        if user_id in self.global_ranking:
+            ranking.set(user_id, self.global_ranking.xp(user_id))
+
+    def add_member(self, classroom_id, user_id):
+        """`user_id` is a local user id"""
+        with self._lock:
+            self._add_member(str(classroom_id), str(user_id))
+
+    def _local_id(self, member_id):
+        """Local user id of a Supabase user, looked up (and remembered) on first sight"""
+        member_id = str(member_id)
+        with self._lock:
+            if member_id in self._aliases:
+                return self._aliases[member_id]
+            local_ids = {p.get('username'): user_id for user_id, p in self._profiles.items()}
+        if self._supabase is None:
+            return None
+        local_id = _fetch_aliases(self._supabase, {member_id}, local_ids).get(member_id)
+        if local_id is not None:
+            with self._lock:
+                self._aliases[member_id] = str(local_id)
+        return local_id
+
+    def on_write(self, table, rows):
+        """Write listener for SupabaseService: picks up classroom joins"""
+        if table != 'classroom_members':
+            return
+        for row in rows or []:
+            if isinstance(row, dict) and row.get('classroom_id') is not None and row.get('user_id') is not None:
+                local_id = self._local_id(row['user_id'])
+                if local_id is not None:
+                    self.add_member(row['classroom_id'], local_id)
+
+    # --- Queries ---
+
+    def _ranking(self, classroom_id=None):
+        if classroom_id is None:
+            return self.global_ranking
+        return self._classrooms.get(str(classroom_id))
+
+    def _entries(self, ranking, rows):
+        entries = []
+        for user_id, xp in rows:
+            profile = self._profiles.get(user_id, {})
+            entries.append({
+                'rank': ranking.rank(user_id),
+                'user_id': user_id,
+                'username': profile.get('username'),
+                'level': profile.get('level'),
+                'xp': xp
+            })
+        return entries
+
+    def top(self, limit=10, offset=0, classroom_id=None):
+        with self._lock:
+            ranking = self._ranking(classroom_id)
+            if ranking is None:
+                return None
+            return {'total': len(ranking), 'entries': self._entries(ranking, ranking.top(limit, offset))}
+
+    def standing(self, user_id, radius=5, classroom_id=None):
+        """Rank of one user plus the neighbours around them, or None if unranked"""
+        user_id = str(user_id)
+        with self._lock:
+            ranking = self._ranking(classroom_id)
+            if ranking is None or user_id not in ranking:
+                return None
+            _, rows = ranking.around(user_id, radius)
+            return {
+                'user_id': user_id,
+                'rank': ranking.rank(user_id),
+                'xp': ranking.xp(user_id),
+                'total': len(ranking),
+                'around': self._entries(ranking, rows)
+            }
+
+    def stats(self):
+        with self._lock:
+            return {
+                'users': len(self.global_ranking),
+                'classrooms': len(self._classrooms),
+                'backend': 'sortedcontainers' if SortedList is not None else 'bisect'
+            }
+
+
+def _fetch_memberships(supabase):
+    """Every (classroom_id, Supabase user id) pair, in keyset pages so max_rows can't truncate it"""
+    memberships = []
+    after = None
+    while True:
+        rows, after = supabase.query_page('classroom_members', 'id', select='id,classroom_id,user_id',
+                                          limit=ROSTER_PAGE_SIZE, after=after)
+        memberships.extend((r['classroom_id'], r['user_id']) for r in rows)
+        if after is None or not rows:
+            return memberships
+
+
+def _fetch_aliases(supabase, member_ids, local_ids):
+    """{Supabase user id: local user id} for members whose user_name has a local account"""
+    member_ids = sorted(str(m) for m in member_ids)
+    aliases = {}
+    for start in range(0, len(member_ids), ALIAS_BATCH):
+        batch = member_ids[start:start + ALIAS_BATCH]
+        for row in supabase.query_records('users', select='id,user_name', in_filters={'id': batch}):
+            local_id = local_ids.get(row.get('user_name'))
+            if local_id is not None:
+                aliases[str(row['id'])] = str(local_id)
+    return aliases
+
+
+def install_hooks(leaderboard, user_model):
+    """
+    Keep `leaderboard` in step with committed User changes.
+
+    Changes are collected per session by mapper events and only applied on
+    commit, so rolled-back XP never reaches the rankings.
+    """
+    def queue(target, change):
+        session = object_session(target)
+        if session is not None:
+            session.info.setdefault(PENDING_KEY, []).append(change)
+
+    def inserted(mapper, connection, target):
+        queue(target, ('update', target.id, target.xp, target.username, target.level))
+
+    def updated(mapper, connection, target):
+        state = inspect(target)
+        if any(state.attrs[name].history.has_changes() for name in ('xp', 'level', 'username')):
+            queue(target, ('update', target.id, target.xp, target.username, target.level))
+
+    def deleted(mapper, connection, target):
+        queue(target, ('remove', target.id))
+
+    def apply(session):
+        for change in session.info.pop(PENDING_KEY, []):
+            if change[0] == 'remove':
+                leaderboard.remove_user(change[1])
+            else:
+                leaderboard.update_user(change[1], change[2], username=change[3], level=change[4])
+
+    def discard(session):
+        session.info.pop(PENDING_KEY, None)
+
+    event.listen(user_model, 'after_insert', inserted)
+    event.listen(user_model, 'after_update', updated)
+    event.listen(user_model, 'after_delete', deleted)
+    event.listen(Session, 'after_commit', apply)
+    event.listen(Session, 'after_rollback', discard)
+
+
+# Global instance
+leaderboard = Leaderboard()
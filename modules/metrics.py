@@ -0,0 +1,214 @@
+import bisect
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import psutil
+except ImportError:  # optional: RSS falls back to /proc on Linux
+    psutil = None
+
+logger = logging.getLogger(__name__)
+
+# Seconds; covers a sub-10ms cache hit up to a 10 minute generation
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in pairs) + '}'
+
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.extend(self._render_sample(key, value))
+        return lines
+
+    def _render_sample(self, key, value):
+        return [f"{self.name}{_labels(self.labelnames, key)} {_number(value)}"]
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = 'gauge'
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(_Metric):
+    """Fixed-bucket histogram; observing is a bisect and three additions under a lock"""
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                # Per-bucket counts (last one is +Inf), sum
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][index] += 1
+            entry[1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the duration of the `with` block, even when it raises"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted((key, (list(counts), total)) for key, (counts, total) in self._values.items())
+        for key, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, [('le', _number(float(bound)))])} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """
+    Metrics of this process in Prometheus text format.
+
+    Hot paths update Counter/Gauge/Histogram objects directly. Values that
+    already live elsewhere (queue depths, cache stats, memory) are read by
+    collectors at scrape time instead, so they cost nothing between scrapes.
+    A collector returns (name, type, help, [(labels_dict, value), ...]) tuples.
+    """
+
+    def __init__(self):
+        self._metrics = {}
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    def _add(self, metric):
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._add(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self._add(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._add(Histogram(name, documentation, labelnames, buckets))
+
+    def add_collector(self, collector):
+        with self._lock:
+            self._collectors.append(collector)
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+            collectors = list(self._collectors)
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        for collector in collectors:
+            try:
+                families = list(collector())
+            except Exception as e:
+                # One broken source must not take the whole scrape down
+                logger.warning(f"Metrics collector {getattr(collector, '__name__', collector)} failed: {e}")
+                continue
+            for name, kind, documentation, samples in families:
+                lines.append(f"# HELP {name} {documentation}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in samples:
+                    if value is None:
+                        continue
+                    lines.append(f"{name}{_labels(labels.keys(), labels.values())} {_number(value)}")
+        return '\n'.join(lines) + '\n'
+
+
+def process_rss_bytes():
+    """Resident set size of this process, or None when it cannot be read"""
+    if psutil is not None:
+        return psutil.Process().memory_info().rss
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def process_collector():
+    yield ('process_resident_memory_bytes', 'gauge', 'Resident memory size in bytes.',
+           [({}, process_rss_bytes())])
+    yield ('process_threads', 'gauge', 'Live Python threads.', [({}, threading.active_count())])
+
+
+# Global instance
+metrics = MetricsRegistry()
+metrics.add_collector(process_collector)
+
+# Hot-path stages
+SCAN_STAGE_SECONDS = metrics.histogram(
+    'scan_stage_seconds', 'Duration of each /api/scan stage.', ['stage'])
+GENERATION_STAGE_SECONDS = metrics.histogram(
+    'generation_stage_seconds', 'Duration of each 3D generation stage.', ['stage'])
+SUPABASE_QUERY_SECONDS = metrics.histogram(
+    'supabase_query_seconds', 'Latency of Supabase requests by table and operation.', ['table', 'operation'])
+HTTP_REQUEST_SECONDS = metrics.histogram(
+    'http_request_seconds', 'Flask request latency by endpoint.', ['endpoint', 'method', 'status'])
@@ -1,5 +1,10 @@
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event, text
 from datetime import datetime
+import logging
+import sqlite3
+
+logger = logging.getLogger(__name__)
 
 db = SQLAlchemy()
 
@@ -7,7 +12,9 @@ db = SQLAlchemy()
 unlocked_models = db.Table('unlocked_models',
     db.Column('user_id', db.Integer, db.ForeignKey('user.id'), primary_key=True),
     db.Column('model_id', db.Integer, db.ForeignKey('model.id'), primary_key=True),
-    db.Column('unlocked_at', db.DateTime, default=datetime.utcnow)
+    db.Column('unlocked_at', db.DateTime, default=datetime.utcnow),
+    # The primary key (user_id, model_id) only serves lookups by user
+    db.Index('ix_unlocked_models_model_id', 'model_id')
 )
 
 class User(db.Model):
@@ -20,9 +27,19 @@ class User(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     # Relationships
-    unlocked_content = db.relationship('Model', secondary=unlocked_models, lazy='subquery',
+    # Loaded on demand as a query (see unlocked_page) instead of with every user fetch
+    unlocked_content = db.relationship('Model', secondary=unlocked_models, lazy='dynamic',
         backref=db.backref('users', lazy=True))
 
+    def unlocked_page(self, offset=0, limit=20):
+        """Most recently unlocked models first, one page at a time"""
+        return (self.unlocked_content
+                .order_by(unlocked_models.c.unlocked_at.desc(), Model.id.desc())
+                .offset(offset).limit(limit).all())
+
+    def unlocked_count(self):
+        return self.unlocked_content.count()
+
     def __repr__(self):
         return f'<User {self.username}>'
 
@@ -33,11 +50,75 @@ class Model(db.Model):
     file_path = db.Column(db.String(255), nullable=False)  # Path to .glb file
     thumbnail_path = db.Column(db.String(255), nullable=True)
     source = db.Column(db.String(50), default='generated')  # generated, upload, sketchfab
-    is_public = db.Column(db.Boolean, default=False)
-    uploader_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True)
+    is_public = db.Column(db.Boolean, default=False, index=True)
+    uploader_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True, index=True)
     rarity = db.Column(db.String(20), default='Common') # Common, Rare, Epic, Legendary
     xp_reward = db.Column(db.Integer, default=10)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
     def __repr__(self):
         return f'<Model {self.name}>'
+
+
+# --- SQLite storage profile ---
+
+# Schema changes applied to existing databases, in order; PRAGMA user_version records progress
+MIGRATIONS = [
+    [
+        "CREATE INDEX IF NOT EXISTS ix_unlocked_models_model_id ON unlocked_models (model_id)",
+        "CREATE INDEX IF NOT EXISTS ix_model_uploader_id ON model (uploader_id)",
+        "CREATE INDEX IF NOT EXISTS ix_model_is_public ON model (is_public)",
+    ],
+]
+
+
+def sqlite_engine_options(pool_size=10, max_overflow=20, busy_timeout_ms=5000):
+    """
+    Engine options for a file-backed SQLite database.
+
+    Connections are pooled and may be checked out by any request thread
+    (each thread holds its own while it works); the driver-level timeout
+    matches the busy timeout so writers wait for the lock instead of failing.
+    """
+    return {
+        'pool_size': pool_size,
+        'max_overflow': max_overflow,
+        'pool_recycle': 3600,
+        'connect_args': {'check_same_thread': False, 'timeout': busy_timeout_ms / 1000}
+    }
+
+
+def apply_sqlite_profile(engine, busy_timeout_ms=5000, synchronous='NORMAL'):
+    """
+    Set WAL mode, busy timeout and sync level on every new connection.
+
+    WAL lets readers proceed while a write is in progress; with WAL,
+    synchronous=NORMAL only risks the last transactions on power loss,
+    never corruption.
+    """
+    if engine.dialect.name != 'sqlite':
+        return
+    if synchronous not in ('OFF', 'NORMAL', 'FULL', 'EXTRA'):
+        raise ValueError(f"Unsupported SQLite synchronous level: {synchronous}")
+
+    @event.listens_for(engine, 'connect')
+    def set_pragmas(dbapi_connection, connection_record):
+        if not isinstance(dbapi_connection, sqlite3.Connection):
+            return
+        cursor = dbapi_connection.cursor()
+        cursor.execute('PRAGMA journal_mode=WAL')
+        cursor.execute(f'PRAGMA busy_timeout={int(busy_timeout_ms)}')
+        cursor.execute(f'PRAGMA synchronous={synchronous}')
+        cursor.close()
+
+
+def migrate(engine):
+    """Bring an existing database up to the current schema; returns the new version"""
+    with engine.begin() as conn:
+        version = conn.execute(text('PRAGMA user_version')).scalar() or 0
+        for number, statements in enumerate(MIGRATIONS[version:], start=version + 1):
+            for statement in statements:
+                conn.execute(text(statement))
+            conn.execute(text(f'PRAGMA user_version={number}'))
+            logger.info(f"Database migrated to version {number}")
+    return max(version, len(MIGRATIONS))
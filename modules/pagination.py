@@ -0,0 +1,89 @@
+import base64
+import json
+import re
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+# Plain column names only: no embeds, casts or JSON paths from query strings
+_COLUMN_RE = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*$')
+
+
+class PaginationError(ValueError):
+    """Raised for malformed limit/cursor/fields parameters"""
+
+
+def encode_cursor(value):
+    """Opaque, URL-safe cursor for the last key of a page"""
+    raw = json.dumps({'k': value}, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    if not cursor:
+        return None
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        return json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))['k']
+    except (ValueError, KeyError, TypeError):
+        raise PaginationError("Invalid cursor")
+
+
+def parse_limit(value, default=DEFAULT_PAGE_SIZE, maximum=MAX_PAGE_SIZE):
+    if value in (None, ''):
+        return default
+    try:
+        limit = int(value)
+    except ValueError:
+        raise PaginationError("limit must be an integer")
+    if limit < 1:
+        raise PaginationError("limit must be positive")
+    return min(limit, maximum)
+
+
+def parse_fields(value, key_column):
+    """
+    Turn "a,b,c" into a select list, always including the cursor key.
+    Returns "*" when no fields were requested.
+    """
+    if not value:
+        return '*'
+    fields = []
+    for name in value.split(','):
+        name = name.strip()
+        if not name:
+            continue
+        if not _COLUMN_RE.match(name):
+            raise PaginationError(f"Invalid field: {name}")
+        if name not in fields:
+            fields.append(name)
+    if not fields:
+        return '*'
+    if key_column not in fields:
+        fields.insert(0, key_column)
+    return ','.join(fields)
+
+
+def page_args(args, key_column):
+    """
+    Read limit/cursor/fields/order from request args.
+
+    Returns:
+        dict: select, limit (None when the client did not ask for paging),
+              after (decoded cursor) and descending
+    """
+    paged = 'limit' in args or 'cursor' in args
+    return {
+        'select': parse_fields(args.get('fields'), key_column),
+        'limit': parse_limit(args.get('limit')) if paged else None,
+        'after': decode_cursor(args.get('cursor')),
+        'descending': args.get('order', 'asc').lower() == 'desc'
+    }
+
+
+def page_body(rows, last_key):
+    """JSON envelope for one page of results"""
+    return {
+        'items': rows,
+        'next_cursor': encode_cursor(last_key) if last_key is not None else None
+    }
@@ -0,0 +1,225 @@
+import os
+import sys
+import threading
+import time
+import tracemalloc
+import uuid
+from collections import Counter, OrderedDict
+
+# Python-level leaf frames of threads that are parked, not working
+IDLE_LEAVES = {
+    ('threading.py', 'wait'),
+    ('threading.py', '_wait_for_tstate_lock'),
+    ('selectors.py', 'select'),
+    ('socket.py', 'accept'),
+    ('socketserver.py', 'serve_forever'),
+    ('queue.py', 'get'),
+}
+
+
+def _label(code):
+    # ';' separates frames in the collapsed format
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})".replace(';', ',')
+
+
+class StackSampler:
+    """
+    Samples the Python stacks of running threads from a background thread.
+
+    Costs one sys._current_frames() walk per `interval` and nothing in the
+    sampled threads themselves. Results come out in the collapsed-stack
+    format ("thread;outer;...;leaf count") read by flamegraph.pl, speedscope
+    and most flamegraph viewers.
+    """
+
+    def __init__(self, interval=0.005, thread_ids=None, include_idle=False):
+        self.interval = interval
+        self.thread_ids = set(thread_ids) if thread_ids else None
+        self.include_idle = include_idle
+        self.stacks = Counter()
+        self.samples = 0
+        self.started_at = None
+        self.duration = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self.started_at = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.duration = time.perf_counter() - self.started_at
+        return self
+
+    def run_for(self, seconds):
+        self.start()
+        self._stop.wait(seconds)
+        return self.stop()
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own or (self.thread_ids is not None and thread_id not in self.thread_ids):
+                    continue
+                if not self.include_idle and (os.path.basename(frame.f_code.co_filename), frame.f_code.co_name) in IDLE_LEAVES:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_label(frame.f_code))
+                    frame = frame.f_back
+                stack.append(names.get(thread_id, str(thread_id)).replace(';', ','))
+                self.stacks[';'.join(reversed(stack))] += 1
+            self.samples += 1
+
+    def collapsed(self):
+        return '\n'.join(f"{stack} {count}" for stack, count in self.stacks.most_common()) + '\n'
+
+    def summary(self, limit=20):
+        """Sample counts plus the functions most often on top of the stack (self time)"""
+        leaves = Counter()
+        for stack, count in self.stacks.items():
+            leaves[stack.rsplit(';', 1)[-1]] += count
+        return {
+            'samples': self.samples,
+            'stacks': sum(self.stacks.values()),
+            'interval_ms': round(self.interval * 1000, 2),
+            'duration_seconds': round(self.duration or 0.0, 3),
+            'top_self': [{'frame': frame, 'samples': count} for frame, count in leaves.most_common(limit)]
+        }
+
+
+class ProfileStore:
+    """The last few finished profiles (e.g. from per-request profiling), by id"""
+
+    def __init__(self, max_profiles=20):
+        self.max_profiles = max_profiles
+        self._profiles = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, sampler, **info):
+        profile_id = uuid.uuid4().hex[:12]
+        with self._lock:
+            self._profiles[profile_id] = (sampler, info)
+            while len(self._profiles) > self.max_profiles:
+                self._profiles.popitem(last=False)
+        return profile_id
+
+    def get(self, profile_id):
+        with self._lock:
+            return self._profiles.get(profile_id)
+
+    def list(self):
+        with self._lock:
+            return [dict(info, id=profile_id, samples=sampler.samples)
+                    for profile_id, (sampler, info) in self._profiles.items()]
+
+
+class MemoryTracker:
+    """
+    tracemalloc sessions with numbered snapshots that can be diffed.
+
+    Tracing slows allocations down noticeably, so it only runs between
+    `start` and `stop`. At most `max_snapshots` are kept.
+    """
+
+    FILTERS = (
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+        tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+        tracemalloc.Filter(False, '<unknown>'),
+    )
+
+    def __init__(self, max_snapshots=10):
+        self.max_snapshots = max_snapshots
+        self._snapshots = OrderedDict()
+        self._lock = threading.Lock()
+        self._next_id = 1
+
+    def start(self, frames=25):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+        return self.status()
+
+    def stop(self):
+        tracemalloc.stop()
+        with self._lock:
+            self._snapshots.clear()
+        return self.status()
+
+    def status(self):
+        current, peak = tracemalloc.get_traced_memory() if tracemalloc.is_tracing() else (0, 0)
+        with self._lock:
+            snapshots = [dict(info, id=snapshot_id) for snapshot_id, (_, info) in self._snapshots.items()]
+        return {
+            'tracing': tracemalloc.is_tracing(),
+            'frames': tracemalloc.get_traceback_limit(),
+            'traced_bytes': current,
+            'peak_bytes': peak,
+            'snapshots': snapshots
+        }
+
+    def snapshot(self, limit=20, group_by='lineno'):
+        if not tracemalloc.is_tracing():
+            raise RuntimeError("tracemalloc is not running")
+        snapshot = tracemalloc.take_snapshot().filter_traces(self.FILTERS)
+        stats = snapshot.statistics(group_by)
+        info = {
+            'taken_at': time.time(),
+            'total_bytes': sum(stat.size for stat in stats),
+            'blocks': sum(stat.count for stat in stats)
+        }
+        with self._lock:
+            snapshot_id = self._next_id
+            self._next_id += 1
+            self._snapshots[snapshot_id] = (snapshot, info)
+            while len(self._snapshots) > self.max_snapshots:
+                self._snapshots.popitem(last=False)
+        return dict(info, id=snapshot_id, top=[_stat(stat) for stat in stats[:limit]])
+
+    def diff(self, from_id, to_id=None, limit=20, group_by='lineno'):
+        """Largest allocation changes from snapshot `from_id` to `to_id` (default: a new snapshot)"""
+        if to_id is None:
+            to_id = self.snapshot(limit=0)['id']
+        with self._lock:
+            old = self._snapshots.get(from_id)
+            new = self._snapshots.get(to_id)
+        if old is None or new is None:
+            raise KeyError(from_id if old is None else to_id)
+        changes = new[0].compare_to(old[0], group_by)
+        return {
+            'from': from_id,
+            'to': to_id,
+            'size_diff_bytes': sum(stat.size_diff for stat in changes),
+            'top': [_stat_diff(stat) for stat in changes[:limit]]
+        }
+
+
+def _stat(stat):
+    return {'where': _where(stat.traceback), 'size_bytes': stat.size, 'blocks': stat.count}
+
+
+def _stat_diff(stat):
+    return {
+        'where': _where(stat.traceback),
+        'size_bytes': stat.size,
+        'size_diff_bytes': stat.size_diff,
+        'blocks': stat.count,
+        'blocks_diff': stat.count_diff
+    }
+
+
+def _where(traceback):
+    # Innermost frame last, like a normal traceback
+    return [f"{frame.filename}:{frame.lineno}" for frame in reversed(traceback)]
+
+
+# Global instances
+profile_store = ProfileStore()
+memory_tracker = MemoryTracker()
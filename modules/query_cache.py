@@ -0,0 +1,214 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from modules.metrics import SUPABASE_QUERY_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# Seconds a result stays fresh, per table. Tables not listed are not cached.
+DEFAULT_TTLS = {
+    'models': 60,
+    'classroom': 300,
+    'users': 120,
+}
+
+
+def parse_ttls(spec):
+    """Parse "models=60,users=120" into {'models': 60, 'users': 120}"""
+    ttls = {}
+    for part in (spec or '').split(','):
+        if '=' not in part:
+            continue
+        table, seconds = part.split('=', 1)
+        ttls[table.strip()] = float(seconds)
+    return ttls
+
+
+def make_key(kind, table, select, filters=None, in_filters=None, extra=None):
+    """Hashable cache key for one query shape"""
+    return (
+        kind,
+        table,
+        select,
+        tuple(sorted((k, str(v)) for k, v in (filters or {}).items())),
+        tuple(sorted((k, tuple(str(x) for x in v)) for k, v in (in_filters or {}).items())),
+        extra,
+    )
+
+
+class _Entry:
+    __slots__ = ('value', 'fresh_until', 'stale_until', 'generation')
+
+    def __init__(self, value, fresh_until, stale_until, generation):
+        self.value = value
+        self.fresh_until = fresh_until
+        self.stale_until = stale_until
+        self.generation = generation
+
+
+class QueryCache:
+    """
+    Bounded read-through cache for Supabase reads.
+
+    Entries expire per table, the least recently used entry is evicted once
+    `max_entries` is reached, writes invalidate every entry of the affected
+    table, and entries past their TTL but inside the stale window are served
+    immediately while a background thread refreshes them.
+
+    The cache is per process and invalidation is local: after a write, other
+    server workers keep serving their copy for up to TTL + stale window
+    (330 s for `classroom` with the defaults). Lower the TTLs of tables whose
+    readers must see writes from other workers sooner.
+    """
+
+    def __init__(self, ttls=None, max_entries=1024, stale_window=30):
+        self.ttls = dict(DEFAULT_TTLS if ttls is None else ttls)
+        self.max_entries = max_entries
+        self.stale_window = stale_window
+        self._entries = OrderedDict()
+        self._generations = {}
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'stale_hits': 0, 'misses': 0, 'refreshes': 0,
+                       'invalidations': 0, 'evictions': 0}
+        self._latency = {}
+
+    def enabled_for(self, table):
+        return self.ttls.get(table, 0) > 0
+
+    def get_or_load(self, table, key, loader):
+        """
+        Return the cached value for `key`, calling `loader()` on a miss.
+        Exceptions from `loader` propagate and are never cached.
+        """
+        if not self.enabled_for(table):
+            return self._timed_load(table, loader)
+
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if now < entry.fresh_until:
+                    self._entries.move_to_end(key)
+                    self._stats['hits'] += 1
+                    return entry.value
+                if now < entry.stale_until:
+                    self._entries.move_to_end(key)
+                    self._stats['stale_hits'] += 1
+                    refresh = key not in self._refreshing
+                    if refresh:
+                        self._refreshing.add(key)
+                    value = entry.value
+                else:
+                    del self._entries[key]
+                    entry = None
+            if entry is None:
+                self._stats['misses'] += 1
+            generation = self._generations.get(table, 0)
+
+        if entry is not None:
+            if refresh:
+                threading.Thread(target=self._refresh, args=(table, key, loader), daemon=True).start()
+            return value
+
+        value = self._timed_load(table, loader)
+        self._store(table, key, value, generation)
+        return value
+
+    def peek(self, table, key):
+        """
+        Non-loading lookup for callers that fetch on their own (e.g. async code).
+
+        Returns:
+            tuple: (hit, value, generation); pass `generation` back to put()
+        """
+        now = time.monotonic()
+        with self._lock:
+            generation = self._generations.get(table, 0)
+            entry = self._entries.get(key) if self.enabled_for(table) else None
+            if entry is not None and now < entry.fresh_until:
+                self._entries.move_to_end(key)
+                self._stats['hits'] += 1
+                return True, entry.value, generation
+            if self.enabled_for(table):
+                self._stats['misses'] += 1
+            return False, None, generation
+
+    def put(self, table, key, value, generation):
+        if self.enabled_for(table):
+            self._store(table, key, value, generation)
+
+    def record_latency(self, table, elapsed):
+        SUPABASE_QUERY_SECONDS.observe(elapsed, table=table, operation='read')
+        with self._lock:
+            count, total, worst = self._latency.get(table, (0, 0.0, 0.0))
+            self._latency[table] = (count + 1, total + elapsed, max(worst, elapsed))
+
+    def _refresh(self, table, key, loader):
+        try:
+            with self._lock:
+                generation = self._generations.get(table, 0)
+            value = self._timed_load(table, loader)
+            self._store(table, key, value, generation)
+            with self._lock:
+                self._stats['refreshes'] += 1
+        except Exception as e:
+            logger.warning(f"Background refresh of {table} failed: {e}")
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def _timed_load(self, table, loader):
+        start = time.perf_counter()
+        try:
+            return loader()
+        finally:
+            self.record_latency(table, time.perf_counter() - start)
+
+    def _store(self, table, key, value, generation):
+        ttl = self.ttls.get(table, 0)
+        now = time.monotonic()
+        with self._lock:
+            # A write landed while we were loading: this result may already be outdated
+            if self._generations.get(table, 0) != generation:
+                return
+            self._entries[key] = _Entry(value, now + ttl, now + ttl + self.stale_window, generation)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats['evictions'] += 1
+
+    def invalidate(self, table):
+        """Drop every cached result of `table` after a write to it"""
+        with self._lock:
+            self._generations[table] = self._generations.get(table, 0) + 1
+            stale = [key for key in self._entries if key[1] == table]
+            for key in stale:
+                del self._entries[key]
+            self._stats['invalidations'] += 1
+
+    def clear(self):
+        with self._lock:
+            for table in {key[1] for key in self._entries}:
+                self._generations[table] = self._generations.get(table, 0) + 1
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self._stats['hits'] + self._stats['stale_hits'] + self._stats['misses']
+            return dict(
+                self._stats,
+                entries=len(self._entries),
+                max_entries=self.max_entries,
+                hit_rate=round((self._stats['hits'] + self._stats['stale_hits']) / lookups, 4) if lookups else None,
+                latency={
+                    table: {
+                        'queries': count,
+                        'avg_ms': round(total / count * 1000, 2),
+                        'max_ms': round(worst * 1000, 2)
+                    }
+                    for table, (count, total, worst) in self._latency.items()
+                }
+            )
@@ -0,0 +1,156 @@
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+PENDING = 'pending'
+LOADING = 'loading'
+READY = 'ready'
+FAILED = 'failed'
+DISABLED = 'disabled'
+
+
+class Component:
+    def __init__(self, name, factory, start=None, warm=True, required=False):
+        self.name = name
+        self.factory = factory
+        # Called with the value once background services may run (see Registry.start_services)
+        self.start = start
+        self.warm = warm
+        self.required = required
+        self.status = PENDING
+        self.service_started = False
+        self.value = None
+        self.error = None
+        self.seconds = None
+        self.lock = threading.Lock()
+
+
+class Registry:
+    """
+    Subsystems created on first use instead of at import.
+
+    `get` builds a component once (concurrent callers wait for the same
+    build); a factory that raises, or returns None, leaves the component
+    failed/disabled and `get` returns None, like the old startup code did.
+    `warm_up` builds the warm components on background threads so the HTTP
+    port is up immediately; `ready` says whether the required ones are done.
+    """
+
+    def __init__(self):
+        self._components = {}
+        self._started = False
+        self._lock = threading.Lock()
+        self.created_at = time.monotonic()
+        self.warm_seconds = None
+
+    def register(self, name, factory, start=None, warm=True, required=False):
+        # Required components are always warmed: readiness waits for them
+        self._components[name] = Component(name, factory, start=start, warm=warm or required, required=required)
+
+    def __contains__(self, name):
+        return name in self._components
+
+    def loaded(self, name):
+        component = self._components.get(name)
+        return component is not None and component.status == READY
+
+    def get(self, name):
+        component = self._components[name]
+        if component.status in (READY, FAILED, DISABLED):
+            return component.value
+        with component.lock:
+            if component.status in (PENDING, LOADING):
+                self._build(component)
+        return component.value
+
+    def _build(self, component):
+        # Called with component.lock held
+        component.status = LOADING
+        started = time.perf_counter()
+        try:
+            value = component.factory()
+        except Exception as e:
+            component.error = str(e)
+            component.status = FAILED
+            logger.warning(f"{component.name} not available: {e}")
+            value = None
+        else:
+            component.value = value
+            component.status = READY if value is not None else DISABLED
+        component.seconds = round(time.perf_counter() - started, 3)
+        logger.info(f"{component.name}: {component.status} in {component.seconds}s")
+
+        if component.status == READY:
+            self._start(component)
+
+    def _start(self, component):
+        with self._lock:
+            if not self._started or component.start is None or component.service_started:
+                return
+            component.service_started = True
+        try:
+            component.start(component.value)
+        except Exception as e:
+            logger.warning(f"{component.name} background service not started: {e}")
+
+    def start_services(self):
+        """Allow components to start their threads; starts those of components already built"""
+        with self._lock:
+            self._started = True
+        for component in self._components.values():
+            if component.status == READY:
+                self._start(component)
+
+    def load_all(self):
+        """Build every warm component on the calling thread (used before forking workers)"""
+        started = time.perf_counter()
+        for component in self._components.values():
+            if component.warm:
+                self.get(component.name)
+        self.warm_seconds = round(time.perf_counter() - started, 3)
+
+    def warm_up(self):
+        """Build the warm components on background threads; returns immediately"""
+        warm = [c for c in self._components.values() if c.warm]
+        started = time.perf_counter()
+
+        def build(component):
+            self.get(component.name)
+
+        threads = [threading.Thread(target=build, args=(c,), name=f"warm-{c.name}", daemon=True) for c in warm]
+        for thread in threads:
+            thread.start()
+
+        def finish():
+            for thread in threads:
+                thread.join()
+            self.warm_seconds = round(time.perf_counter() - started, 3)
+            summary = ', '.join(f"{c.name}={c.status} {c.seconds}s" for c in warm)
+            logger.info(f"Warm-up finished in {self.warm_seconds}s: {summary}")
+
+        threading.Thread(target=finish, name="warm-up", daemon=True).start()
+
+    def ready(self):
+        """True when every required component is built and no warm component is still loading"""
+        for component in self._components.values():
+            if component.required and component.status != READY:
+                return False
+            if component.warm and component.status in (PENDING, LOADING):
+                return False
+        return True
+
+    def timings(self):
+        return {
+            'uptime_seconds': round(time.monotonic() - self.created_at, 3),
+            'warm_up_seconds': self.warm_seconds,
+            'components': {
+                c.name: {'status': c.status, 'seconds': c.seconds, 'required': c.required, 'error': c.error}
+                for c in self._components.values()
+            }
+        }
+
+
+# Global instance
+registry = Registry()
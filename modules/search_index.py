@@ -0,0 +1,270 @@
+import bisect
+import logging
+import math
+import re
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Searchable fields and how much a hit in each counts towards the score
+FIELD_WEIGHTS = {
+    'model_name': 3.0,
+    'model_subject': 2.0,
+    'rarity': 1.5,
+    'description': 1.0,
+}
+FACET_FIELDS = ('model_subject', 'rarity')
+# Columns kept per document and returned with each hit
+RESULT_FIELDS = ('model_id', 'model_name', 'description', 'rarity', 'model_subject',
+                 'model_thumbnail', 'xp_reward', 'min_level')
+# A prefix-only match is worth less than the whole word
+PREFIX_PENALTY = 0.5
+# BM25 term-frequency saturation
+K1 = 1.2
+# Rows per sync request; must stay under PostgREST's max_rows (1000 on Supabase)
+SYNC_PAGE_SIZE = 500
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def tokenize(text):
+    return _TOKEN_RE.findall(str(text).casefold()) if text else []
+
+
+class ModelSearchIndex:
+    """
+    In-process inverted index over the model catalogue.
+
+    Every query token must match (exactly or as a prefix, via a sorted term
+    list and bisect); hits are ranked with a field-weighted BM25-style score
+    and facet counts are computed over the matching set. The index is built
+    once from Supabase, kept current from write notifications, and
+    periodically resynced to pick up rows written by other processes.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._docs = {}
+        self._doc_terms = {}
+        self._postings = {}
+        self._terms = []
+        self.loaded = False
+        self.last_sync = None
+        self._sync_thread = None
+        # One full sync at a time; concurrent callers wait for it instead of refetching
+        self._sync_lock = threading.Lock()
+        # Upserts that land while a sync is reading Supabase; re-applied after the swap
+        self._recent = None
+
+    # --- Building ---
+
+    @staticmethod
+    def _weighted_terms(record):
+        terms = {}
+        for field, weight in FIELD_WEIGHTS.items():
+            for token in tokenize(record.get(field)):
+                terms[token] = terms.get(token, 0.0) + weight
+        return terms
+
+    def _add(self, doc_id, record):
+        terms = self._weighted_terms(record)
+        self._docs[doc_id] = {f: record.get(f) for f in RESULT_FIELDS}
+        self._doc_terms[doc_id] = terms
+        for term, weight in terms.items():
+            postings = self._postings.get(term)
+            if postings is None:
+                postings = self._postings[term] = {}
+                bisect.insort(self._terms, term)
+            postings[doc_id] = weight
+
+    def _remove(self, doc_id):
+        self._docs.pop(doc_id, None)
+        for term in self._doc_terms.pop(doc_id, {}):
+            postings = self._postings.get(term)
+            if postings is None:
+                continue
+            postings.pop(doc_id, None)
+            if not postings:
+                del self._postings[term]
+                i = bisect.bisect_left(self._terms, term)
+                if i < len(self._terms) and self._terms[i] == term:
+                    del self._terms[i]
+
+    def rebuild(self, records):
+        """Replace the whole index with `records` (rows of the models table)"""
+        fresh = ModelSearchIndex()
+        for record in records:
+            if record.get('model_id') is not None:
+                fresh._add(record['model_id'], record)
+        with self._lock:
+            self._docs = fresh._docs
+            self._doc_terms = fresh._doc_terms
+            self._postings = fresh._postings
+            self._terms = fresh._terms
+            for doc_id, record in (self._recent or {}).items():
+                self._remove(doc_id)
+                self._add(doc_id, record)
+            self._recent = None
+            self.loaded = True
+            self.last_sync = time.time()
+
+    def upsert(self, record):
+        """Index a new or changed model row; rows without a model_id are ignored"""
+        doc_id = record.get('model_id')
+        if doc_id is None:
+            return
+        with self._lock:
+            # Partial updates (e.g. only model_url) keep the indexed fields they don't touch
+            merged = dict(self._docs.get(doc_id) or {}, **record)
+            self._remove(doc_id)
+            self._add(doc_id, merged)
+            if self._recent is not None:
+                self._recent[doc_id] = merged
+
+    def remove(self, doc_id):
+        with self._lock:
+            self._remove(doc_id)
+
+    def on_write(self, table, rows):
+        """Write listener for SupabaseService: keeps the index current as models are saved"""
+        if table != 'models':
+            return
+        for row in rows or []:
+            if isinstance(row, dict):
+                self.upsert(row)
+
+    # --- Syncing with Supabase ---
+
+    def sync(self, service):
+        """Reload every model from Supabase; a caller arriving mid-sync waits for that sync instead"""
+        if not self._sync_lock.acquire(blocking=False):
+            with self._sync_lock:
+                return
+        try:
+            self._sync(service)
+        finally:
+            self._sync_lock.release()
+
+    def _sync(self, service):
+        if not service.initialized:
+            return
+        with self._lock:
+            self._recent = {}
+        records = self._fetch_all(service)
+        # query_records returns [] on failure: don't let a blip empty (or truncate) a loaded index
+        if records is not None and (records or not self.loaded):
+            self.rebuild(records)
+            logger.info(f"Search index synced: {len(self._docs)} models")
+        else:
+            with self._lock:
+                self._recent = None
+
+    @staticmethod
+    def _fetch_all(service):
+        """Every models row, in keyset pages below max_rows; None if a page fails midway"""
+        records = []
+        after = None
+        while True:
+            rows, after = service.query_page('models', 'model_id', select=','.join(RESULT_FIELDS),
+                                             limit=SYNC_PAGE_SIZE, after=after)
+            if not rows and records:
+                # The previous page promised more rows: this one failed
+                return None
+            records.extend(rows)
+            if after is None:
+                return records
+
+    def start_sync(self, service, interval=300):
+        """Initial load plus a periodic full resync in a background thread"""
+        if self._sync_thread is not None and self._sync_thread.is_alive():
+            return
+
+        def loop():
+            while True:
+                try:
+                    self.sync(service)
+                except Exception as e:
+                    logger.warning(f"Search index sync failed: {e}")
+                time.sleep(interval)
+
+        self._sync_thread = threading.Thread(target=loop, name="search-sync", daemon=True)
+        self._sync_thread.start()
+
+    # --- Querying ---
+
+    def _expand(self, token):
+        """Indexed terms equal to or starting with `token`, with their match weight"""
+        matches = []
+        i = bisect.bisect_left(self._terms, token)
+        while i < len(self._terms) and self._terms[i].startswith(token):
+            term = self._terms[i]
+            matches.append((term, 1.0 if term == token else PREFIX_PENALTY))
+            i += 1
+        return matches
+
+    def search(self, query='', filters=None, offset=0, limit=20):
+        """
+        Ranked search with facet counts.
+
+        `filters` maps facet fields (model_subject, rarity) to a required value
+        (case-insensitive). An empty query lists every model matching the filters.
+
+        Returns:
+            dict: total, results (with score), facets {field: {value: count}}
+        """
+        tokens = list(dict.fromkeys(tokenize(query)))
+        filters = {k: str(v).casefold() for k, v in (filters or {}).items() if v}
+
+        with self._lock:
+            total_docs = len(self._docs) or 1
+            scores = None
+            for token in tokens:
+                token_scores = {}
+                for term, match_weight in self._expand(token):
+                    postings = self._postings[term]
+                    idf = math.log(1 + (total_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+                    for doc_id, tf in postings.items():
+                        score = idf * match_weight * tf * (K1 + 1) / (tf + K1)
+                        # A token expanding to several terms in one doc counts its best term
+                        if score > token_scores.get(doc_id, 0.0):
+                            token_scores[doc_id] = score
+                if scores is None:
+                    scores = token_scores
+                else:
+                    scores = {d: s + token_scores[d] for d, s in scores.items() if d in token_scores}
+                if not scores:
+                    break
+            if scores is None:
+                scores = dict.fromkeys(self._docs, 0.0)
+
+            matched = []
+            facets = {field: {} for field in FACET_FIELDS}
+            for doc_id, score in scores.items():
+                doc = self._docs[doc_id]
+                if any(str(doc.get(f) or '').casefold() != v for f, v in filters.items()):
+                    continue
+                matched.append((score, doc_id))
+                for field in FACET_FIELDS:
+                    value = doc.get(field)
+                    if value is not None:
+                        facets[field][value] = facets[field].get(value, 0) + 1
+
+            matched.sort(key=lambda item: (-item[0], str(self._docs[item[1]].get('model_name') or '')))
+            page = [dict(self._docs[doc_id], score=round(score, 4))
+                    for score, doc_id in matched[offset:offset + limit]]
+
+        return {'total': len(matched), 'results': page, 'facets': facets}
+
+    def stats(self):
+        with self._lock:
+            return {
+                'loaded': self.loaded,
+                'documents': len(self._docs),
+                'terms': len(self._terms),
+                'last_sync': self.last_sync
+            }
+
+
+# Global instance
+model_search = ModelSearchIndex()
@@ -0,0 +1,51 @@
+import json
+import os
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+@contextmanager
+def exclusive_lock(path):
+    """
+    Blocking exclusive lock on `<path>.lock`, held across processes.
+
+    Server workers each keep their own in-memory copy of the JSON indexes in
+    generated_models/ and asset_cache/; writers take this lock around their
+    read-merge-write so one worker's update never overwrites another's.
+    """
+    with open(f"{path}.lock", 'a+') as handle:
+        if fcntl is not None:
+            fcntl.flock(handle, fcntl.LOCK_EX)
+        else:
+            handle.seek(0)
+            msvcrt.locking(handle.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(handle, fcntl.LOCK_UN)
+            else:
+                handle.seek(0)
+                msvcrt.locking(handle.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def read_json(path):
+    """Parsed contents of `path`, or None when it is missing or unreadable"""
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def write_json(path, data):
+    """Atomically replace `path`; the temp file is per process so concurrent writers never share it"""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
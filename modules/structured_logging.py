@@ -0,0 +1,217 @@
+import atexit
+import contextvars
+import copy
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import sys
+import threading
+import time
+
+# Id of the request (or background job) a log record belongs to
+request_id_var = contextvars.ContextVar('request_id', default=None)
+
+# LogRecord attributes that are not user-supplied `extra` fields
+_RESERVED = set(vars(logging.makeLogRecord({}))) | {'message', 'asctime', 'request_id'}
+
+
+def set_request_id(request_id):
+    """Tag every record logged from this thread/context with `request_id`; returns a reset token"""
+    return request_id_var.set(request_id)
+
+
+def parse_sampling(spec):
+    """Parse "modules.api.scan=0.1,modules.generation=0.05" into {logger_prefix: rate}"""
+    rates = {}
+    for part in (spec or '').split(','):
+        if '=' not in part:
+            continue
+        name, rate = part.split('=', 1)
+        rates[name.strip()] = min(max(float(rate), 0.0), 1.0)
+    return rates
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line; `extra={...}` fields become top-level keys"""
+
+    def format(self, record):
+        entry = {
+            'ts': time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(record.created)) + f".{int(record.msecs):03d}Z",
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        request_id = getattr(record, 'request_id', None)
+        if request_id:
+            entry['request_id'] = request_id
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exc'] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class ContextFilter(logging.Filter):
+    """Stamp the current request id on the record while still on the calling thread"""
+
+    def filter(self, record):
+        if not hasattr(record, 'request_id'):
+            record.request_id = request_id_var.get()
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keep only a fraction of low-level records per logger.
+
+    `rates` maps logger names (or dotted prefixes) to the share of records
+    at or below `max_level` that get through; the longest matching prefix
+    wins. Higher-level records are never sampled out.
+    """
+
+    def __init__(self, rates, max_level=logging.DEBUG):
+        super().__init__()
+        self.rates = dict(rates)
+        self.max_level = max_level
+        self.dropped = 0
+        self._resolved = {}
+
+    def _rate(self, name):
+        rate = self._resolved.get(name)
+        if rate is None:
+            rate = 1.0
+            probe = name
+            while probe:
+                if probe in self.rates:
+                    rate = self.rates[probe]
+                    break
+                probe = probe.rpartition('.')[0]
+            self._resolved[name] = rate
+        return rate
+
+    def filter(self, record):
+        if record.levelno > self.max_level:
+            return True
+        if random.random() < self._rate(record.name):
+            return True
+        self.dropped += 1
+        return False
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that drops (and counts) records instead of blocking when the queue is full"""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # Render the message now (its args may change later) but keep the traceback separate
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class LogPipeline:
+    """
+    Root logging through a bounded queue drained by one writer thread.
+
+    Callers only format the message and enqueue it; the stdout write (and
+    JSON encoding) happens on the writer thread, off the request path.
+    With background=False records are written inline instead, e.g. in a
+    master process that forks workers (see `after_fork`).
+    """
+
+    def __init__(self):
+        self.handler = None
+        self.listener = None
+        self.output = None
+        self.filters = []
+        self.sampling = None
+        self.queue_size = None
+        self._lock = threading.Lock()
+
+    def configure(self, level='INFO', json_format=True, sampling=None, queue_size=10000, stream=None,
+                  background=True):
+        with self._lock:
+            self._stop_listener()
+            self.queue_size = queue_size
+            self.output = logging.StreamHandler(stream or sys.stdout)
+            self.output.setFormatter(JsonFormatter() if json_format else logging.Formatter(
+                '%(asctime)s - %(levelname)s - %(name)s - [%(request_id)s] %(message)s'))
+            self.sampling = SamplingFilter(sampling or {})
+            self.filters = [ContextFilter(), self.sampling]
+            logging.getLogger().setLevel(level)
+            self._install(background)
+        return self
+
+    def _install(self, background):
+        # Filters run once, on whichever handler the root logger calls directly
+        for log_filter in self.filters:
+            self.output.removeFilter(log_filter)
+        root = logging.getLogger()
+        for existing in list(root.handlers):
+            root.removeHandler(existing)
+
+        if background:
+            self.handler = DroppingQueueHandler(queue.Queue(maxsize=self.queue_size))
+            front = self.handler
+        else:
+            self.handler = None
+            front = self.output
+        for log_filter in self.filters:
+            front.addFilter(log_filter)
+        root.addHandler(front)
+        if background:
+            self.listener = logging.handlers.QueueListener(self.handler.queue, self.output, respect_handler_level=True)
+            self.listener.start()
+
+    def _stop_listener(self):
+        if self.listener is not None and self.listener._thread is not None:
+            self.listener.stop()
+        self.listener = None
+
+    def after_fork(self):
+        """Switch a forked worker to its own queue and writer thread (threads do not survive fork)"""
+        with self._lock:
+            if self.output is not None:
+                self.listener = None
+                self._install(background=True)
+
+    def close(self):
+        """Flush what is queued and stop the writer"""
+        with self._lock:
+            self._stop_listener()
+
+    def stats(self):
+        return {
+            'queued': self.handler.queue.qsize() if self.handler is not None else 0,
+            'dropped_full': self.handler.dropped if self.handler is not None else 0,
+            'dropped_sampled': self.sampling.dropped if self.sampling is not None else 0
+        }
+
+
+def configure_logging(level='INFO', json_format=True, sampling=None, queue_size=10000, background=True):
+    log_pipeline.configure(level=level, json_format=json_format, sampling=sampling,
+                           queue_size=queue_size, background=background)
+    atexit.register(log_pipeline.close)
+    return log_pipeline
+
+
+# Global instance
+log_pipeline = LogPipeline()
@@ -0,0 +1,260 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+
+from dotenv import load_dotenv
+from modules.query_cache import make_key
+from modules.metrics import SUPABASE_QUERY_SECONDS
+from modules.supabase_service import supabase_service
+
+try:
+    import httpx
+except ImportError:  # optional: the async service stays uninitialized without it
+    httpx = None
+
+try:
+    import h2  # noqa: F401  (httpx needs it for HTTP/2)
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+WRITE_OPERATIONS = {"POST": "insert", "PATCH": "update", "DELETE": "delete"}
+
+
+def _env_flag(name, default):
+    return os.environ.get(name, str(default)).lower() in ('1', 'true', 'yes')
+
+
+def _literal(value):
+    if value is None:
+        return 'null'
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    return str(value)
+
+
+def _quoted(value):
+    # Quoted so commas/parentheses inside values can't break the in.(...) list
+    text = _literal(value).replace('\\', '\\\\').replace('"', '\\"')
+    return f'"{text}"'
+
+
+def _filter_params(filters=None, in_filters=None):
+    params = []
+    for key, value in (filters or {}).items():
+        params.append((key, 'is.null' if value is None else f'eq.{_literal(value)}'))
+    for key, values in (in_filters or {}).items():
+        params.append((key, f"in.({','.join(_quoted(v) for v in values)})"))
+    return params
+
+
+class AsyncSupabaseService:
+    """
+    Async PostgREST client over one pooled (HTTP/2 when available) httpx client.
+
+    Mirrors the read/write surface of SupabaseService and shares its query
+    cache, so cached reads and write invalidation stay coherent between the
+    two. Coroutines run on a dedicated event loop thread; Flask views call
+    them through `run` / `run_all` (or the `sync` adapter) until they are
+    migrated to an async stack.
+    """
+
+    def __init__(self):
+        self.client = None
+        self.initialized = False
+        self.base_url = None
+        self.pool_size = int(os.environ.get("SUPABASE_POOL_SIZE", 20))
+        self.http2 = _env_flag("SUPABASE_HTTP2", True) and HTTP2_AVAILABLE
+        self.connect_timeout = float(os.environ.get("SUPABASE_CONNECT_TIMEOUT", 5))
+        self.read_timeout = float(os.environ.get("SUPABASE_READ_TIMEOUT", 15))
+        self.cache = supabase_service.cache
+        self.sync = SyncAdapter(self)
+        self._loop = None
+        self._lock = threading.Lock()
+
+    def initialize(self):
+        with self._lock:
+            if self.initialized:
+                return
+            if httpx is None:
+                logger.warning("httpx is not installed; async Supabase client disabled.")
+                return
+
+            url = os.environ.get("SUPABASE_URL")
+            key = os.environ.get("SUPABASE_KEY")
+            if not url or not key:
+                logger.warning("Supabase URL or Key not found in environment variables.")
+                return
+
+            self.base_url = f"{url.rstrip('/')}/rest/v1"
+            self._loop = asyncio.new_event_loop()
+            threading.Thread(target=self._loop.run_forever, name="supabase-async", daemon=True).start()
+            self.client = httpx.AsyncClient(
+                base_url=self.base_url,
+                http2=self.http2,
+                headers={"apikey": key, "Authorization": f"Bearer {key}"},
+                limits=httpx.Limits(max_connections=self.pool_size, max_keepalive_connections=self.pool_size),
+                timeout=httpx.Timeout(self.read_timeout, connect=self.connect_timeout)
+            )
+            self.initialized = True
+            logger.info(f"Async Supabase client ready (pool={self.pool_size}, http2={self.http2})")
+
+    # --- Running from sync code ---
+
+    def run(self, coro, timeout=None):
+        """Run one coroutine on the service loop and wait for its result"""
+        self.initialize()
+        if not self.initialized:
+            # No loop to hand off to; still honour the coroutine's own fallbacks
+            return asyncio.run(coro)
+        future = asyncio.run_coroutine_threadsafe(coro, self._loop)
+        return future.result(timeout)
+
+    def run_all(self, *coros, timeout=None):
+        """Run independent coroutines concurrently; results come back in order"""
+        return self.run(self.gather(*coros), timeout=timeout)
+
+    @staticmethod
+    async def gather(*coros, return_exceptions=False):
+        return await asyncio.gather(*coros, return_exceptions=return_exceptions)
+
+    async def close(self):
+        if self.client is not None:
+            await self.client.aclose()
+
+    # --- Queries ---
+
+    async def _ready(self):
+        if not self.initialized:
+            # initialize() may block on its lock; keep it off the event loop
+            await asyncio.get_running_loop().run_in_executor(None, self.initialize)
+        return self.initialized
+
+    async def _timed(self, table, method, path, **kwargs):
+        start = time.perf_counter()
+        try:
+            response = await self.client.request(method, path, **kwargs)
+            response.raise_for_status()
+            return response
+        finally:
+            elapsed = time.perf_counter() - start
+            if method in ("GET", "HEAD"):
+                self.cache.record_latency(table, elapsed)
+            else:
+                SUPABASE_QUERY_SECONDS.observe(elapsed, table=table, operation=WRITE_OPERATIONS.get(method, method.lower()))
+
+    async def query_records(self, table: str, select: str = "*", filters: dict = None, in_filters: dict = None,
+                            order: str = None, descending: bool = False, limit: int = None, after=None):
+        """Async counterpart of SupabaseService.query_records (same arguments, same cache)"""
+        if in_filters and any(len(values) == 0 for values in in_filters.values()):
+            return []
+        if not await self._ready():
+            return []
+
+        key = make_key("rows", table, select, filters, in_filters, (order, descending, limit, after))
+        hit, rows, generation = self.cache.peek(table, key)
+        if hit:
+            return list(rows)
+
+        params = [("select", select)] + _filter_params(filters, in_filters)
+        if order:
+            if after is not None:
+                params.append((order, f"{'lt' if descending else 'gt'}.{_literal(after)}"))
+            params.append(("order", f"{order}.{'desc' if descending else 'asc'}"))
+        if limit is not None:
+            params.append(("limit", str(limit)))
+
+        try:
+            rows = (await self._timed(table, "GET", f"/{table}", params=params)).json()
+        except Exception as e:
+            logger.error(f"Failed to query {table}: {e}")
+            return []
+        self.cache.put(table, key, rows, generation)
+        return list(rows)
+
+    async def count_records(self, table: str, filters: dict = None, in_filters: dict = None) -> int:
+        """Exact row count computed by the server; no rows are transferred."""
+        if in_filters and any(len(values) == 0 for values in in_filters.values()):
+            return 0
+        if not await self._ready():
+            return 0
+
+        key = make_key("count", table, "*", filters, in_filters)
+        hit, count, generation = self.cache.peek(table, key)
+        if hit:
+            return count
+
+        try:
+            response = await self._timed(
+                table, "HEAD", f"/{table}",
+                params=[("select", "*")] + _filter_params(filters, in_filters),
+                headers={"Prefer": "count=exact"}
+            )
+            # Content-Range: 0-24/312 (or */312 when empty)
+            count = int(response.headers.get("content-range", "*/0").rsplit("/", 1)[1])
+        except Exception as e:
+            logger.error(f"Failed to count {table}: {e}")
+            return 0
+        self.cache.put(table, key, count, generation)
+        return count
+
+    async def insert_record(self, table: str, data):
+        """Insert one row (or a list of rows); returns the inserted rows"""
+        if not await self._ready():
+            raise Exception("Supabase not initialized")
+        try:
+            response = await self._timed(table, "POST", f"/{table}", json=data,
+                                         headers={"Prefer": "return=representation"})
+            rows = response.json()
+            supabase_service.notify_write(table, rows)
+            return rows
+        except Exception as e:
+            logger.error(f"Failed to insert record into {table}: {e}")
+            raise e
+        finally:
+            self.cache.invalidate(table)
+
+    async def update_records(self, table: str, data: dict, filters: dict):
+        """Update rows matching equality `filters`; returns the updated rows"""
+        if not filters:
+            raise ValueError("update_records requires at least one filter")
+        if not await self._ready():
+            raise Exception("Supabase not initialized")
+        try:
+            response = await self._timed(table, "PATCH", f"/{table}", json=data,
+                                         params=_filter_params(filters),
+                                         headers={"Prefer": "return=representation"})
+            rows = response.json()
+            supabase_service.notify_write(table, rows)
+            return rows
+        except Exception as e:
+            logger.error(f"Failed to update records in {table}: {e}")
+            raise e
+        finally:
+            self.cache.invalidate(table)
+
+
+class SyncAdapter:
+    """Blocking facade over AsyncSupabaseService for not-yet-migrated Flask views"""
+
+    def __init__(self, service):
+        self._service = service
+
+    def __getattr__(self, name):
+        method = getattr(self._service, name)
+        if not asyncio.iscoroutinefunction(method):
+            raise AttributeError(name)
+
+        def call(*args, **kwargs):
+            return self._service.run(method(*args, **kwargs))
+        return call
+
+
+# Global instance
+supabase_async = AsyncSupabaseService()
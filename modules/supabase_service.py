@@ -2,6 +2,8 @@ import os
 import logging
 from supabase import create_client, Client
 from dotenv import load_dotenv
+from modules.query_cache import QueryCache, DEFAULT_TTLS, parse_ttls, make_key
+from modules.metrics import SUPABASE_QUERY_SECONDS
 
 load_dotenv()
 
@@ -15,6 +17,14 @@ class SupabaseService:
             cls._instance = super(SupabaseService, cls).__new__(cls)
             cls._instance.client = None
             cls._instance.initialized = False
+            cls._instance.write_listeners = []
+            ttls = dict(DEFAULT_TTLS)
+            ttls.update(parse_ttls(os.environ.get("SUPABASE_CACHE_TTLS")))
+            cls._instance.cache = QueryCache(
+                ttls=ttls,
+                max_entries=int(os.environ.get("SUPABASE_CACHE_MAX_ENTRIES", 1024)),
+                stale_window=float(os.environ.get("SUPABASE_CACHE_STALE_WINDOW", 30))
+            )
         return cls._instance
 
     def initialize(self):
@@ -35,6 +45,12 @@ class SupabaseService:
         except Exception as e:
             logger.error(f"❌ Failed to initialize Supabase client: {e}")
 
+    def reconnect(self):
+        """New client and connection pool, e.g. in a worker forked from a process that already had one"""
+        self.client = None
+        self.initialized = False
+        self.initialize()
+
     def get_client(self):
         if not self.initialized:
              # Try lazy init
@@ -49,7 +65,7 @@ class SupabaseService:
             raise Exception("Supabase not initialized")
 
         try:
-            with open(file_path, 'rb') as f:
+            with open(file_path, 'rb') as f, SUPABASE_QUERY_SECONDS.time(table=f"storage:{bucket}", operation='upload'):
                 self.client.storage.from_(bucket).upload(path=destination_path, file=f)
             
             # Get public URL
@@ -61,35 +77,203 @@ class SupabaseService:
             logger.error(f"Failed to upload to Supabase: {e}")
             raise e
 
+    def upload_bytes(self, bucket: str, data: bytes, destination_path: str, content_type: str = "application/octet-stream") -> str:
+        """
+        Uploads an in-memory object and returns its public URL.
+        Existing objects are overwritten, so content-addressed keys can be re-published safely.
+        """
+        if not self.initialized:
+            raise Exception("Supabase not initialized")
+
+        try:
+            with SUPABASE_QUERY_SECONDS.time(table=f"storage:{bucket}", operation='upload'):
+                self.client.storage.from_(bucket).upload(
+                    path=destination_path,
+                    file=data,
+                    file_options={"content-type": content_type, "upsert": "true", "cache-control": "31536000"}
+                )
+            return self.client.storage.from_(bucket).get_public_url(destination_path)
+        except Exception as e:
+            logger.error(f"Failed to upload to Supabase: {e}")
+            raise e
+
+    def create_signed_url(self, bucket: str, path: str, expires_in: int = 3600) -> str:
+        """
+        Returns a time-limited download URL for a (possibly private) storage object.
+        """
+        if not self.initialized:
+            raise Exception("Supabase not initialized")
+
+        try:
+            result = self.client.storage.from_(bucket).create_signed_url(path, expires_in)
+            return result.get('signedURL') or result.get('signedUrl')
+        except Exception as e:
+            logger.error(f"Failed to sign Supabase URL for {path}: {e}")
+            raise e
+
     def insert_record(self, table: str, data: dict):
         if not self.initialized:
             raise Exception("Supabase not initialized")
         
         try:
-            data = self.client.table(table).insert(data).execute()
+            with SUPABASE_QUERY_SECONDS.time(table=table, operation='insert'):
+                data = self.client.table(table).insert(data).execute()
+            self.notify_write(table, data.data)
             return data
         except Exception as e:
             logger.error(f"Failed to insert record into {table}: {e}")
             raise e
+        finally:
+            # Even a failed write may have reached the table
+            self.cache.invalidate(table)
+
+    def add_write_listener(self, callback):
+        """Register callback(table, rows), called with the rows returned by every successful write"""
+        self.write_listeners.append(callback)
+
+    def notify_write(self, table: str, rows):
+        for callback in self.write_listeners:
+            try:
+                callback(table, rows or [])
+            except Exception as e:
+                logger.warning(f"Write listener failed for {table}: {e}")
+
+    def insert_many(self, table: str, rows: list, chunk_size: int = 500) -> list:
+        """
+        Insert many rows with one request per `chunk_size` rows.
+
+        Returns:
+            list: the inserted rows as returned by Supabase
+        """
+        if not self.initialized:
+            raise Exception("Supabase not initialized")
+        
+        inserted = []
+        try:
+            for start in range(0, len(rows), chunk_size):
+                with SUPABASE_QUERY_SECONDS.time(table=table, operation='insert'):
+                    response = self.client.table(table).insert(rows[start:start + chunk_size]).execute()
+                inserted.extend(response.data or [])
+            self.notify_write(table, inserted)
+            return inserted
+        except Exception as e:
+            logger.error(f"Failed to insert {len(rows)} records into {table}: {e}")
+            raise e
+        finally:
+            if rows:
+                self.cache.invalidate(table)
+
+    def update_records(self, table: str, data: dict, filters: dict):
+        if not self.initialized:
+            raise Exception("Supabase not initialized")
+        if not filters:
+            raise ValueError("update_records requires at least one filter")
+
+        try:
+            query = self.client.table(table).update(data)
+            for key, value in filters.items():
+                query = query.eq(key, value)
+            with SUPABASE_QUERY_SECONDS.time(table=table, operation='update'):
+                response = query.execute()
+            self.notify_write(table, response.data)
+            return response
+        except Exception as e:
+            logger.error(f"Failed to update records in {table}: {e}")
+            raise e
+        finally:
+            self.cache.invalidate(table)
 
-    def query_records(self, table: str, select: str = "*", filters: dict = None):
+    @staticmethod
+    def _apply_filters(query, filters: dict = None, in_filters: dict = None):
+        if filters:
+            for key, value in filters.items():
+                query = query.eq(key, value)
+        if in_filters:
+            for key, values in in_filters.items():
+                query = query.in_(key, list(values))
+        return query
+
+    def query_records(self, table: str, select: str = "*", filters: dict = None, in_filters: dict = None,
+                      order: str = None, descending: bool = False, limit: int = None, after=None):
+        """
+        Select rows from a table.
+
+        `filters` are equality matches; `in_filters` maps a column to a list of
+        accepted values so many lookups collapse into one round trip. `select`
+        may embed related tables (e.g. "id, name, users(user_name)").
+        `order` sorts by a column; with `after` only rows past that value (in
+        sort direction) are returned, which makes keyset pagination possible.
+        Reads of tables with a configured TTL are served from the query cache.
+        """
         if not self.initialized:
              # Try lazy init
             self.initialize()
             if not self.initialized:
                 return [] # Fail gracefully for now
         
+        # An empty IN list can never match; skip the round trip
+        if in_filters and any(len(values) == 0 for values in in_filters.values()):
+            return []
+        
+        def load():
+            query = self._apply_filters(self.client.table(table).select(select), filters, in_filters)
+            if order:
+                if after is not None:
+                    query = query.lt(order, after) if descending else query.gt(order, after)
+                query = query.order(order, desc=descending)
+            if limit is not None:
+                query = query.limit(limit)
+            return query.execute().data
+        
         try:
-            query = self.client.table(table).select(select)
-            if filters:
-                for key, value in filters.items():
-                    query = query.eq(key, value)
-            
-            response = query.execute()
-            return response.data
+            key = make_key("rows", table, select, filters, in_filters, (order, descending, limit, after))
+            # Rows may be shared with other callers: treat them as read-only
+            return list(self.cache.get_or_load(table, key, load))
         except Exception as e:
             logger.error(f"Failed to query {table}: {e}")
             return []
 
+    def query_page(self, table: str, key: str, select: str = "*", filters: dict = None,
+                   limit: int = 50, after=None, descending: bool = False):
+        """
+        One keyset page ordered by the unique column `key`.
+
+        Fetches one extra row to learn whether another page exists, so no
+        count query is needed.
+
+        Returns:
+            tuple: (rows, last key of the page or None when this is the last page)
+        """
+        rows = self.query_records(table, select=select, filters=filters, order=key,
+                                  descending=descending, limit=limit + 1, after=after)
+        if len(rows) <= limit:
+            return rows, None
+        rows = rows[:limit]
+        return rows, rows[-1].get(key)
+
+    def count_records(self, table: str, filters: dict = None, in_filters: dict = None) -> int:
+        """Exact row count computed by the server; no rows are transferred."""
+        if not self.initialized:
+            self.initialize()
+            if not self.initialized:
+                return 0
+        
+        if in_filters and any(len(values) == 0 for values in in_filters.values()):
+            return 0
+        
+        def load():
+            query = self.client.table(table).select("*", count="exact", head=True)
+            return self._apply_filters(query, filters, in_filters).execute().count or 0
+        
+        try:
+            return self.cache.get_or_load(table, make_key("count", table, "*", filters, in_filters), load)
+        except Exception as e:
+            logger.error(f"Failed to count {table}: {e}")
+            return 0
+
+    def cache_stats(self) -> dict:
+        """Hit/miss counts, entry count and per-table query latency of the read cache"""
+        return self.cache.stats()
+
 # Global instance
 supabase_service = SupabaseService()
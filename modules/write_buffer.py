@@ -0,0 +1,333 @@
+import json
+import logging
+import os
+import random
+import shutil
+import threading
+import time
+import uuid
+
+try:
+    from postgrest.exceptions import APIError  # rows the database rejected
+except ImportError:
+    APIError = None
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+logger = logging.getLogger(__name__)
+
+SEGMENT_PREFIX = 'segment-'
+SEGMENT_SUFFIX = '.jsonl'
+DEAD_LETTER_FILENAME = 'dead_letter.jsonl'
+LOCK_FILENAME = '.lock'
+
+
+def _try_lock(path):
+    """Exclusive, non-blocking lock on `path`; returns the open handle or None if held elsewhere (or gone)"""
+    handle = None
+    try:
+        # The directory may be removed under us by another worker adopting it
+        handle = open(path, 'a+')
+        if fcntl is not None:
+            fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            handle.seek(0)
+            msvcrt.locking(handle.fileno(), msvcrt.LK_NBLCK, 1)
+        return handle
+    except OSError:
+        if handle is not None:
+            handle.close()
+        return None
+
+
+class WriteBuffer:
+    """
+    Write-behind buffer that batches row inserts per table.
+
+    `enqueue` appends the row to an on-disk journal segment and returns
+    immediately. A background thread seals the active segment when it
+    reaches `max_batch` rows or every `flush_interval` seconds, then delivers
+    sealed segments oldest first, grouped per table, through `sink(table, rows)`.
+
+    A segment is only deleted once every row in it was accepted, so rows
+    survive backend outages and process restarts (segments left on disk are
+    replayed on start). Each process journals into its own locked
+    subdirectory, so several server workers can share `journal_dir`; the
+    directories of processes that died are adopted by a live one.
+    Delivery is at-least-once: a crash between a
+    successful insert and the journal update can resend that batch.
+    Connection failures are retried forever with capped exponential backoff;
+    batches the database itself rejects `max_rejections` times are moved to
+    a dead-letter file instead of blocking everything behind them.
+    """
+
+    def __init__(self, sink, journal_dir='write_journal', max_batch=200, flush_interval=2.0,
+                 base_backoff=0.5, max_backoff=60.0, max_rejections=5, fsync=False):
+        self.sink = sink
+        self.root_dir = journal_dir
+        # Per-process subdirectory, created on first use (and again after fork)
+        self.journal_dir = None
+        self._owner_pid = None
+        self._dir_lock = None
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.max_rejections = max_rejections
+        self.fsync = fsync
+        self.dead_letter_path = os.path.join(journal_dir, DEAD_LETTER_FILENAME)
+
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._flush_lock = threading.Lock()
+        self._thread = None
+        self._active = None
+        self._active_path = None
+        self._active_rows = 0
+        self._failures = 0
+        self._rejections = {}
+        self._retry_at = 0.0
+        self.stats_counters = {'enqueued': 0, 'delivered': 0, 'batches': 0, 'failures': 0,
+                               'dead_lettered': 0}
+        self.last_error = None
+        os.makedirs(journal_dir, exist_ok=True)
+
+    # --- Producer side ---
+
+    def enqueue(self, table, row):
+        """Durably queue one row for `table`; never blocks on the network"""
+        line = json.dumps({'t': table, 'r': row}, default=str) + '\n'
+        with self._lock:
+            self._ensure_dir()
+            if self._active is None:
+                self._open_segment()
+            self._active.write(line)
+            self._active.flush()
+            if self.fsync:
+                os.fsync(self._active.fileno())
+            self._active_rows += 1
+            self.stats_counters['enqueued'] += 1
+            full = self._active_rows >= self.max_batch
+        if full:
+            self._wake.set()
+
+    def enqueue_many(self, table, rows):
+        for row in rows:
+            self.enqueue(table, row)
+
+    def _ensure_dir(self):
+        # Called with self._lock held
+        if self._owner_pid == os.getpid():
+            return
+        # Fresh process (or forked child): never append to the parent's files
+        self._active = None
+        self._active_path = None
+        self._active_rows = 0
+        self.journal_dir = os.path.join(self.root_dir, f"{os.getpid()}-{uuid.uuid4().hex[:8]}")
+        os.makedirs(self.journal_dir, exist_ok=True)
+        self._dir_lock = _try_lock(os.path.join(self.journal_dir, LOCK_FILENAME))
+        self._owner_pid = os.getpid()
+
+    def _adopt_orphans(self):
+        """Move segments of dead processes (and pre-subdirectory journals) into our own directory"""
+        # Another live worker may be adopting the same directory; whatever it
+        # moved or removed first is simply skipped here
+        for name in os.listdir(self.root_dir):
+            path = os.path.join(self.root_dir, name)
+            if name.startswith(SEGMENT_PREFIX) and name.endswith(SEGMENT_SUFFIX):
+                try:
+                    os.replace(path, os.path.join(self.journal_dir, name))
+                except FileNotFoundError:
+                    pass
+                continue
+            if not os.path.isdir(path) or path == self.journal_dir:
+                continue
+            lock = _try_lock(os.path.join(path, LOCK_FILENAME))
+            if lock is None:
+                continue  # Owner still alive, or the directory is already gone
+            try:
+                for segment in os.listdir(path):
+                    if segment.startswith(SEGMENT_PREFIX) and segment.endswith(SEGMENT_SUFFIX):
+                        try:
+                            os.replace(os.path.join(path, segment), os.path.join(self.journal_dir, segment))
+                        except FileNotFoundError:
+                            pass
+            except FileNotFoundError:
+                continue
+            finally:
+                lock.close()
+            shutil.rmtree(path, ignore_errors=True)
+
+    def _open_segment(self):
+        # Time-ordered names so replay after a restart keeps insertion order
+        name = f"{SEGMENT_PREFIX}{time.time_ns():020d}-{uuid.uuid4().hex[:8]}{SEGMENT_SUFFIX}"
+        self._active_path = os.path.join(self.journal_dir, name)
+        self._active = open(self._active_path, 'a', encoding='utf-8')
+        self._active_rows = 0
+
+    def _seal(self):
+        with self._lock:
+            if self._active is not None:
+                self._active.close()
+                self._active = None
+                self._active_path = None
+                self._active_rows = 0
+
+    # --- Delivery ---
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="write-buffer", daemon=True)
+            self._thread.start()
+        return self
+
+    def close(self, timeout=10.0):
+        """Stop the flusher after one last delivery attempt; undelivered rows stay journaled"""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        self._seal()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self._flush_safely()
+        self._flush_safely()
+
+    def _flush_safely(self):
+        # A disk error must not kill the flusher; journaled rows would never be delivered
+        try:
+            self.flush()
+        except Exception as e:
+            self.stats_counters['failures'] += 1
+            self.last_error = f"flush: {e}"
+            logger.warning(f"Write-behind flush failed, will retry: {e}")
+            self._backoff()
+
+    def flush(self):
+        """Seal the active segment and deliver every sealed segment that is due"""
+        with self._flush_lock:
+            self._seal()
+            with self._lock:
+                self._ensure_dir()
+            self._adopt_orphans()
+            if time.monotonic() < self._retry_at and not self._stop.is_set():
+                return False
+            for path in self._sealed_segments():
+                if not self._deliver_segment(path):
+                    self._backoff()
+                    return False
+            self._failures = 0
+            self._retry_at = 0.0
+            return True
+
+    def _sealed_segments(self):
+        with self._lock:
+            self._ensure_dir()
+            active = self._active_path
+        names = sorted(n for n in os.listdir(self.journal_dir)
+                       if n.startswith(SEGMENT_PREFIX) and n.endswith(SEGMENT_SUFFIX))
+        return [os.path.join(self.journal_dir, n) for n in names
+                if os.path.join(self.journal_dir, n) != active]
+
+    def _read_segment(self, path):
+        entries = []
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entries.append(json.loads(line))
+                except ValueError:
+                    # Torn final line from a crash mid-write
+                    logger.warning(f"Skipping unreadable journal line in {path}")
+        return entries
+
+    def _deliver_segment(self, path):
+        entries = self._read_segment(path)
+        by_table = {}
+        for entry in entries:
+            by_table.setdefault(entry['t'], []).append(entry['r'])
+
+        remaining = dict(by_table)
+        stalled = False
+        for table, rows in by_table.items():
+            start = 0
+            while start < len(rows):
+                batch = rows[start:start + self.max_batch]
+                try:
+                    self.sink(table, batch)
+                except Exception as e:
+                    if not self._handle_failure(path, table, batch, e):
+                        stalled = True
+                        break
+                else:
+                    self.stats_counters['delivered'] += len(batch)
+                    self.stats_counters['batches'] += 1
+                start += len(batch)
+            remaining[table] = rows[start:]
+            if stalled:
+                break
+
+        left = [(t, r) for t, rows in remaining.items() for r in rows]
+        if not left:
+            os.remove(path)
+            return True
+        # Journal only what is still undelivered so a retry can't duplicate the rest
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for table, row in left:
+                f.write(json.dumps({'t': table, 'r': row}, default=str) + '\n')
+        os.replace(tmp_path, path)
+        return False
+
+    def _handle_failure(self, path, table, batch, error):
+        """Returns True when the batch was dead-lettered and delivery may continue"""
+        self.stats_counters['failures'] += 1
+        self.last_error = f"{table}: {error}"
+        if APIError is None or not isinstance(error, APIError):
+            logger.warning(f"Write-behind flush to {table} failed, will retry: {error}")
+            return False
+
+        key = (path, table)
+        self._rejections[key] = self._rejections.get(key, 0) + 1
+        if self._rejections[key] < self.max_rejections:
+            logger.warning(f"{table} rejected {len(batch)} buffered rows ({self._rejections[key]}/{self.max_rejections}): {error}")
+            return False
+
+        logger.error(f"Dead-lettering {len(batch)} rows for {table} after {self.max_rejections} rejections: {error}")
+        with open(self.dead_letter_path, 'a', encoding='utf-8') as f:
+            for row in batch:
+                f.write(json.dumps({'t': table, 'r': row, 'error': str(error)}, default=str) + '\n')
+        self._rejections.pop(key, None)
+        self.stats_counters['dead_lettered'] += len(batch)
+        return True
+
+    def _backoff(self):
+        self._failures += 1
+        delay = min(self.max_backoff, self.base_backoff * 2 ** (self._failures - 1))
+        # Jitter so several workers don't hammer a recovering backend in lockstep
+        self._retry_at = time.monotonic() + delay * random.uniform(0.5, 1.0)
+
+    # --- Reporting ---
+
+    def stats(self):
+        segments = self._sealed_segments()
+        with self._lock:
+            active_rows = self._active_rows
+        return dict(
+            self.stats_counters,
+            active_rows=active_rows,
+            journaled_segments=len(segments),
+            journaled_bytes=sum(os.path.getsize(p) for p in segments if os.path.exists(p)),
+            consecutive_failures=self._failures,
+            retry_in=round(max(0.0, self._retry_at - time.monotonic()), 2),
+            last_error=self.last_error
+        )
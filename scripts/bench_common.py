@@ -0,0 +1,15 @@
+"""Helpers shared by the bench_*.py scripts."""
+
+
+def percentiles(samples, mean=False):
+    """p50/p95/p99/max of durations in seconds, as milliseconds ({} without samples)"""
+    if not samples:
+        return {}
+    ordered = sorted(samples)
+
+    def pick(p):
+        return round(ordered[min(int(p / 100 * len(ordered)), len(ordered) - 1)] * 1000, 2)
+    result = {'p50_ms': pick(50), 'p95_ms': pick(95), 'p99_ms': pick(99), 'max_ms': round(ordered[-1] * 1000, 2)}
+    if mean:
+        result['mean_ms'] = round(sum(ordered) / len(ordered) * 1000, 2)
+    return result
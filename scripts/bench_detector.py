@@ -0,0 +1,321 @@
+"""
+PlanetDetector micro-benchmark across backends, batch sizes, input sizes and thread counts.
+
+  python scripts/bench_detector.py [--model models/planet_yolo_v8.pt] [--backends auto]
+                                   [--batch-sizes 1,4,8] [--imgsz 320,640] [--threads 1,4]
+                                   [--limit 64] [--output detector.json]
+
+Backends are the formats ultralytics can run the weights in: the PyTorch
+weights on CPU, on CUDA and on CUDA in fp16 (when a GPU is present), plus
+any TorchScript/ONNX/OpenVINO/TensorRT exports found next to the .pt
+(--export onnx,openvino creates them first). Each backend runs in its own
+process so model load time and peak RSS are not flattered by a warm
+interpreter.
+
+--threads sets torch's intra-op thread count, so it is only swept for the
+PyTorch and TorchScript backends. ONNX Runtime, OpenVINO and TensorRT keep
+their own thread pools that ultralytics does not expose; those backends run
+once per batch/imgsz and report `threads: null`.
+
+For every batch/imgsz/threads combination the report has the warm-up
+cost, per-image latency percentiles, throughput, ultralytics' own
+pre/inference/post split and the peak RSS while it ran. Images come from
+samples/ and dataset/data/ (--images to override).
+
+  python scripts/bench_detector.py ... --baseline detector.json [--max-regression 0.15]
+      also exits 1 when a combination got slower or lost throughput beyond
+      the threshold compared to an earlier report.
+"""
+import argparse
+import glob
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import threading
+import time
+
+try:
+    import resource
+except ImportError:  # Windows: only the sampled per-combination peak is reported
+    resource = None
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(ROOT)
+
+from bench_common import percentiles
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+DEFAULT_IMAGES = (os.path.join(ROOT, 'samples', '*'), os.path.join(ROOT, 'dataset', 'data', '**', '*'))
+
+
+def int_list(value):
+    return [int(v) for v in value.split(',') if v.strip()]
+
+
+class PeakRSS:
+    """Highest resident set size seen while the block runs, sampled every few milliseconds"""
+
+    def __init__(self, interval=0.005):
+        from modules.metrics import process_rss_bytes
+        self.read = process_rss_bytes
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, self.read() or 0)
+
+    def __enter__(self):
+        self.peak = self.read() or 0
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, self.read() or 0)
+
+
+def process_peak_rss_mb():
+    """Peak RSS over the whole process lifetime (ru_maxrss is KiB on Linux, bytes on macOS)"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (2**20 if sys.platform == 'darwin' else 1024), 1)
+
+
+def collect_images(patterns, limit):
+    paths = set()
+    for pattern in patterns:
+        paths.update(p for p in glob.glob(pattern, recursive=True) if p.lower().endswith(IMAGE_EXTENSIONS))
+    paths = sorted(paths)
+    if limit and len(paths) > limit:
+        # Same subset on every run, so reports stay comparable
+        paths = sorted(random.Random(0).sample(paths, limit))
+    return paths
+
+
+def discover_backends(model_path):
+    """(name, weights, device, half) for every backend that can run here"""
+    import torch
+    stem = os.path.splitext(model_path)[0]
+    cuda = torch.cuda.is_available()
+    candidates = [
+        ('torch-cpu', model_path, 'cpu', False),
+        ('torch-cuda', model_path, 'cuda:0', False, cuda),
+        ('torch-cuda-fp16', model_path, 'cuda:0', True, cuda),
+        ('torchscript', f"{stem}.torchscript", 'cpu', False),
+        ('onnx', f"{stem}.onnx", 'cpu', False),
+        ('openvino', f"{stem}_openvino_model", 'cpu', False),
+        ('tensorrt', f"{stem}.engine", 'cuda:0', False, cuda),
+    ]
+    return [{'name': c[0], 'weights': c[1], 'device': c[2], 'half': c[3]}
+            for c in candidates if os.path.exists(c[1]) and (len(c) < 5 or c[4])]
+
+
+def export_formats(model_path, formats):
+    from ultralytics import YOLO
+    for fmt in formats:
+        print(f"Exporting {model_path} to {fmt}...", file=sys.stderr)
+        YOLO(model_path).export(format=fmt)
+
+
+# --- One backend (child process) ---
+
+def uses_torch_threads(backend):
+    """torch.set_num_threads only affects backends that run inside torch"""
+    return backend['name'].startswith('torch')
+
+
+def bench_backend(backend, args):
+    started = time.perf_counter()
+    import torch
+    from modules.identification.model_loader import PlanetDetector
+    import_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    detector = PlanetDetector(backend['weights'], device=backend['device'], half=backend['half'])
+    load_seconds = time.perf_counter() - started
+    if detector.model is None:
+        return dict(backend, error=f"Could not load {backend['weights']}")
+
+    images = collect_images(args.images or DEFAULT_IMAGES, args.limit)
+    results = []
+    for imgsz in args.imgsz:
+        detector.predict_args['imgsz'] = imgsz
+        for threads in args.threads if uses_torch_threads(backend) else [None]:
+            if threads is not None:
+                torch.set_num_threads(threads)
+            for batch_size in args.batch_sizes:
+                results.append(bench_combination(detector, images, batch_size, imgsz, threads, args))
+
+    return dict(
+        backend,
+        import_seconds=round(import_seconds, 3),
+        load_seconds=round(load_seconds, 3),
+        process_peak_rss_mb=process_peak_rss_mb(),
+        images=len(images),
+        results=results
+    )
+
+
+def bench_combination(detector, images, batch_size, imgsz, threads, args):
+    batches = [images[i:i + batch_size] for i in range(0, len(images), batch_size)]
+
+    def run(batch):
+        if batch_size == 1:
+            return [detector.detect_and_classify_planets(batch[0], conf_threshold=args.conf)]
+        return detector.detect_batch(batch, conf_threshold=args.conf)
+
+    # The first calls pay for lazy init (kernel selection, graph compilation, allocator growth)
+    warmup = []
+    for batch in (batches * args.warmup)[:args.warmup]:
+        start = time.perf_counter()
+        run(batch)
+        warmup.append(time.perf_counter() - start)
+
+    per_image = []
+    stages = {}
+    errors = 0
+    with PeakRSS() as rss:
+        started = time.perf_counter()
+        for _ in range(args.repeat):
+            for batch in batches:
+                start = time.perf_counter()
+                outcome = run(batch)
+                elapsed = time.perf_counter() - start
+                per_image.extend([elapsed / len(batch)] * len(batch))
+                for result in outcome:
+                    if 'error' in result:
+                        errors += 1
+                    for stage, ms in (result.get('timings') or {}).items():
+                        stages.setdefault(stage, []).append(ms)
+        total = time.perf_counter() - started
+
+    return dict(
+        batch_size=batch_size,
+        imgsz=imgsz,
+        threads=threads,
+        warmup_ms=[round(s * 1000, 2) for s in warmup],
+        per_image=percentiles(per_image),
+        images_per_second=round(len(per_image) / total, 2) if total else None,
+        ultralytics_ms={stage: round(sum(v) / len(v), 2) for stage, v in stages.items()},
+        peak_rss_mb=round(rss.peak / 2**20, 1),
+        errors=errors
+    )
+
+
+# --- Orchestration ---
+
+def environment():
+    info = {'python': platform.python_version(), 'platform': platform.platform(), 'cpus': os.cpu_count()}
+    try:
+        import torch
+        info['torch'] = torch.__version__
+        info['cuda_device'] = torch.cuda.get_device_name(0) if torch.cuda.is_available() else None
+    except ImportError:
+        pass
+    try:
+        import ultralytics
+        info['ultralytics'] = ultralytics.__version__
+    except ImportError:
+        pass
+    try:
+        info['commit'] = subprocess.check_output(['git', 'rev-parse', 'HEAD'], cwd=ROOT,
+                                                 stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        info['commit'] = None
+    return info
+
+
+def run_child(backend, argv):
+    """Run one backend in a fresh interpreter; its report is the last line of stdout"""
+    command = [sys.executable, os.path.abspath(__file__), '--child', json.dumps(backend)] + argv
+    completed = subprocess.run(command, cwd=ROOT, stdout=subprocess.PIPE, text=True)
+    lines = completed.stdout.strip().splitlines()
+    if completed.returncode != 0 or not lines:
+        return dict(backend, error=f"benchmark process exited with {completed.returncode}")
+    return json.loads(lines[-1])
+
+
+def regressions(baseline, report, threshold):
+    def index(rep):
+        return {(b['name'], r['batch_size'], r['imgsz'], r['threads']): r
+                for b in rep['backends'] for r in b.get('results', [])}
+
+    old, new = index(baseline), index(report)
+    found = []
+    for key, now in sorted(new.items()):
+        before = old.get(key)
+        if before is None or not before['per_image'] or not now['per_image'] or not before['images_per_second']:
+            continue
+        slower = now['per_image']['p95_ms'] / before['per_image']['p95_ms'] - 1
+        throughput = now['images_per_second'] / before['images_per_second'] - 1
+        if slower > threshold or throughput < -threshold:
+            found.append({'backend': key[0], 'batch_size': key[1], 'imgsz': key[2], 'threads': key[3],
+                          'p95_change': round(slower, 3), 'throughput_change': round(throughput, 3)})
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--model', default=os.path.join(ROOT, 'models', 'planet_yolo_v8.pt'))
+    parser.add_argument('--backends', default='auto', help='auto, or a comma list of discovered backend names')
+    parser.add_argument('--export', default='', help='export formats to create first, e.g. onnx,openvino')
+    parser.add_argument('--batch-sizes', type=int_list, default=[1, 4, 8])
+    parser.add_argument('--imgsz', type=int_list, default=[320, 640])
+    parser.add_argument('--threads', type=int_list, default=sorted({1, os.cpu_count() or 1}))
+    parser.add_argument('--images', action='append', help='glob (repeatable); default samples/ and dataset/data/')
+    parser.add_argument('--limit', type=int, default=64, help='images per pass (0 = all)')
+    parser.add_argument('--repeat', type=int, default=3, help='measured passes over the images')
+    parser.add_argument('--warmup', type=int, default=2, help='unmeasured batches per combination')
+    parser.add_argument('--conf', type=float, default=0.25)
+    parser.add_argument('--output', help='also write the report to this file')
+    parser.add_argument('--baseline', help='earlier report to check for regressions')
+    parser.add_argument('--max-regression', type=float, default=0.15)
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(bench_backend(json.loads(args.child), args)))
+        return
+
+    if not os.path.exists(args.model):
+        raise SystemExit(f"Model not found at {args.model}")
+    if args.export:
+        export_formats(args.model, [f.strip() for f in args.export.split(',') if f.strip()])
+    backends = discover_backends(args.model)
+    if args.backends != 'auto':
+        wanted = {name.strip() for name in args.backends.split(',')}
+        backends = [b for b in backends if b['name'] in wanted]
+    if not backends:
+        raise SystemExit("No backend available for the requested names")
+
+    # Children get the same sweep options
+    argv = list(sys.argv[1:])
+    report = {'environment': environment(), 'model': args.model, 'backends': []}
+    for backend in backends:
+        print(f"Benchmarking {backend['name']}...", file=sys.stderr)
+        report['backends'].append(run_child(backend, argv))
+
+    exit_code = 0
+    if args.baseline:
+        with open(args.baseline) as f:
+            report['regressions'] = regressions(json.load(f), report, args.max_regression)
+        exit_code = 1 if report['regressions'] else 0
+
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text)
+    sys.exit(exit_code)
+
+
+if __name__ == "__main__":
+    main()
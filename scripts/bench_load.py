@@ -0,0 +1,474 @@
+"""
+End-to-end HTTP load test with per-endpoint throughput and latency percentiles.
+
+  python scripts/bench_load.py run --start-stubs --start-server [--mix default] [--concurrency 16] [--duration 60] --output load.json
+      Starts the Ollama/ComfyUI/Supabase stand-ins from stub_services.py,
+      starts serve.py pointed at them, waits for /readyz, then replays the
+      request mix. Stub latency/failure options are the same as
+      stub_services.py (e.g. --ollama-latency-ms 1500 --supabase-failure-rate 0.01).
+
+  python scripts/bench_load.py run --url http://127.0.0.1:5000 [...]
+      Against a server that is already running (with or without stubs).
+
+  python scripts/bench_load.py compare baseline.json load.json [--max-regression 0.15] [--max-rate-increase 0.02]
+      Per-endpoint p95 and goodput of two reports; exits 1 when an endpoint
+      got slower or served fewer successful responses beyond the threshold,
+      when its error or rejection rate rose by more than --max-rate-increase,
+      when an endpoint of the baseline is missing, or when the current run
+      failed a consistency check.
+
+Latency percentiles are over successful (2xx/3xx) responses only, so an
+endpoint that starts failing fast does not look faster. With --start-stubs
+the run also checks answers against the seeded data (search total, member
+counts); the stub caps reads at --supabase-max-rows like PostgREST does.
+
+Mixes are weights per scenario, by name (default, catalogue, classroom, scan,
+generate) or inline, e.g. --mix catalogue=10,scan=3,generate=1:
+
+  catalogue  model listing/filtering, search, model URL, leaderboard
+  classroom  classroom detail, members, joined classrooms, classroom models
+  scan       POST /api/scan with images from --images (default samples/)
+  llm        GET /api/generate_info
+  generate   POST /api/models/generate; --follow-jobs polls each job to the end
+             and also reports the end-to-end "generate_job" latency
+"""
+import argparse
+import glob
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from bench_common import percentiles
+
+MIXES = {
+    'default': {'catalogue': 50, 'classroom': 25, 'scan': 15, 'llm': 7, 'generate': 3},
+    'catalogue': {'catalogue': 1},
+    'classroom': {'classroom': 1},
+    'scan': {'scan': 1},
+    'generate': {'generate': 1},
+}
+SEARCH_TERMS = ('astronomy', 'model', 'planet', 'biology', 'geology', 'mars', 'cell', 'rock')
+SUBJECTS = ('Astronomy', 'Biology', 'Chemistry', 'Physics', 'Geology')
+KEYWORDS = ('Mars', 'Venus', 'Jupiter', 'Saturn', 'Mercury', 'Earth')
+
+
+def parse_mix(spec):
+    if spec in MIXES:
+        return dict(MIXES[spec])
+    mix = {}
+    for part in spec.split(','):
+        name, _, weight = part.partition('=')
+        mix[name.strip()] = float(weight or 1)
+    unknown = set(mix) - set(SCENARIOS)
+    if unknown:
+        raise ValueError(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+    return mix
+
+
+class Recorder:
+    """Latency samples and status counts per endpoint label; nothing is kept before `start`"""
+
+    def __init__(self):
+        self.samples = {}
+        self.statuses = {}
+        self.recording = False
+        self.started = None
+        self.stopped = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        self.started = time.perf_counter()
+        self.recording = True
+
+    def stop(self):
+        self.stopped = time.perf_counter()
+        self.recording = False
+
+    def record(self, label, status, seconds):
+        if not self.recording:
+            return
+        with self._lock:
+            counts = self.statuses.setdefault(label, {})
+            counts[str(status)] = counts.get(str(status), 0) + 1
+            # Only successes feed the latency percentiles
+            if str(status).isdigit() and int(status) < 400:
+                self.samples.setdefault(label, []).append(seconds)
+
+    def report(self):
+        elapsed = (self.stopped or time.perf_counter()) - self.started
+        endpoints = {}
+        total = errors = 0
+        for label in sorted(self.statuses):
+            statuses = self.statuses[label]
+            count = sum(statuses.values())
+            ok = len(self.samples.get(label, []))
+            failed = sum(n for status, n in statuses.items() if not status.isdigit() or (int(status) >= 500 and status != '503'))
+            rejected = statuses.get('429', 0) + statuses.get('503', 0)
+            endpoints[label] = dict(
+                percentiles(self.samples.get(label, []), mean=True),
+                requests=count,
+                ok=ok,
+                errors=failed,
+                rejected=rejected,
+                error_rate=round(failed / count, 4),
+                rejected_rate=round(rejected / count, 4),
+                statuses=statuses,
+                per_second=round(count / elapsed, 2),
+                ok_per_second=round(ok / elapsed, 2)
+            )
+            total += count
+            errors += failed
+        return {'seconds': round(elapsed, 2), 'requests': total, 'errors': errors,
+                'per_second': round(total / elapsed, 2), 'endpoints': endpoints}
+
+
+class Client:
+    """One virtual user: a requests session plus the recorder"""
+
+    def __init__(self, args, recorder, token=None):
+        import requests
+        self.requests = requests
+        self.args = args
+        self.recorder = recorder
+        self.token = token
+        self.session = requests.Session()
+
+    def call(self, label, method, path, auth=False, **kwargs):
+        if auth and self.token:
+            kwargs.setdefault('headers', {})['Authorization'] = f'Bearer {self.token}'
+        start = time.perf_counter()
+        try:
+            response = self.session.request(method, self.args.url + path, timeout=self.args.timeout, **kwargs)
+            status = response.status_code
+        except self.requests.Timeout:
+            response, status = None, 'timeout'
+        except self.requests.RequestException:
+            response, status = None, 'error'
+        self.recorder.record(label, status, time.perf_counter() - start)
+        return response
+
+
+# --- Scenarios ---
+
+def scenario_catalogue(client, ctx):
+    choice = random.random()
+    if choice < 0.35:
+        client.call('models_list', 'GET', '/api/models', params={'limit': 20})
+    elif choice < 0.55:
+        client.call('models_list', 'GET', '/api/models', params={'limit': 20, 'subject': random.choice(SUBJECTS)})
+    elif choice < 0.8:
+        client.call('models_search', 'GET', '/api/models/search', params={'q': random.choice(SEARCH_TERMS)})
+    elif choice < 0.9:
+        client.call('model_url', 'GET', '/api/modelurl', params={'model_id': random.randint(1, ctx['models'])})
+    else:
+        client.call('leaderboard', 'GET', '/api/leaderboard')
+
+
+def scenario_classroom(client, ctx):
+    classroom = random.randint(1, ctx['classrooms'])
+    choice = random.random()
+    if choice < 0.4:
+        client.call('classroom', 'GET', f'/api/classroom/{classroom}')
+    elif choice < 0.6:
+        client.call('classroom_members', 'GET', f'/api/classroom_members/{classroom}')
+    elif choice < 0.8:
+        client.call('classroom_joined', 'GET', f'/api/classroomjoined/{random.randint(1, ctx["users"])}')
+    else:
+        client.call('classroom_models', 'GET', f'/api/classroommodels/{classroom}')
+
+
+def scenario_scan(client, ctx):
+    name, data = random.choice(ctx['images'])
+    client.call('scan', 'POST', '/api/scan', files={'file': (name, data, 'image/jpeg')})
+
+
+def scenario_llm(client, ctx):
+    client.call('generate_info', 'GET', '/api/generate_info', params={'keyword': random.choice(KEYWORDS)})
+
+
+def scenario_generate(client, ctx):
+    name, data = random.choice(ctx['images'])
+    started = time.perf_counter()
+    response = client.call('generate', 'POST', '/api/models/generate', auth=True,
+                           files={'file': (name, data, 'image/jpeg')}, data={'name': f'Load test {name}'})
+    if response is None or response.status_code != 200 or not client.args.follow_jobs:
+        return
+    job_id = response.json().get('job_id')
+    deadline = started + client.args.job_timeout
+    state = 'timeout'
+    while time.perf_counter() < deadline and not ctx['stop'].is_set():
+        time.sleep(1)
+        status = client.call('job_status', 'GET', f'/api/models/jobs/{job_id}')
+        if status is not None and status.status_code == 200 and status.json().get('state') in ('completed', 'failed'):
+            state = status.json()['state']
+            break
+    client.recorder.record('generate_job', 200 if state == 'completed' else state, time.perf_counter() - started)
+
+
+SCENARIOS = {
+    'catalogue': scenario_catalogue,
+    'classroom': scenario_classroom,
+    'scan': scenario_scan,
+    'llm': scenario_llm,
+    'generate': scenario_generate,
+}
+
+
+# --- Setup ---
+
+def load_images(pattern):
+    paths = sorted(p for p in glob.glob(pattern) if p.lower().endswith(('.jpg', '.jpeg', '.png')))
+    if not paths:
+        raise SystemExit(f"No images match {pattern}")
+    images = []
+    for path in paths:
+        with open(path, 'rb') as f:
+            images.append((os.path.basename(path), f.read()))
+    return images
+
+
+def login_users(args, count):
+    """Register (once) and log in `count` bench users; returns their tokens"""
+    import requests
+    tokens = []
+    for i in range(count):
+        credentials = {'username': f'load_{i}', 'password': 'load-test-password'}
+        requests.post(f'{args.url}/api/auth/register', json=credentials, timeout=30)
+        response = requests.post(f'{args.url}/api/auth/login', json=credentials, timeout=30)
+        response.raise_for_status()
+        tokens.append(response.json()['access_token'])
+    return tokens
+
+
+def wait_ready(url, timeout):
+    import requests
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if requests.get(f'{url}/readyz', timeout=5).status_code == 200:
+                return True
+        except requests.RequestException:
+            pass
+        time.sleep(1)
+    return False
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], cwd=ROOT, stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def consistency_checks(args, state):
+    """Answers that depend on reading whole tables, compared with the stub's seeded data"""
+    import requests
+    tables = state.tables
+    checks = []
+
+    def check(name, expected, actual):
+        checks.append({'name': name, 'expected': expected, 'actual': actual, 'ok': expected == actual})
+
+    try:
+        search = requests.get(f'{args.url}/api/models/search', params={'limit': 1}, timeout=args.timeout).json()
+        check('search_total', len(tables.get('models', [])), search.get('total'))
+    except (requests.RequestException, ValueError) as e:
+        check('search_total', len(tables.get('models', [])), f'error: {e}')
+
+    members = {}
+    for row in tables.get('classroom_members', []):
+        members[row['classroom_id']] = members.get(row['classroom_id'], 0) + 1
+    user_id = tables['classroom_members'][0]['user_id'] if tables.get('classroom_members') else None
+    if user_id is not None:
+        try:
+            joined = requests.get(f'{args.url}/api/classroomjoined/{user_id}', timeout=args.timeout).json()
+            check('classroom_member_counts', {str(c['classroom_id']): members.get(c['classroom_id'], 0) for c in joined},
+                  {str(c['classroom_id']): c.get('count_member') for c in joined})
+        except (requests.RequestException, ValueError, TypeError, KeyError) as e:
+            check('classroom_member_counts', 'per-classroom counts', f'error: {e}')
+    return checks
+
+
+def run(args):
+    mix = parse_mix(args.mix)
+    stubs = server = None
+    env = {}
+    if args.start_stubs:
+        from stub_services import start_stubs_from_args
+        stubs, env = start_stubs_from_args(args)
+    if args.start_server:
+        port = args.url.rsplit(':', 1)[-1].strip('/')
+        server_env = dict(os.environ, **env, BIND=f'127.0.0.1:{port}', WEB_WORKERS=str(args.server_workers),
+                          LOG_LEVEL=os.environ.get('LOG_LEVEL', 'WARNING'))
+        server = subprocess.Popen([sys.executable, 'serve.py'], cwd=ROOT, env=server_env)
+    try:
+        if not wait_ready(args.url, args.ready_timeout):
+            raise SystemExit(f"{args.url} did not become ready within {args.ready_timeout}s")
+        # Before any load: generation would add rows the checks don't expect
+        checks = consistency_checks(args, stubs['supabase'].RequestHandlerClass.state) if stubs else None
+        report = drive(args, mix, env)
+        if checks is not None:
+            report['checks'] = checks
+        return report
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(30)
+        for stub in (stubs or {}).values():
+            stub.shutdown()
+
+
+def drive(args, mix, env):
+    recorder = Recorder()
+    tokens = login_users(args, args.users) if mix.get('generate') else []
+    ctx = {
+        'images': load_images(args.images) if mix.get('scan') or mix.get('generate') else [],
+        'users': args.seed_users,
+        'classrooms': args.seed_classrooms,
+        'models': args.seed_models,
+        'stop': threading.Event(),
+    }
+    names = list(mix)
+    weights = [mix[name] for name in names]
+
+    def virtual_user(index):
+        client = Client(args, recorder, tokens[index % len(tokens)] if tokens else None)
+        while not ctx['stop'].is_set():
+            SCENARIOS[random.choices(names, weights)[0]](client, ctx)
+            if args.think_ms:
+                time.sleep(random.expovariate(1000 / args.think_ms))
+
+    threads = [threading.Thread(target=virtual_user, args=(i,), daemon=True) for i in range(args.concurrency)]
+    for thread in threads:
+        thread.start()
+    time.sleep(args.warmup)
+    recorder.start()
+    time.sleep(args.duration)
+    recorder.stop()
+    ctx['stop'].set()
+    for thread in threads:
+        thread.join(args.timeout + 5)
+
+    report = {
+        'meta': {
+            'started_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+            'commit': git_commit(),
+            'url': args.url,
+            'mix': mix,
+            'concurrency': args.concurrency,
+            'think_ms': args.think_ms,
+            'warmup_seconds': args.warmup,
+            'stubs': {name: value for name, value in env.items() if name != 'SUPABASE_KEY'} or None,
+        }
+    }
+    report.update(recorder.report())
+    return report
+
+
+# --- Compare ---
+
+def compare(args):
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+
+    regressions = []
+    print(f"{'endpoint':<20} {'p95 base':>10} {'p95 now':>10} {'change':>8} {'ok/s base':>9} {'ok/s now':>9} {'change':>8} "
+          f"{'err base':>8} {'err now':>8} {'rej base':>8} {'rej now':>8}")
+    for label, base in sorted(baseline['endpoints'].items()):
+        now = current['endpoints'].get(label)
+        if now is None:
+            if base['requests'] >= args.min_requests:
+                regressions.append(label)
+                print(f"{label:<20} missing from the current run  REGRESSION")
+            continue
+        if min(base['requests'], now['requests']) < args.min_requests:
+            continue
+        reasons = []
+        base_p95, now_p95 = base.get('p95_ms'), now.get('p95_ms')
+        if now_p95 is None and base_p95 is not None:
+            reasons.append('no successful responses')
+        p95_change = now_p95 / base_p95 - 1 if base_p95 and now_p95 is not None else 0.0
+        # Reports from before goodput was recorded only have per_second
+        base_ok, now_ok = base.get('ok_per_second', base['per_second']), now.get('ok_per_second', now['per_second'])
+        ok_change = now_ok / base_ok - 1 if base_ok else 0.0
+        rates = {}
+        for rate in ('error_rate', 'rejected_rate'):
+            field = 'errors' if rate == 'error_rate' else 'rejected'
+            rates[rate] = (base.get(rate, base.get(field, 0) / base['requests']),
+                           now.get(rate, now.get(field, 0) / now['requests']))
+            if rates[rate][1] - rates[rate][0] > args.max_rate_increase:
+                reasons.append(rate.replace('_', ' ') + ' up')
+        if p95_change > args.max_regression:
+            reasons.append('slower')
+        if ok_change < -args.max_regression:
+            reasons.append('less goodput')
+        flag = f"  REGRESSION ({', '.join(reasons)})" if reasons else ''
+        if reasons:
+            regressions.append(label)
+        print(f"{label:<20} {str(base_p95):>10} {str(now_p95):>10} {p95_change:>+8.1%} "
+              f"{base_ok:>9} {now_ok:>9} {ok_change:>+8.1%} "
+              f"{rates['error_rate'][0]:>8.1%} {rates['error_rate'][1]:>8.1%} "
+              f"{rates['rejected_rate'][0]:>8.1%} {rates['rejected_rate'][1]:>8.1%}{flag}")
+
+    failed_checks = [c for c in current.get('checks') or [] if not c['ok']]
+    for c in failed_checks:
+        print(f"Consistency check {c['name']} failed: expected {c['expected']}, got {c['actual']}")
+    if regressions:
+        print(f"Regressed beyond {args.max_regression:.0%} (rates beyond +{args.max_rate_increase:.0%}): {', '.join(regressions)}")
+    return 1 if regressions or failed_checks else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = commands.add_parser('run', help='replay a request mix and write a report')
+    run_parser.add_argument('--url', default='http://127.0.0.1:5000')
+    run_parser.add_argument('--mix', default='default')
+    run_parser.add_argument('--concurrency', type=int, default=16, help='virtual users')
+    run_parser.add_argument('--duration', type=float, default=60, help='measured seconds')
+    run_parser.add_argument('--warmup', type=float, default=5, help='unmeasured seconds before measuring')
+    run_parser.add_argument('--think-ms', type=float, default=0, help='mean pause between a user\'s requests')
+    run_parser.add_argument('--timeout', type=float, default=60, help='per request')
+    run_parser.add_argument('--images', default=os.path.join(ROOT, 'samples', '*'))
+    run_parser.add_argument('--users', type=int, default=8, help='bench accounts used for generation')
+    run_parser.add_argument('--follow-jobs', action='store_true', help='poll generation jobs until they finish')
+    run_parser.add_argument('--job-timeout', type=float, default=600)
+    run_parser.add_argument('--start-stubs', action='store_true', help='run the stand-in services in this process')
+    run_parser.add_argument('--start-server', action='store_true', help='start serve.py (pointed at the stubs)')
+    run_parser.add_argument('--server-workers', type=int, default=2)
+    run_parser.add_argument('--ready-timeout', type=float, default=300)
+    run_parser.add_argument('--output', help='also write the report to this file')
+    from stub_services import add_stub_arguments
+    add_stub_arguments(run_parser)
+
+    compare_parser = commands.add_parser('compare', help='compare two reports')
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('current')
+    compare_parser.add_argument('--max-regression', type=float, default=0.15)
+    compare_parser.add_argument('--max-rate-increase', type=float, default=0.02,
+                                help='allowed rise of the error and rejection rates (absolute share)')
+    compare_parser.add_argument('--min-requests', type=int, default=20, help='skip endpoints with fewer samples')
+    args = parser.parse_args()
+
+    if args.command == 'compare':
+        sys.exit(compare(args))
+    report = run(args)
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text)
+
+
+if __name__ == "__main__":
+    main()
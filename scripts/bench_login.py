@@ -0,0 +1,161 @@
+"""
+Login-storm benchmark.
+
+  python scripts/bench_login.py local [--users 200] [--method scrypt]
+      In-process: every user logs in at once, verifying inline on one
+      thread each (the old behaviour) vs. through the bounded PasswordHasher
+      pool; then /api/auth/me-style lookups straight from SQLite vs. the
+      identity cache.
+
+  python scripts/bench_login.py http --url http://127.0.0.1:5000 [--users 200] [--me-calls 5]
+      Against a running server: registers bench users (once), fires all
+      logins concurrently, then each user calls /api/auth/me a few times.
+
+Both print a JSON report with throughput and latency percentiles.
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from bench_common import percentiles
+
+
+def storm(fn, jobs, concurrency):
+    """Run fn(job) for every job with `concurrency` callers released at once"""
+    latencies = []
+    errors = 0
+    lock = threading.Lock()
+    gate = threading.Barrier(min(concurrency, len(jobs)))
+
+    def call(job):
+        nonlocal errors
+        try:
+            gate.wait(timeout=30)
+        except threading.BrokenBarrierError:
+            pass
+        start = time.perf_counter()
+        try:
+            fn(job)
+        except Exception:
+            with lock:
+                errors += 1
+        with lock:
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(call, jobs))
+    elapsed = time.perf_counter() - start
+    return dict(percentiles(latencies), requests=len(jobs), errors=errors,
+                seconds=round(elapsed, 3), per_second=round(len(jobs) / elapsed, 1))
+
+
+def bench_local(args):
+    from werkzeug.security import generate_password_hash, check_password_hash
+    from modules.identity import PasswordHasher, IdentityCache
+
+    password = 'correct horse battery staple'
+    stored = generate_password_hash(password, args.method)
+    jobs = list(range(args.users))
+    hasher = PasswordHasher(workers=args.workers or None, method=args.method, max_pending=args.users)
+
+    report = {
+        'mode': 'local',
+        'users': args.users,
+        'method': args.method,
+        'pool_workers': hasher.workers,
+        'login_inline': storm(lambda _: check_password_hash(stored, password), jobs, args.users),
+        'login_pool': storm(lambda _: hasher.verify(stored, password), jobs, args.users),
+    }
+
+    # Identity lookups: SQLite per call vs. cached
+    from flask import Flask
+    from modules.models import db, User
+    from modules.identity import load_identity
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + os.path.abspath('bench_login.db')
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        if User.query.count() < args.users:
+            for i in range(User.query.count(), args.users):
+                db.session.add(User(username=f'bench_{i}', password_hash=stored))
+            db.session.commit()
+        ids = [u.id for u in User.query.limit(args.users)]
+
+    lookups = [ids[i % len(ids)] for i in range(args.users * args.me_calls)]
+    cache = IdentityCache(ttl=60)
+
+    def direct(user_id):
+        with app.app_context():
+            load_identity(user_id)
+
+    def cached(user_id):
+        with app.app_context():
+            cache.get(user_id, load_identity)
+
+    report['me_direct'] = storm(direct, lookups, args.concurrency)
+    report['me_cached'] = storm(cached, lookups, args.concurrency)
+    report['me_cache'] = cache.stats()
+    os.remove('bench_login.db')
+    return report
+
+
+def bench_http(args):
+    import requests
+
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=args.users, pool_maxsize=args.users)
+    session.mount('http://', adapter)
+    password = 'bench-password'
+    users = [f'bench_{i}' for i in range(args.users)]
+    for name in users:
+        session.post(f'{args.url}/api/auth/register', json={'username': name, 'password': password})
+
+    tokens = {}
+
+    def login(name):
+        r = session.post(f'{args.url}/api/auth/login', json={'username': name, 'password': password})
+        r.raise_for_status()
+        tokens[name] = r.json()['access_token']
+
+    report = {'mode': 'http', 'url': args.url, 'users': args.users}
+    report['login'] = storm(login, users, args.users)
+
+    def me(name):
+        r = session.get(f'{args.url}/api/auth/me', headers={'Authorization': f'Bearer {tokens[name]}'})
+        r.raise_for_status()
+
+    calls = [name for name in users if name in tokens] * args.me_calls
+    report['me'] = storm(me, calls, args.concurrency)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('mode', choices=('local', 'http'))
+    parser.add_argument('--url', default='http://127.0.0.1:5000')
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--me-calls', type=int, default=5)
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--workers', type=int, default=0, help='local: hashing pool size (0 = CPU count)')
+    parser.add_argument('--method', default='scrypt', help='local: werkzeug hash method/cost')
+    parser.add_argument('--output', help='also write the report to this file')
+    args = parser.parse_args()
+
+    report = bench_local(args) if args.mode == 'local' else bench_http(args)
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text)
+
+
+if __name__ == "__main__":
+    main()
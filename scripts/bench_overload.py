@@ -0,0 +1,170 @@
+"""
+Overload benchmark: open-loop arrivals above capacity, with and without admission control.
+
+  python scripts/bench_overload.py local [--capacity 4] [--service-ms 200] [--rate 40] [--seconds 15]
+      In-process: a stand-in endpoint that can only run `capacity` requests
+      at a time (like the detector on one GPU) is served twice, unprotected
+      and behind admission_control. Arrivals come at `rate`/s regardless of
+      how fast the server answers, so unprotected latency keeps growing while
+      the admitted requests' p99 stays near the deadline.
+
+  python scripts/bench_overload.py http --url http://127.0.0.1:5000 --image samples/x.jpg [--rate 20]
+      Against a running server: POSTs the image to /api/scan at `rate`/s.
+
+Both print a JSON report: outcome counts, goodput and latency percentiles of
+successful and rejected requests.
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from bench_common import percentiles
+
+
+def open_loop(send, rate, seconds, max_outstanding=1024):
+    """Call send() `rate` times a second for `seconds`; send returns an HTTP status (or 'timeout'/'error')"""
+    results = []
+    lock = threading.Lock()
+
+    def call():
+        start = time.perf_counter()
+        try:
+            status = send()
+        except Exception:
+            status = 'error'
+        with lock:
+            results.append((status, time.perf_counter() - start))
+
+    total = int(rate * seconds)
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max_outstanding) as pool:
+        for i in range(total):
+            delay = started + i / rate - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            pool.submit(call)
+    elapsed = time.perf_counter() - started
+
+    outcomes = {}
+    for status, _ in results:
+        outcomes[str(status)] = outcomes.get(str(status), 0) + 1
+    ok = [latency for status, latency in results if status == 200]
+    rejected = [latency for status, latency in results if status in (429, 503)]
+    return {
+        'sent': total,
+        'offered_per_second': rate,
+        'outcomes': outcomes,
+        'goodput_per_second': round(len(ok) / elapsed, 2),
+        'ok': percentiles(ok),
+        'rejected': percentiles(rejected)
+    }
+
+
+def bench_local(args):
+    import logging
+    import requests
+    from flask import Flask
+    from werkzeug.serving import make_server
+    from modules.admission import admission, admission_control
+
+    capacity = threading.Semaphore(args.capacity)
+
+    def work():
+        with capacity:
+            time.sleep(args.service_ms / 1000)
+        return 'ok'
+
+    app = Flask(__name__)
+    app.add_url_rule('/unprotected', 'unprotected', work)
+    app.add_url_rule('/admission', 'admission', admission_control('bench')(work))
+    admission.configure('bench', concurrency=args.capacity, max_queue=args.queue, deadline=args.deadline,
+                        per_minute=args.rate_per_minute, burst=args.burst)
+
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_port}"
+    session = requests.Session()
+    session.mount('http://', requests.adapters.HTTPAdapter(pool_maxsize=256))
+
+    def sender(path):
+        def send():
+            try:
+                return session.get(base + path, timeout=args.timeout).status_code
+            except requests.Timeout:
+                return 'timeout'
+        return send
+
+    capacity_per_second = args.capacity / (args.service_ms / 1000)
+    report = {
+        'mode': 'local',
+        'capacity_per_second': round(capacity_per_second, 2),
+        'overload_factor': round(args.rate / capacity_per_second, 2),
+        'deadline_seconds': args.deadline,
+        'unprotected': open_loop(sender('/unprotected'), args.rate, args.seconds),
+        'admission': open_loop(sender('/admission'), args.rate, args.seconds),
+    }
+    report['admission_state'] = admission.stats()['pools']['bench']
+    server.shutdown()
+    return report
+
+
+def bench_http(args):
+    import requests
+
+    with open(args.image, 'rb') as f:
+        image = f.read()
+    session = requests.Session()
+    session.mount('http://', requests.adapters.HTTPAdapter(pool_maxsize=256))
+
+    def send():
+        try:
+            files = {'file': (os.path.basename(args.image), image, 'image/png')}
+            return session.post(f'{args.url}/api/scan', files=files, timeout=args.timeout).status_code
+        except requests.Timeout:
+            return 'timeout'
+
+    report = {'mode': 'http', 'url': args.url, 'scan': open_loop(send, args.rate, args.seconds)}
+    try:
+        report['metrics'] = [line for line in session.get(f'{args.url}/metrics', timeout=5).text.splitlines()
+                             if line.startswith('admission_')]
+    except requests.RequestException:
+        pass
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('mode', choices=('local', 'http'))
+    parser.add_argument('--url', default='http://127.0.0.1:5000')
+    parser.add_argument('--image', help='http: image to scan')
+    parser.add_argument('--rate', type=float, default=40, help='requests per second offered')
+    parser.add_argument('--seconds', type=float, default=15)
+    parser.add_argument('--timeout', type=float, default=60, help='client timeout per request')
+    parser.add_argument('--capacity', type=int, default=4, help='local: requests served at once')
+    parser.add_argument('--service-ms', type=float, default=200, help='local: service time per request')
+    parser.add_argument('--queue', type=int, default=16, help='local: admission waiting room')
+    parser.add_argument('--deadline', type=float, default=2.0, help='local: admission deadline (s)')
+    parser.add_argument('--rate-per-minute', type=int, default=0, help='local: per-client limit (0 = off)')
+    parser.add_argument('--burst', type=int, default=10)
+    parser.add_argument('--output', help='also write the report to this file')
+    args = parser.parse_args()
+
+    if args.mode == 'http' and not args.image:
+        parser.error('http mode needs --image')
+    report = bench_local(args) if args.mode == 'local' else bench_http(args)
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text)
+
+
+if __name__ == "__main__":
+    main()
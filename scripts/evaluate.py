@@ -2,13 +2,14 @@ import os
 import glob
 import cv2
 import sys
-sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(ROOT)
 from modules.identification.model_loader import PlanetDetector
 
-# Configuration
-TEST_DIR = r"D:\Coding\MajorServer\samples"
-OUTPUT_DIR = r"D:\Coding\MajorServer\samples\debug"
-MODEL_PATH = r"D:\Coding\MajorServer\models\planet_yolo_v8.pt"
+# Configuration (relative to the repository; timing benchmarks are in bench_detector.py)
+TEST_DIR = os.path.join(ROOT, "samples")
+OUTPUT_DIR = os.path.join(ROOT, "samples", "debug")
+MODEL_PATH = os.path.join(ROOT, "models", "planet_yolo_v8.pt")
 
 def test_model():
     print(f"--- Testing Model on {TEST_DIR} ---")
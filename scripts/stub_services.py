@@ -0,0 +1,680 @@
+"""
+Local stand-ins for the services the server calls, for load and latency testing.
+
+  python scripts/stub_services.py [--output-dir comfy_output] [--ollama-latency-ms 800] [--comfy-step-ms 50] ...
+
+Starts three stdlib HTTP servers:
+
+  Ollama    POST /api/chat (non-streaming, answers the JSON the LLM prompt asks for),
+            GET /api/tags, /api/version
+  ComfyUI   GET /, POST /upload/image, POST /prompt, GET /history/<id>, GET /queue,
+            GET /ws (websocket with execution_start/executing/progress/execution_success
+            messages). Prompts run one at a time like on a single GPU; each writes a
+            small valid <filename_prefix>_00001_.glb into --output-dir.
+  Supabase  /rest/v1/<table> (PostgREST select/filters/order/limit, count=exact,
+            embedded child(count) aggregates, insert/update) on seeded
+            in-memory tables, and /storage/v1/object
+            upload, public and signed downloads. Reads return at most
+            --supabase-max-rows rows (1000, like Supabase's default max_rows).
+
+Every service takes a base latency, jitter and failure rate. Then point the
+server at the stubs with the printed environment (OLLAMA_HOST, COMFYUI_URL,
+COMFYUI_OUTPUT_DIR, SUPABASE_URL, SUPABASE_KEY). bench_load.py can start the
+stubs in-process with --start-stubs.
+"""
+import argparse
+import base64
+import hashlib
+import json
+import os
+import queue
+import random
+import re
+import struct
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qsl, unquote
+
+# Not a real JWT; supabase-py only checks the shape
+STUB_SUPABASE_KEY = 'stub.eyJyb2xlIjoic2VydmljZV9yb2xlIn0.stub'
+WS_GUID = '258EAFA5-E914-47DA-95CA-C5AB0DC85B11'
+SUBJECTS = ('Astronomy', 'Biology', 'Chemistry', 'Physics', 'Geology')
+RARITIES = ('Common', 'Rare', 'Epic', 'Legendary')
+
+
+class Behaviour:
+    """Latency (base + uniform jitter) and failure rate of one stub service"""
+
+    def __init__(self, latency_ms=0.0, jitter_ms=0.0, failure_rate=0.0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.failure_rate = failure_rate
+
+    def delay(self):
+        seconds = (self.latency_ms + random.uniform(0, self.jitter_ms)) / 1000
+        if seconds > 0:
+            time.sleep(seconds)
+
+    def fails(self):
+        return self.failure_rate > 0 and random.random() < self.failure_rate
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    behaviour = Behaviour()
+
+    def log_message(self, format, *args):
+        pass
+
+    def body(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        return self.rfile.read(length) if length else b''
+
+    def json_body(self):
+        raw = self.body()
+        return json.loads(raw) if raw else None
+
+    def send(self, status, payload=None, content_type='application/json', headers=None, head=False):
+        if payload is None:
+            data = b''
+        elif isinstance(payload, bytes):
+            data = payload
+        else:
+            data = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        if data and not head:
+            self.wfile.write(data)
+
+    def handle_one(self, method):
+        self.behaviour.delay()
+        if self.behaviour.fails():
+            self.body()
+            return self.send(500, {'error': 'injected failure'})
+        return self.route(method, urlsplit(self.path))
+
+    def route(self, method, url):
+        raise NotImplementedError
+
+    def do_GET(self):
+        self.handle_one('GET')
+
+    def do_HEAD(self):
+        self.handle_one('HEAD')
+
+    def do_POST(self):
+        self.handle_one('POST')
+
+    def do_PATCH(self):
+        self.handle_one('PATCH')
+
+    def do_PUT(self):
+        self.handle_one('PUT')
+
+    def do_DELETE(self):
+        self.handle_one('DELETE')
+
+
+# --- Ollama ---
+
+class OllamaHandler(StubHandler):
+    def route(self, method, url):
+        if url.path == '/api/chat' and method == 'POST':
+            request = self.json_body() or {}
+            prompt = ' '.join(m.get('content', '') for m in request.get('messages', []))
+            match = re.search(r'"([^"]+)"', prompt)
+            topic = match.group(1) if match else 'Topic'
+            content = json.dumps({
+                'title': topic,
+                'summary': f"{topic} is a stub answer. It stands in for the language model during load tests.",
+                'facts': ['Stub', 'Local', 'Fast']
+            })
+            return self.send(200, {
+                'model': request.get('model', 'stub'),
+                'created_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+                'message': {'role': 'assistant', 'content': content},
+                'done': True,
+                'done_reason': 'stop'
+            })
+        if url.path == '/api/tags':
+            return self.send(200, {'models': [{'name': 'phi3:mini', 'model': 'phi3:mini'}]})
+        if url.path == '/api/version':
+            return self.send(200, {'version': '0.0.0-stub'})
+        return self.send(404, {'error': 'not found'})
+
+
+# --- ComfyUI ---
+
+def minimal_glb(padding_bytes=0):
+    """A one-triangle binary glTF, padded out to roughly the size of a real model"""
+    positions = struct.pack('<9f', 0, 0, 0, 1, 0, 0, 0, 1, 0)
+    binary = positions + b'\0' * (padding_bytes - padding_bytes % 4)
+    gltf = {
+        'asset': {'version': '2.0', 'generator': 'stub_services'},
+        'buffers': [{'byteLength': len(binary)}],
+        'bufferViews': [{'buffer': 0, 'byteOffset': 0, 'byteLength': len(positions)}],
+        'accessors': [{'bufferView': 0, 'componentType': 5126, 'count': 3, 'type': 'VEC3',
+                       'min': [0, 0, 0], 'max': [1, 1, 0]}],
+        'meshes': [{'primitives': [{'attributes': {'POSITION': 0}, 'mode': 4}]}],
+        'nodes': [{'mesh': 0}],
+        'scenes': [{'nodes': [0]}],
+        'scene': 0
+    }
+    json_chunk = json.dumps(gltf, separators=(',', ':')).encode('utf-8')
+    json_chunk += b' ' * (-len(json_chunk) % 4)
+    total = 12 + 8 + len(json_chunk) + 8 + len(binary)
+    return (struct.pack('<4sII', b'glTF', 2, total)
+            + struct.pack('<I4s', len(json_chunk), b'JSON') + json_chunk
+            + struct.pack('<I4s', len(binary), b'BIN\0') + binary)
+
+
+def ws_frame(text):
+    payload = text.encode('utf-8')
+    if len(payload) < 126:
+        header = struct.pack('!BB', 0x81, len(payload))
+    elif len(payload) < 65536:
+        header = struct.pack('!BBH', 0x81, 126, len(payload))
+    else:
+        header = struct.pack('!BBQ', 0x81, 127, len(payload))
+    return header + payload
+
+
+class ComfyState:
+    """Prompt queue executed by one worker thread, plus connected websocket clients"""
+
+    def __init__(self, output_dir, step_ms=50.0, steps=20, failure_rate=0.0, glb_kb=256):
+        self.output_dir = output_dir
+        self.step_ms = step_ms
+        self.steps = steps
+        self.failure_rate = failure_rate
+        self.glb = minimal_glb(glb_kb * 1024)
+        self.queue = queue.Queue()
+        self.pending = []
+        self.running = None
+        self.history = OrderedDict()
+        self.clients = {}
+        self.lock = threading.Lock()
+        self.number = 0
+        os.makedirs(output_dir, exist_ok=True)
+        threading.Thread(target=self._work, name='stub-comfy-worker', daemon=True).start()
+
+    def submit(self, workflow, client_id):
+        prompt_id = str(uuid.uuid4())
+        with self.lock:
+            self.number += 1
+            number = self.number
+            self.pending.append(prompt_id)
+        self.queue.put((prompt_id, workflow or {}, client_id))
+        self.broadcast({'type': 'status', 'data': {'status': {'exec_info': {'queue_remaining': self.queue.qsize()}}}})
+        return prompt_id, number
+
+    def send(self, client_id, message):
+        with self.lock:
+            client = self.clients.get(client_id)
+        if client is None:
+            return
+        wfile, lock = client
+        try:
+            with lock:
+                wfile.write(ws_frame(json.dumps(message)))
+                wfile.flush()
+        except OSError:
+            with self.lock:
+                self.clients.pop(client_id, None)
+
+    def broadcast(self, message):
+        with self.lock:
+            client_ids = list(self.clients)
+        for client_id in client_ids:
+            self.send(client_id, message)
+
+    def _work(self):
+        while True:
+            prompt_id, workflow, client_id = self.queue.get()
+            with self.lock:
+                self.pending.remove(prompt_id)
+                self.running = prompt_id
+            try:
+                self._execute(prompt_id, workflow, client_id)
+            finally:
+                with self.lock:
+                    self.running = None
+
+    def _execute(self, prompt_id, workflow, client_id):
+        self.send(client_id, {'type': 'execution_start', 'data': {'prompt_id': prompt_id, 'timestamp': int(time.time() * 1000)}})
+        nodes = list(workflow)
+        steps_per_node = max(1, self.steps // max(1, len(nodes)))
+        for node in nodes:
+            self.send(client_id, {'type': 'executing', 'data': {'node': node, 'prompt_id': prompt_id}})
+            for step in range(1, steps_per_node + 1):
+                time.sleep(self.step_ms / 1000)
+                self.send(client_id, {'type': 'progress',
+                                      'data': {'value': step, 'max': steps_per_node, 'node': node, 'prompt_id': prompt_id}})
+
+        if self.failure_rate > 0 and random.random() < self.failure_rate:
+            self.send(client_id, {'type': 'execution_error', 'data': {
+                'prompt_id': prompt_id, 'node_id': nodes[-1] if nodes else None,
+                'exception_message': 'Injected failure', 'exception_type': 'RuntimeError'}})
+            self._finish(prompt_id, 'error', {})
+            return
+
+        outputs = {}
+        for node_id, node in workflow.items():
+            prefix = (node.get('inputs') or {}).get('filename_prefix') if isinstance(node, dict) else None
+            if prefix:
+                filename = f"{prefix}_00001_.glb"
+                # Write under a temp name so the server never sees a partial file
+                temp_path = os.path.join(self.output_dir, f".{filename}.part")
+                with open(temp_path, 'wb') as f:
+                    f.write(self.glb)
+                os.replace(temp_path, os.path.join(self.output_dir, filename))
+                outputs[node_id] = {'glb': [{'filename': filename, 'type': 'output'}]}
+                self.send(client_id, {'type': 'executed', 'data': {'node': node_id, 'output': outputs[node_id], 'prompt_id': prompt_id}})
+        self.send(client_id, {'type': 'execution_success', 'data': {'prompt_id': prompt_id}})
+        self.send(client_id, {'type': 'executing', 'data': {'node': None, 'prompt_id': prompt_id}})
+        self._finish(prompt_id, 'success', outputs)
+
+    def _finish(self, prompt_id, status, outputs):
+        with self.lock:
+            self.history[prompt_id] = {
+                'status': {'status_str': status, 'completed': status == 'success', 'messages': []},
+                'outputs': outputs
+            }
+            while len(self.history) > 1000:
+                self.history.popitem(last=False)
+
+
+class ComfyHandler(StubHandler):
+    state = None
+
+    def handle_one(self, method):
+        # The progress websocket is long-lived: no injected latency or failures
+        url = urlsplit(self.path)
+        if url.path == '/ws':
+            return self.websocket(dict(parse_qsl(url.query)).get('clientId', str(uuid.uuid4())))
+        return super().handle_one(method)
+
+    def route(self, method, url):
+        if url.path == '/' and method in ('GET', 'HEAD'):
+            return self.send(200, b'<html>stub comfyui</html>', 'text/html', head=method == 'HEAD')
+        if url.path == '/upload/image' and method == 'POST':
+            match = re.search(rb'filename="([^"]*)"', self.body())
+            name = match.group(1).decode('utf-8', 'replace') if match else f"{uuid.uuid4().hex}.png"
+            return self.send(200, {'name': os.path.basename(name), 'subfolder': '', 'type': 'input'})
+        if url.path == '/prompt' and method == 'POST':
+            request = self.json_body() or {}
+            prompt_id, number = self.state.submit(request.get('prompt'), request.get('client_id'))
+            return self.send(200, {'prompt_id': prompt_id, 'number': number, 'node_errors': {}})
+        if url.path.startswith('/history'):
+            prompt_id = url.path[len('/history/'):]
+            with self.state.lock:
+                if prompt_id:
+                    entry = self.state.history.get(prompt_id)
+                    return self.send(200, {prompt_id: entry} if entry else {})
+                return self.send(200, dict(self.state.history))
+        if url.path == '/queue':
+            with self.state.lock:
+                running = [[0, self.state.running]] if self.state.running else []
+                pending = [[i + 1, prompt_id] for i, prompt_id in enumerate(self.state.pending)]
+            return self.send(200, {'queue_running': running, 'queue_pending': pending})
+        return self.send(404, {'error': 'not found'})
+
+    def websocket(self, client_id):
+        key = self.headers.get('Sec-WebSocket-Key')
+        if not key:
+            return self.send(400, {'error': 'websocket upgrade required'})
+        accept = base64.b64encode(hashlib.sha1((key + WS_GUID).encode('ascii')).digest()).decode('ascii')
+        self.send_response(101, 'Switching Protocols')
+        self.send_header('Upgrade', 'websocket')
+        self.send_header('Connection', 'Upgrade')
+        self.send_header('Sec-WebSocket-Accept', accept)
+        self.end_headers()
+        self.wfile.flush()
+        lock = threading.Lock()
+        with self.state.lock:
+            self.state.clients[client_id] = (self.wfile, lock)
+        self.state.send(client_id, {'type': 'status', 'data': {'status': {'exec_info': {'queue_remaining': 0}}, 'sid': client_id}})
+        try:
+            # Client frames (pings, close) are read and ignored until the socket closes
+            while True:
+                header = self.rfile.read(2)
+                if len(header) < 2:
+                    break
+                opcode, length = header[0] & 0x0F, header[1] & 0x7F
+                if length == 126:
+                    length = struct.unpack('!H', self.rfile.read(2))[0]
+                elif length == 127:
+                    length = struct.unpack('!Q', self.rfile.read(8))[0]
+                self.rfile.read((4 if header[1] & 0x80 else 0) + length)
+                if opcode == 0x8:
+                    break
+        except OSError:
+            pass
+        finally:
+            with self.state.lock:
+                if self.state.clients.get(client_id, (None,))[0] is self.wfile:
+                    del self.state.clients[client_id]
+            self.close_connection = True
+
+
+# --- Supabase ---
+
+def seed_tables(users=200, classrooms=20, models=500):
+    now = time.time()
+
+    def stamp(offset):
+        return time.strftime('%Y-%m-%dT%H:%M:%S+00:00', time.gmtime(now - offset))
+
+    tables = {
+        'users': [{'id': i, 'user_name': f'user_{i}', 'level': 1 + i % 30, 'xp': (i * 137) % 10000,
+                   'created_at': stamp(i * 60)} for i in range(1, users + 1)],
+        'classroom': [{'id': i, 'name': f'Classroom {i}', 'created_by': 1 + i % users,
+                       'join_code': f'JOIN{i:04d}', 'created_at': stamp(i * 3600)} for i in range(1, classrooms + 1)],
+        'classroom_members': [],
+        'models': []
+    }
+    member_id = 1
+    for user in range(1, users + 1):
+        for classroom in {1 + user % classrooms, 1 + (user * 7) % classrooms}:
+            tables['classroom_members'].append({'id': member_id, 'classroom_id': classroom, 'user_id': user})
+            member_id += 1
+    for i in range(1, models + 1):
+        subject = SUBJECTS[i % len(SUBJECTS)]
+        tables['models'].append({
+            'model_id': i,
+            'model_name': f'{subject} model {i}',
+            'description': f'Seeded {subject.lower()} model number {i}',
+            'model_url': f'/storage/v1/object/public/models/seed_{i}.glb',
+            'rarity': RARITIES[i % len(RARITIES)],
+            'xp_reward': (10, 50, 150, 500)[i % 4],
+            'model_subject': subject,
+            'model_thumbnail': None,
+            'min_level': 1 + i % 10,
+            'uploader_id': 1 + i % classrooms,
+            'metadata': {},
+            'created_at': stamp(i * 600)
+        })
+    return tables
+
+
+PRIMARY_KEYS = {'models': 'model_id'}
+
+
+def _split_select(select):
+    # Top-level columns only; embedded resources like users(user_name) are dropped
+    columns, depth, current = [], 0, ''
+    for char in select:
+        if char == '(':
+            depth += 1
+        elif char == ')':
+            depth -= 1
+        elif char == ',' and depth == 0:
+            columns.append(current.strip())
+            current = ''
+            continue
+        current += char
+    columns.append(current.strip())
+    return [c for c in columns if c and '(' not in c]
+
+
+def _embedded_counts(select):
+    """Names of embedded `table(count)` aggregates in a select"""
+    return [c[:-len('(count)')].strip() for c in (part.strip() for part in select.split(',')) if c.endswith('(count)')]
+
+
+def _coerce(value, like):
+    if isinstance(like, bool):
+        return value == 'true'
+    if isinstance(like, (int, float)):
+        try:
+            return type(like)(value)
+        except ValueError:
+            return value
+    return value
+
+
+def _matches(row, column, expression):
+    operator, _, operand = expression.partition('.')
+    value = row.get(column)
+    if operator == 'in':
+        options = [o.strip().strip('"') for o in operand.strip('()').split(',') if o.strip()]
+        return any(_coerce(o, value) == value for o in options)
+    if operator == 'is':
+        return value is None if operand == 'null' else str(value).lower() == operand
+    operand = unquote(operand).strip('"')
+    if value is None:
+        return False
+    target = _coerce(operand, value)
+    try:
+        return {
+            'eq': value == target, 'neq': value != target,
+            'gt': value > target, 'gte': value >= target,
+            'lt': value < target, 'lte': value <= target,
+        }.get(operator, True)
+    except TypeError:
+        return False
+
+
+class SupabaseState:
+    def __init__(self, tables, storage_budget_mb=256):
+        self.tables = tables
+        self.objects = OrderedDict()
+        self.storage_budget = storage_budget_mb * 1024 * 1024
+        self.stored_bytes = 0
+        self.lock = threading.Lock()
+
+    def put_object(self, key, data):
+        with self.lock:
+            old = self.objects.pop(key, None)
+            if old is not None:
+                self.stored_bytes -= len(old)
+            self.objects[key] = data
+            self.stored_bytes += len(data)
+            while self.stored_bytes > self.storage_budget and len(self.objects) > 1:
+                _, evicted = self.objects.popitem(last=False)
+                self.stored_bytes -= len(evicted)
+
+
+class SupabaseHandler(StubHandler):
+    state = None
+    # PostgREST's db-max-rows: reads are silently cut to this many rows (0 = unlimited)
+    max_rows = 1000
+
+    def route(self, method, url):
+        if url.path.startswith('/rest/v1/'):
+            return self.rest(method, url.path[len('/rest/v1/'):], parse_qsl(url.query, keep_blank_values=True))
+        if url.path.startswith('/storage/v1/object/'):
+            return self.storage(method, url.path[len('/storage/v1/object/'):])
+        return self.send(404, {'message': 'not found'})
+
+    def rest(self, method, table, params):
+        rows_table = self.state.tables.setdefault(table, [])
+        filters = [(k, v) for k, v in params if k not in ('select', 'order', 'limit', 'offset', 'on_conflict', 'columns')]
+        options = dict(params)
+        prefer = self.headers.get('Prefer', '')
+        payload = self.json_body() if method in ('POST', 'PATCH') else None
+
+        with self.state.lock:
+            matched = [row for row in rows_table if all(_matches(row, k, v) for k, v in filters)]
+
+            if method in ('GET', 'HEAD'):
+                total = len(matched)
+                for spec in reversed((options.get('order') or '').split(',')):
+                    if spec:
+                        column, _, direction = spec.partition('.')
+                        matched.sort(key=lambda r: (r.get(column) is None, r.get(column)), reverse=direction.startswith('desc'))
+                offset = int(options.get('offset', 0))
+                limit = int(options['limit']) if options.get('limit') else None
+                if self.max_rows:
+                    limit = min(limit, self.max_rows) if limit is not None else self.max_rows
+                page = matched[offset:offset + limit if limit is not None else None]
+                select = options.get('select', '*')
+                if select.strip() != '*':
+                    columns = [c for c in _split_select(select) if c != '*']
+                    page = [{c: row.get(c) for c in columns} for row in page] if columns else page
+                # classroom_members(count) on classroom: rows of the child whose classroom_id is the row's id
+                embedded = _embedded_counts(select)
+                if embedded:
+                    page = [dict(row) for row in page]
+                for child in embedded:
+                    children = self.state.tables.get(child, [])
+                    for row, source in zip(page, matched[offset:]):
+                        count = sum(1 for r in children if r.get(f'{table}_id') == source.get('id'))
+                        row[child] = [{'count': count}]
+                headers = {}
+                if 'count=exact' in prefer:
+                    headers['Content-Range'] = f"{offset}-{offset + len(page) - 1}/{total}" if page else f"*/{total}"
+                return self.send(200, page, headers=headers, head=method == 'HEAD')
+
+            if method == 'POST':
+                new_rows = payload if isinstance(payload, list) else [payload]
+                key = PRIMARY_KEYS.get(table, 'id')
+                next_id = max((r.get(key) or 0 for r in rows_table), default=0) + 1
+                for row in new_rows:
+                    if row.get(key) is None:
+                        row[key] = next_id
+                        next_id += 1
+                    row.setdefault('created_at', time.strftime('%Y-%m-%dT%H:%M:%S+00:00', time.gmtime()))
+                rows_table.extend(new_rows)
+                return self.send(201, new_rows if 'return=representation' in prefer else None)
+
+            if method == 'PATCH':
+                for row in matched:
+                    row.update(payload or {})
+                return self.send(200, matched if 'return=representation' in prefer else None)
+
+            if method == 'DELETE':
+                self.state.tables[table] = [row for row in rows_table if row not in matched]
+                return self.send(200, matched if 'return=representation' in prefer else None)
+
+        return self.send(405, {'message': 'method not allowed'})
+
+    def storage(self, method, path):
+        if path.startswith('sign/'):
+            key = path[len('sign/'):]
+            if method == 'POST':
+                self.body()
+                return self.send(200, {'signedURL': f"/object/sign/{key}?token={uuid.uuid4().hex}"})
+            return self.object(key)
+        if path.startswith('public/'):
+            return self.object(path[len('public/'):])
+        if method in ('POST', 'PUT'):
+            data = self.body()
+            self.state.put_object(path, data)
+            return self.send(200, {'Key': path, 'Id': str(uuid.uuid4())})
+        return self.object(path)
+
+    def object(self, key):
+        with self.state.lock:
+            data = self.state.objects.get(unquote(key))
+        if data is None and key.startswith('models/seed_'):
+            data = minimal_glb()
+        if data is None:
+            return self.send(404, {'statusCode': '404', 'error': 'not_found', 'message': 'Object not found'})
+        return self.send(200, data, 'application/octet-stream')
+
+
+# --- Entry points ---
+
+def _handler(base, **attributes):
+    return type(base.__name__, (base,), attributes)
+
+
+def _serve(handler, host, port, name):
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name=f"stub-{name}", daemon=True).start()
+    return server
+
+
+def start_stubs(host='127.0.0.1', ollama_port=0, comfy_port=0, supabase_port=0, output_dir='stub_comfy_output',
+                ollama=None, comfy=None, supabase=None, comfy_step_ms=50.0, comfy_steps=20, comfy_failure_rate=0.0,
+                glb_kb=256, seed=None, supabase_max_rows=1000):
+    """
+    Start the three stubs on background threads (port 0 = any free port).
+
+    Returns (servers, env): env holds the variables that point the app at them.
+    """
+    seed = seed or {}
+    comfy_state = ComfyState(os.path.abspath(output_dir), step_ms=comfy_step_ms, steps=comfy_steps,
+                             failure_rate=comfy_failure_rate, glb_kb=glb_kb)
+    supabase_state = SupabaseState(seed_tables(**seed))
+    servers = {
+        'ollama': _serve(_handler(OllamaHandler, behaviour=ollama or Behaviour()), host, ollama_port, 'ollama'),
+        'comfyui': _serve(_handler(ComfyHandler, behaviour=comfy or Behaviour(), state=comfy_state), host, comfy_port, 'comfyui'),
+        'supabase': _serve(_handler(SupabaseHandler, behaviour=supabase or Behaviour(), state=supabase_state,
+                                    max_rows=supabase_max_rows), host, supabase_port, 'supabase'),
+    }
+    urls = {name: f"http://{host}:{server.server_port}" for name, server in servers.items()}
+    env = {
+        'OLLAMA_HOST': urls['ollama'],
+        'COMFYUI_URL': urls['comfyui'],
+        'COMFYUI_OUTPUT_DIR': comfy_state.output_dir,
+        'SUPABASE_URL': urls['supabase'],
+        'SUPABASE_KEY': STUB_SUPABASE_KEY,
+    }
+    return servers, env
+
+
+def add_stub_arguments(parser):
+    """Latency/failure options shared with bench_load.py"""
+    for name, latency in (('ollama', 800), ('comfy', 5), ('supabase', 20)):
+        parser.add_argument(f'--{name}-latency-ms', type=float, default=latency)
+        parser.add_argument(f'--{name}-jitter-ms', type=float, default=latency / 4)
+        parser.add_argument(f'--{name}-failure-rate', type=float, default=0.0)
+    parser.add_argument('--comfy-step-ms', type=float, default=50, help='sleep per sampler step of a prompt')
+    parser.add_argument('--comfy-steps', type=int, default=20, help='progress steps per prompt')
+    parser.add_argument('--comfy-execution-failure-rate', type=float, default=0.0,
+                        help='share of prompts ending in execution_error')
+    parser.add_argument('--glb-kb', type=int, default=256, help='size of the generated .glb files')
+    parser.add_argument('--seed-users', type=int, default=200)
+    parser.add_argument('--seed-classrooms', type=int, default=20)
+    parser.add_argument('--seed-models', type=int, default=1500,
+                        help='more than --supabase-max-rows, so full-table reads must page')
+    parser.add_argument('--supabase-max-rows', type=int, default=1000,
+                        help='cap on rows per read, like PostgREST max_rows (0 = unlimited)')
+    parser.add_argument('--output-dir', default='stub_comfy_output', help='where the ComfyUI stub writes .glb files')
+
+
+def start_stubs_from_args(args, host='127.0.0.1', ports=(0, 0, 0)):
+    def behaviour(name):
+        return Behaviour(getattr(args, f'{name}_latency_ms'), getattr(args, f'{name}_jitter_ms'),
+                         getattr(args, f'{name}_failure_rate'))
+
+    return start_stubs(host, *ports, output_dir=args.output_dir,
+                       ollama=behaviour('ollama'), comfy=behaviour('comfy'), supabase=behaviour('supabase'),
+                       comfy_step_ms=args.comfy_step_ms, comfy_steps=args.comfy_steps,
+                       comfy_failure_rate=args.comfy_execution_failure_rate, glb_kb=args.glb_kb,
+                       supabase_max_rows=args.supabase_max_rows,
+                       seed={'users': args.seed_users, 'classrooms': args.seed_classrooms, 'models': args.seed_models})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--ollama-port', type=int, default=11434)
+    parser.add_argument('--comfy-port', type=int, default=8188)
+    parser.add_argument('--supabase-port', type=int, default=54321)
+    add_stub_arguments(parser)
+    args = parser.parse_args()
+
+    servers, env = start_stubs_from_args(args, args.host, (args.ollama_port, args.comfy_port, args.supabase_port))
+    for name, value in env.items():
+        print(f"{name}={value}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        for server in servers.values():
+            server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Production entry point: one preloaded master, several forked workers.
+
+  python serve.py
+
+The app (detector weights, workflow template, search index, leaderboard...)
+is imported once in the master and shared copy-on-write with the workers.
+Each worker then gets its own database/HTTP pools and background threads
+(see app.after_fork). On Windows, or without gunicorn, it falls back to a
+single waitress process serving WEB_THREADS threads.
+
+Environment:
+  WEB_WORKERS    worker processes (default 2)
+  WEB_THREADS    request threads per worker (default 4)
+  TORCH_THREADS  intra-op torch threads per worker (default CPUs / workers)
+  BIND           host:port (default 0.0.0.0:5000)
+  WEB_TIMEOUT    seconds before a stuck worker is restarted (default 600)
+"""
+import gc
+import os
+import sys
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+WORKERS = int(os.environ.get('WEB_WORKERS', 2))
+THREADS = int(os.environ.get('WEB_THREADS', 4))
+TORCH_THREADS = int(os.environ.get('TORCH_THREADS', 0))
+BIND = os.environ.get('BIND', '0.0.0.0:5000')
+TIMEOUT = int(os.environ.get('WEB_TIMEOUT', 600))
+
+try:
+    from gunicorn.app.base import BaseApplication
+except ImportError:  # Windows, or gunicorn not installed
+    BaseApplication = None
+
+
+def load_app(preload, processes):
+    # Split the cores between processes; must be set before torch is imported,
+    # OpenMP/MKL size their pools at import
+    torch_threads = TORCH_THREADS or max(1, (os.cpu_count() or 1) // processes)
+    os.environ.setdefault('OMP_NUM_THREADS', str(torch_threads))
+    os.environ.setdefault('MKL_NUM_THREADS', str(torch_threads))
+    os.environ['TORCH_THREADS'] = str(torch_threads)
+    if preload:
+        os.environ['SERVER_PRELOAD'] = 'true'
+
+    import app as server
+    # Warm read-only state now so workers share it instead of each loading a copy
+    try:
+        from modules.generation.workflows import load_workflow_template
+        load_workflow_template()
+    except Exception as e:
+        print(f"⚠️ Workflow template not preloaded: {e}")
+    return server
+
+
+if BaseApplication is not None:
+    class PreloadedServer(BaseApplication):
+        """gunicorn with the app object already imported in the master"""
+
+        def __init__(self, server, options):
+            self.server = server
+            self.options = options
+            super().__init__()
+
+        def load_config(self):
+            for key, value in self.options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            return self.server.app
+
+
+def post_fork(arbiter, worker):
+    sys.modules['app'].after_fork()
+
+
+def main():
+    if BaseApplication is None or sys.platform == 'win32':
+        from waitress import serve
+        server = load_app(preload=False, processes=1)
+        print(f"🚀 Serving on {BIND} with waitress ({THREADS} threads, single process)")
+        host, port = BIND.rsplit(':', 1)
+        serve(server.app, host=host, port=int(port), threads=THREADS)
+        return
+
+    server = load_app(preload=True, processes=WORKERS)
+    # Move everything loaded so far out of the collector's reach; otherwise each
+    # collection in a worker touches (and so copies) the shared pages
+    gc.collect()
+    gc.freeze()
+    print(f"🚀 Serving on {BIND} with {WORKERS} workers x {THREADS} threads ({os.environ['TORCH_THREADS']} torch threads each)")
+    PreloadedServer(server, {
+        'bind': BIND,
+        'workers': WORKERS,
+        'threads': THREADS,
+        'worker_class': 'gthread',
+        'preload_app': True,
+        'timeout': TIMEOUT,
+        'post_fork': post_fork,
+    }).run()
+
+
+if __name__ == "__main__":
+    main()